@@ -0,0 +1 @@
+"""Benchmarks and synthetic corpus generator for the PDF generator."""
@@ -0,0 +1,6 @@
+"""Run the benchmarks with `python -m benchmarks`."""
+import sys
+
+from benchmarks.run import main
+
+sys.exit(main())
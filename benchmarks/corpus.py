@@ -0,0 +1,131 @@
+"""Deterministic generator of synthetic C source trees for benchmarks."""
+import os
+import random
+from typing import List
+
+# Statement templates; {v} is a variable name, {n} a number, {s} a string literal
+STATEMENTS = (
+    "int {v} = {n};",
+    "{v} += {n};",
+    "if ({v} > {n}) {{",
+    "for (int i = 0; i < {n}; i++) {{",
+    "while ({v} != {n}) {{",
+    "printf(\"{s} %d\\n\", {v});",
+    "scanf(\"%d\", &{v});",
+    "// {s}",
+    "return {v};",
+    "}}",
+)
+WORDS = (
+    "valor", "soma", "media", "contador", "resultado", "numero", "vetor", "matriz",
+    "total", "indice", "maior", "menor", "entrada", "saida", "aluno", "nota",
+)
+
+
+class CorpusSpec:
+    """Shape of a synthetic corpus."""
+
+    def __init__(
+        self,
+        files: int = 100,
+        min_lines: int = 20,
+        max_lines: int = 400,
+        mean_line_length: int = 30,
+        max_line_length: int = 160,
+        depth: int = 2,
+        long_lines: int = 0,
+        long_line_length: int = 2000,
+        seed: int = 0,
+    ) -> None:
+        """
+        Initialize the corpus shape.
+
+        Args:
+            files: Number of .c files
+            min_lines: Fewest lines in a file
+            max_lines: Most lines in a file
+            mean_line_length: Typical line length; lengths follow an exponential tail
+            max_line_length: Longest ordinary line
+            depth: Deepest directory level files are placed in (0 = all in the root)
+            long_lines: Pathological lines (one unbroken token each) spread over the corpus
+            long_line_length: Length of each pathological line
+            seed: Seed of the random generator; the same spec always produces the same tree
+        """
+        self.files = files
+        self.min_lines = min_lines
+        self.max_lines = max_lines
+        self.mean_line_length = mean_line_length
+        self.max_line_length = max_line_length
+        self.depth = depth
+        self.long_lines = long_lines
+        self.long_line_length = long_line_length
+        self.seed = seed
+
+
+def _line(rng: random.Random, spec: CorpusSpec, indent: int) -> str:
+    """Build one C-looking line of roughly the requested length."""
+    target = min(int(rng.expovariate(1 / spec.mean_line_length)) + 1, spec.max_line_length)
+    template = rng.choice(STATEMENTS)
+    text = template.format(v=rng.choice(WORDS), n=rng.randint(0, 1000), s=rng.choice(WORDS))
+    while len(text) < target:
+        text = text.replace(";", f" + {rng.choice(WORDS)};", 1) if ";" in text else text + " " + rng.choice(WORDS)
+    return "    " * indent + text[:max(target, 1)]
+
+
+def generate_source(rng: random.Random, spec: CorpusSpec, lines: int) -> str:
+    """
+    Generate the contents of one file.
+
+    Args:
+        rng: Random generator
+        spec: Corpus shape
+        lines: Number of lines
+
+    Returns:
+        The file contents
+    """
+    out = ["#include <stdio.h>", "", "int main() {"]
+    indent = 1
+    while len(out) < lines - 1:
+        line = _line(rng, spec, indent)
+        out.append(line)
+        if line.endswith("{"):
+            indent = min(indent + 1, 6)
+        elif line.strip() == "}" and indent > 1:
+            indent -= 1
+    out.append("}")
+    return "\n".join(out[:max(lines, 1)]) + "\n"
+
+
+def generate_corpus(root: str, spec: CorpusSpec) -> List[str]:
+    """
+    Write a synthetic C tree.
+
+    Args:
+        root: Directory to create the files in
+        spec: Corpus shape
+
+    Returns:
+        Paths of the generated files, in generation order
+    """
+    rng = random.Random(spec.seed)
+    paths = []
+    sources = []
+    for index in range(spec.files):
+        level = rng.randint(0, spec.depth) if spec.depth > 0 else 0
+        directory = os.path.join(root, *(f"turma{rng.randint(1, 3)}" for _ in range(level)))
+        paths.append(os.path.join(directory, f"{index + 1}.c"))
+        lines = rng.randint(spec.min_lines, spec.max_lines)
+        sources.append(generate_source(rng, spec, lines).split("\n"))
+
+    # Pathological lines: one unbroken token each, replacing random lines
+    for _ in range(spec.long_lines):
+        lines = rng.choice(sources)
+        token = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789_") for _ in range(spec.long_line_length))
+        lines[rng.randrange(len(lines))] = f"char *s = \"{token}\";"
+
+    for path, lines in zip(paths, sources):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='\n') as file:
+            file.write("\n".join(lines))
+    return paths
@@ -0,0 +1,245 @@
+"""Repeatable benchmarks of PDF generation, line wrapping and natural sorting."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from src.services.instrumentation import Profiler
+from src.services.pdf_generator import LINE_NUMBER_WIDTH, create_exercises_pdf, new_document
+from src.utils import natural_sort_key
+
+# Called once per repetition; returns the work done as {"lines": ..., "pages": ...}
+Workload = Callable[[], Dict[str, int]]
+
+
+def measure(workload: Workload, repeat: int) -> Dict[str, Any]:
+    """
+    Time a workload and measure its peak memory.
+
+    The workload runs `repeat` times untraced for timing and once more under
+    tracemalloc for the peak of Python allocations, so tracing never skews
+    the timings.
+
+    Args:
+        workload: Function doing the work once
+        repeat: Number of timed repetitions
+
+    Returns:
+        Best and median seconds, work units, throughput per unit and peak memory
+    """
+    times = []
+    units: Dict[str, int] = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        units = workload()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        workload()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = min(times)
+    return {
+        "best_seconds": best,
+        "median_seconds": statistics.median(times),
+        "units": units,
+        "throughput": {f"{unit}_per_second": count / best for unit, count in units.items()},
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_create_pdf(corpus: str, output_dir: str, jobs: int) -> Workload:
+    """Build the create_exercises_pdf workload over a corpus."""
+    output_file = os.path.join(output_dir, "bench.pdf")
+
+    def workload() -> Dict[str, int]:
+        profiler = Profiler()
+        create_exercises_pdf(corpus, output_file, jobs=jobs, profiler=profiler)
+        return {
+            "lines": profiler.counters.get("lines", 0),
+            "pages": profiler.counters.get("pages", 0),
+            "bytes": profiler.counters.get("bytes_written", 0),
+        }
+    return workload
+
+
+def bench_wrap_text(lines: List[str]) -> Workload:
+    """Build the CustomPDF.wrap_text_to_lines workload over source lines."""
+    pdf = new_document()
+    max_width = pdf.w - 2 * pdf.l_margin - LINE_NUMBER_WIDTH - 2 * pdf.get_string_width("\t")
+
+    def workload() -> Dict[str, int]:
+        rows = 0
+        for line in lines:
+            rows += len(pdf.wrap_text_to_lines(line, max_width))
+        return {"lines": len(lines), "rows": rows}
+    return workload
+
+
+def bench_natural_sort(names: List[str]) -> Workload:
+    """Build the natural_sort_key workload over file names."""
+    def workload() -> Dict[str, int]:
+        sorted(names, key=natural_sort_key)
+        return {"keys": len(names)}
+    return workload
+
+
+def bench_cli_startup() -> Workload:
+    """Build the workload launching the command line, which only loads the argument parser for --help."""
+    run_py = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run.py")
+
+    def workload() -> Dict[str, int]:
+        subprocess.run([sys.executable, run_py, "--help"], stdout=subprocess.DEVNULL, check=True)
+        return {"launches": 1}
+    return workload
+
+
+def run_benchmarks(spec: CorpusSpec, repeat: int = 3, jobs: int = 1) -> Dict[str, Any]:
+    """
+    Generate a corpus and run every benchmark on it.
+
+    Args:
+        spec: Shape of the synthetic corpus
+        repeat: Timed repetitions per benchmark
+        jobs: Worker processes used by create_exercises_pdf
+
+    Returns:
+        Results keyed by benchmark name, with the environment and corpus spec
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = os.path.join(temp_dir, "corpus")
+        paths = generate_corpus(corpus, spec)
+        lines: List[str] = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as file:
+                lines.extend(file.read().split('\n'))
+        names = [os.path.relpath(path, corpus) for path in paths] * max(1, 20000 // max(len(paths), 1))
+
+        results = {
+            "create_exercises_pdf": measure(bench_create_pdf(corpus, temp_dir, jobs), repeat),
+            "wrap_text_to_lines": measure(bench_wrap_text(lines), repeat),
+            "natural_sort_key": measure(bench_natural_sort(names), repeat),
+            "cli_startup": measure(bench_cli_startup(), repeat),
+        }
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": vars(spec),
+        "jobs": jobs,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        current: Results of this run
+        baseline: Results loaded from a previous run
+        threshold: Relative slowdown of the best time counted as a regression
+
+    Returns:
+        The names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"{'Benchmark':<24}{'Base (s)':>12}{'Atual (s)':>12}{'Variação':>10}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<24}{'-':>12}{result['best_seconds']:>12.4f}{'nova':>10}")
+            continue
+        change = result["best_seconds"] / base["best_seconds"] - 1
+        flag = "  <- regressão" if change > threshold else ""
+        print(f"{name:<24}{base['best_seconds']:>12.4f}{result['best_seconds']:>12.4f}{change:>+10.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    if current.get("corpus") != baseline.get("corpus"):
+        print("Aviso: o corpus da linha de base é diferente; os tempos não são comparáveis.")
+    return regressions
+
+
+def print_results(report: Dict[str, Any]) -> None:
+    """Print one line per benchmark with its timings, throughput and peak memory."""
+    for name, result in report["results"].items():
+        throughput = ", ".join(f"{value:,.0f} {unit.replace('_per_second', '/s')}"
+                               for unit, value in result["throughput"].items())
+        print(
+            f"{name:<24}{result['best_seconds']:>10.4f} s  (mediana {result['median_seconds']:.4f} s)  "
+            f"{throughput}  pico {result['peak_memory_bytes'] / (1024 * 1024):.1f} MB"
+        )
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the benchmark command line."""
+    parser = argparse.ArgumentParser(description="Benchmark PDF generation on a synthetic C corpus")
+    parser.add_argument("--files", type=int, default=200, help="Number of generated .c files")
+    parser.add_argument("--min-lines", type=int, default=20, help="Fewest lines per file")
+    parser.add_argument("--max-lines", type=int, default=400, help="Most lines per file")
+    parser.add_argument("--mean-line-length", type=int, default=30, help="Typical line length")
+    parser.add_argument("--max-line-length", type=int, default=160, help="Longest ordinary line")
+    parser.add_argument("--depth", type=int, default=2, help="Deepest directory level")
+    parser.add_argument("--long-lines", type=int, default=20, help="Pathological unbroken lines")
+    parser.add_argument("--long-line-length", type=int, default=2000, help="Length of each pathological line")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus generator")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per benchmark")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for PDF generation")
+    parser.add_argument("--save", metavar="FILE", help="Write the results to FILE as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against results saved with --save")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Slowdown reported as a regression when comparing (default: 0.10 = 10%%)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the benchmarks from the command line.
+
+    Returns:
+        Exit status: 1 if a regression was found when comparing, 0 otherwise
+    """
+    args = parse_arguments(argv)
+    spec = CorpusSpec(
+        files=args.files,
+        min_lines=args.min_lines,
+        max_lines=args.max_lines,
+        mean_line_length=args.mean_line_length,
+        max_line_length=args.max_line_length,
+        depth=args.depth,
+        long_lines=args.long_lines,
+        long_line_length=args.long_line_length,
+        seed=args.seed,
+    )
+    report = run_benchmarks(spec, args.repeat, args.jobs)
+    print_results(report)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Resultados salvos em: {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 import subprocess
-import os
+import sys
 
 
-if os.path.exists("lista-da-vanessador.spec"):
-    subprocess.run(["pyinstaller", "lista-da-vanessador.spec"])
-
-subprocess.run(["pyinstaller", "--noconfirm", "--onefile", "--windowed","-n","lista-da-vanessador",  "run.py"])
+# One-folder build from the spec file: starts faster, as nothing is unpacked at launch.
+# Pass --onefile for the single executable, which unpacks itself on every launch.
+if "--onefile" in sys.argv[1:]:
+    result = subprocess.run(["pyinstaller", "--noconfirm", "--onefile", "--windowed", "-n", "lista-da-vanessador", "run.py"])
+else:
+    result = subprocess.run(["pyinstaller", "--noconfirm", "--clean", "lista-da-vanessador.spec"])
+# A failed build fails the release workflow
+sys.exit(result.returncode)
@@ -1,5 +1,8 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# One-folder build: the program and its libraries live next to each other in
+# dist/lista-da-vanessador/, so a launch starts at once instead of unpacking a
+# one-file archive to a temporary directory every time.
 
 a = Analysis(
     ['run.py'],
@@ -19,16 +22,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='lista-da-vanessador',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='lista-da-vanessador',
+)
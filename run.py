@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """Entry point for the Lista da Wanessador PDF generator application."""
 
+import multiprocessing
+
 from src.main import main
 
 if __name__ == "__main__":
+    # Needed by the --jobs worker processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
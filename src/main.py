@@ -1,11 +1,290 @@
-"""Main entry point for the PDF generator application."""
+"""
+Main entry point for the PDF generator application.
+
+Only the argument parser is imported up front. fpdf, the batch runner, the
+watcher and Tkinter are imported by the code paths that use them, so a
+headless run never loads (or needs) the GUI, and --help or --clear-cache
+answer without loading fpdf.
+"""
+import argparse
 import os
-from src.services.pdf_generator import create_exercises_pdf
-from src.services.cli import parse_arguments
-from src.services.gui import run_gui
+import sys
+from typing import TYPE_CHECKING, BinaryIO, List, Optional, Tuple
+from src.services.cli import (
+    STANDARD_STREAM, discovery_from_args, exec_config_from_args, parse_arguments, read_limits_from_args,
+)
+from src.services.defaults import DEFAULT_COMPRESSION_LEVEL, DEFAULT_DUPLICATES, default_cache_dir
+from src.services.source_reader import ReadLimits
+
+if TYPE_CHECKING:
+    from src.services.discovery import DiscoveryOptions
+    from src.services.execution import ExecConfig
+    from src.services.render_cache import RenderCache
 
 # oi gente
 
+def watch_and_rebuild(
+    directory: str,
+    output_file: str,
+    jobs: int,
+    cache: Optional["RenderCache"],
+    discovery: "DiscoveryOptions",
+    limits: Optional[ReadLimits] = None,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional["ExecConfig"] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> None:
+    """
+    Regenerate the PDF whenever source files under a directory change.
+
+    Only the changed exercises are rendered again; the others come from the
+    render cache (a temporary one when no cache directory was given).
+    Runs until interrupted with Ctrl+C.
+
+    Args:
+        directory: Directory containing the C files
+        output_file: Path of the PDF to keep up to date
+        jobs: Number of worker processes
+        cache: Render cache to use, if any
+        discovery: Discovery settings; the watcher tracks the files they select
+        limits: Size limits of each source file
+        compression: zlib level of the PDF streams (0 = uncompressed)
+        compact: Write a PDF 1.5 file with object streams
+        toc: Start the PDF with a table of contents
+        execution: Compile (and run) each file with these settings
+        exec_jobs: Compilations run at the same time (0 uses every CPU core)
+        font: TrueType font drawing all the text instead of the core fonts
+        duplicates: What copies of an earlier file become ("share", "reference" or "render")
+    """
+    import tempfile
+
+    from src.services.pdf_generator import create_exercises_pdf
+    from src.services.render_cache import RenderCache
+    from src.services.watcher import SourceWatcher
+
+    with tempfile.TemporaryDirectory() as temp_cache:
+        if cache is None:
+            cache = RenderCache(temp_cache)
+        watcher = SourceWatcher(directory, discovery)
+        mode = "inotify" if watcher.uses_inotify else "polling"
+        print(f"Observando {directory} ({mode}). Pressione Ctrl+C para sair.")
+        try:
+            while True:
+                create_exercises_pdf(
+                    directory, output_file, jobs=jobs, cache=cache, c_files=watcher.files(), limits=limits,
+                    compression=compression, compact=compact, toc=toc, execution=execution, exec_jobs=exec_jobs,
+                    font=font, duplicates=duplicates
+                )
+                print(f"PDF atualizado: {output_file}")
+                changed = watcher.wait_for_changes()
+                names = ", ".join(sorted(os.path.basename(path) for path in changed))
+                print(f"Alterações detectadas: {names}")
+        except KeyboardInterrupt:
+            print("Observação encerrada.")
+        finally:
+            watcher.close()
+
+
+def load_execution(args: argparse.Namespace, directory: str) -> Optional["ExecConfig"]:
+    """
+    Load the compiler settings selected with --exec, exiting on errors.
+
+    Args:
+        args: Parsed command line arguments
+        directory: Directory holding the default configuration file
+
+    Returns:
+        The settings, or None when --exec was not given
+    """
+    try:
+        return exec_config_from_args(args, directory)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler a configuração de compilação: {e}")
+        sys.exit(1)
+
+
+def load_font_arg(args: argparse.Namespace) -> Optional[str]:
+    """
+    Check the TrueType font selected with --font, exiting on errors.
+
+    Loading it also caches its metrics before any worker needs them.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Absolute path of the font, or None when --font was not given
+    """
+    if not args.font:
+        return None
+    from src.services.truetype import FontError, load_font
+
+    path = os.path.abspath(args.font)
+    try:
+        load_font(path)
+    except (OSError, FontError) as e:
+        print(f"Erro ao carregar a fonte {args.font}: {e}")
+        sys.exit(1)
+    return path
+
+
+def read_files_from(args: argparse.Namespace, discovery: "DiscoveryOptions") -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Read the file list selected with --files-from, exiting on errors.
+
+    Args:
+        args: Parsed command line arguments
+        discovery: Filters the listed files must pass
+
+    Returns:
+        Tuple of (common directory of the files, list of (full_path, file_name)
+        tuples in the listed order)
+    """
+    from src.services.sources import listed_sources, read_file_list
+
+    try:
+        if args.files_from == STANDARD_STREAM:
+            root, c_files = listed_sources(read_file_list(sys.stdin), discovery)
+        else:
+            with open(args.files_from, 'r', encoding='utf-8') as file:
+                root, c_files = listed_sources(read_file_list(file), discovery)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Erro ao ler a lista de arquivos: {e}")
+        sys.exit(1)
+    if not c_files:
+        print("Nenhum arquivo da lista foi encontrado.")
+        sys.exit(1)
+    return root, c_files
+
+
+def run_batch_mode(source: str, output_dir: str, args: argparse.Namespace, discovery: "DiscoveryOptions") -> bool:
+    """
+    Generate one PDF per student directory and report each job.
+
+    Args:
+        source: Parent directory of the student directories, or a manifest file
+        output_dir: Directory receiving the PDFs
+        args: Parsed command line arguments
+        discovery: Discovery settings for every input directory
+
+    Returns:
+        True if every job succeeded
+    """
+    from src.services.batch import BatchResult, jobs_from_manifest, jobs_from_parent, run_batch
+
+    if os.path.isdir(source):
+        jobs = jobs_from_parent(source, output_dir)
+    else:
+        jobs = jobs_from_manifest(source, output_dir)
+    print(f"Gerando {len(jobs)} PDFs...")
+
+    def report(result: BatchResult) -> None:
+        if result.success:
+            print(f"OK    {result.job.input_dir} -> {result.job.output_file} ({result.elapsed:.1f} s)")
+        else:
+            print(f"ERRO  {result.job.input_dir}: {result.error}")
+
+    workers = 0 if args.jobs is None else args.jobs
+    results = run_batch(
+        jobs, workers, discovery, args.cache_dir, args.cache_size * 1024 * 1024, on_result=report,
+        limits=read_limits_from_args(args), compression=args.compression, compact=args.compact,
+        toc=args.toc, execution=load_execution(args, source if os.path.isdir(source) else os.path.dirname(source)),
+        exec_jobs=args.exec_jobs, font=load_font_arg(args), duplicates=args.duplicates,
+    )
+    failed = [result for result in results if not result.success]
+    print(f"{len(results) - len(failed)} de {len(results)} PDFs criados com sucesso.")
+    return not failed
+
+
+def run_server(args: argparse.Namespace, discovery: "DiscoveryOptions") -> None:
+    """
+    Serve render jobs on a Unix socket until interrupted.
+
+    Args:
+        args: Parsed command line arguments; their settings apply to every job
+        discovery: Discovery settings for every input directory
+    """
+    import signal
+
+    from src.services.server import RenderServer
+
+    settings = dict(
+        discovery=discovery, cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024,
+        limits=read_limits_from_args(args), compression=args.compression, compact=args.compact, toc=args.toc,
+        execution=load_execution(args, os.getcwd()), exec_jobs=args.exec_jobs, font=load_font_arg(args),
+        duplicates=args.duplicates,
+    )
+    try:
+        server = RenderServer(args.serve, 0 if args.jobs is None else args.jobs, **settings)
+    except OSError as e:
+        print(f"Não foi possível iniciar o servidor em {args.serve}: {e}")
+        sys.exit(1)
+    # Stopped by a service manager like by Ctrl+C, so the socket is removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Servidor ouvindo em {args.serve} ({server.workers} processos). Pressione Ctrl+C para parar.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Servidor encerrado.")
+    finally:
+        server.server_close()
+
+
+def run_client(args: argparse.Namespace, pdf_stream: Optional[BinaryIO] = None) -> bool:
+    """
+    Send the PDF job, or a request for statistics, to a render server.
+
+    Args:
+        args: Parsed command line arguments
+        pdf_stream: Receives the PDF when it is sent back instead of written by the server (-o -)
+
+    Returns:
+        True if the server answered without an error
+    """
+    import json
+
+    from src.services.server import render_message, request
+
+    if args.stats:
+        message = {"op": "stats"}
+    elif not args.directory and not args.files_from or not args.output:
+        print("O modo --connect precisa de -d (ou --files-from) e -o (ou de --stats).")
+        return False
+    else:
+        output_file = None
+        if pdf_stream is None:
+            output_file = args.output if args.output.lower().endswith('.pdf') else args.output + '.pdf'
+        # Only the settings given here; the server's own apply otherwise
+        settings = {name: True for name in ("toc", "compact") if getattr(args, name)}
+        if args.compression != DEFAULT_COMPRESSION_LEVEL:
+            settings["compression"] = args.compression
+        if args.duplicates != DEFAULT_DUPLICATES:
+            settings["duplicates"] = args.duplicates
+        files = None
+        if args.files_from:
+            # The server checks the paths; the filters are applied here, as they are not sent
+            _, c_files = read_files_from(args, discovery_from_args(args))
+            files = [full_path for full_path, _ in c_files]
+        message = render_message(args.directory, output_file, files, **settings)
+    try:
+        response = request(args.connect, message, pdf=pdf_stream)
+    except OSError as e:
+        print(f"Não foi possível falar com o servidor em {args.connect}: {e}")
+        return False
+    if not response.pop("ok", False):
+        print(f"Erro do servidor: {response.get('error')}")
+        return False
+    if args.stats:
+        print(json.dumps(response, indent=2))
+    else:
+        print(f"PDF foi criado com sucesso! ({response['elapsed']:.1f} s)")
+    return True
+
+
 def main() -> None:
     """
     Main function that handles user input and runs the PDF generation process.
@@ -15,15 +294,66 @@ def main() -> None:
     Generates a PDF containing all C source files found in the specified directory.
     """
     args = parse_arguments()
+    pdf_stream: Optional[BinaryIO] = None
+    if args.output == STANDARD_STREAM:
+        # The PDF takes standard output, so every message goes to standard error
+        pdf_stream = sys.stdout.buffer
+        sys.stdout = sys.stderr
+    if args.connect:
+        if not run_client(args, pdf_stream):
+            sys.exit(1)
+        return
+    # Imported after parsing, so --help does not load it
+    from src.services.render_cache import RenderCache
+
+    if args.clear_cache:
+        cache_dir = args.cache_dir or default_cache_dir()
+        RenderCache(cache_dir).clear()
+        print(f"Cache limpo: {cache_dir}")
+        if not args.directory and not args.output:
+            return
+
+    discovery = discovery_from_args(args)
+
+    if args.serve:
+        run_server(args, discovery)
+        return
+
+    if args.batch:
+        if pdf_stream is not None:
+            print("O modo --batch grava um PDF por aluno e precisa de um diretório em -o.")
+            sys.exit(1)
+        output_dir = os.path.abspath(args.output or ".")
+        if not run_batch_mode(os.path.abspath(args.batch), output_dir, args, discovery):
+            sys.exit(1)
+        return
+
+    cache = None
+    if args.cache_dir:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
 
     # Launch GUI by default when no directory or output is provided
-    if not args.directory and not args.output or args.gui:
+    if not args.directory and not args.output and not args.files_from or args.gui:
+        try:
+            from src.services.gui import run_gui
+        except ImportError as e:
+            # e.g. Python built without Tk, as on many CI images
+            print(f"Interface gráfica indisponível ({e}). Use -d e -o para gerar o PDF pela linha de comando.")
+            sys.exit(1)
         run_gui()
         return
 
     # CLI mode with arguments
+    c_files = None
+    if args.files_from:
+        if not args.output:
+            print("O modo --files-from precisa de -o (use -o - para escrever o PDF na saída padrão).")
+            sys.exit(1)
+        root, c_files = read_files_from(args, discovery)
+        # -d, when given, is the root of the table of contents
+        pasta_exercicios = os.path.abspath(args.directory or root)
     # Get directory from args
-    if args.directory:
+    elif args.directory:
         pasta_exercicios = os.path.abspath(args.directory)
     else:
         pasta_exercicios = input("Digite o caminho da pasta com os exercícios: ")
@@ -36,14 +366,61 @@ def main() -> None:
         nome_arquivo_saida = input("Digite o nome do arquivo PDF de saída: ")
 
     # Ensure the output file has .pdf extension
-    if not nome_arquivo_saida.lower().endswith('.pdf'):
+    if pdf_stream is None and not nome_arquivo_saida.lower().endswith('.pdf'):
         nome_arquivo_saida += '.pdf'
 
-    success = create_exercises_pdf(pasta_exercicios, nome_arquivo_saida)
+    jobs = 1 if args.jobs is None else args.jobs
+    limits = read_limits_from_args(args)
+    execution = load_execution(
+        args, pasta_exercicios if os.path.isdir(pasta_exercicios) else os.path.dirname(pasta_exercicios)
+    )
+    font = load_font_arg(args)
+
+    if args.watch:
+        if c_files is not None or pdf_stream is not None:
+            print("O modo --watch não aceita --files-from nem -o -.")
+            sys.exit(1)
+        if not os.path.isdir(pasta_exercicios):
+            print("O modo --watch precisa de um diretório, não de um arquivo compactado.")
+            sys.exit(1)
+        watch_and_rebuild(
+            pasta_exercicios, nome_arquivo_saida, jobs, cache, discovery, limits, args.compression, args.compact,
+            args.toc, execution, args.exec_jobs, font, args.duplicates
+        )
+        return
+
+    from src.services.instrumentation import Profiler
+    from src.services.pdf_generator import create_exercises_pdf
+
+    profiler = Profiler() if args.profile or args.profile_json else None
+    try:
+        success = create_exercises_pdf(
+            pasta_exercicios, pdf_stream or nome_arquivo_saida, jobs=jobs, cache=cache, c_files=c_files,
+            discovery=discovery, profiler=profiler, limits=limits, prefetch=args.prefetch,
+            compression=args.compression, compact=args.compact, toc=args.toc, execution=execution,
+            exec_jobs=args.exec_jobs, font=font, duplicates=args.duplicates
+        )
+    except BrokenPipeError:
+        if pdf_stream is None:
+            raise
+        # The reader of standard output (e.g. `| head`) went away; the unwritten bytes are dropped at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), pdf_stream.fileno())
+        print("A saída padrão foi fechada antes do fim do PDF.")
+        sys.exit(1)
 
     if success:
-        print(f"Procurando arquivos .c em: {pasta_exercicios}")
+        if c_files is None:
+            print(f"Procurando arquivos .c em: {pasta_exercicios}")
         print("PDF foi criado com sucesso!")
+        if cache is not None:
+            print(f"Cache: {cache.hits} exercícios reutilizados, {cache.misses} renderizados")
+        if profiler is not None:
+            profiler.finish()
+            if args.profile:
+                print(profiler.format_report())
+            if args.profile_json:
+                profiler.write_json(args.profile_json)
+                print(f"Perfil salvo em: {args.profile_json}")
     else:
         print("Ocorreu um erro ao gerar o PDF.")
 
@@ -0,0 +1,174 @@
+"""Source files read straight from zip and tar archives, without extracting them."""
+import os
+import tarfile
+import zipfile
+import zlib
+from typing import Dict, Optional, Union
+
+from src.services.discovery import DiscoveryOptions
+from src.services.source_reader import ReadLimits, SourceSet
+from src.utils import document_order_key
+
+# Extensions of the archives looked for among batch inputs
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Metadata directories added by archivers, never holding sources
+ARCHIVE_EXCLUDED_DIRS = frozenset({"__MACOSX"})
+
+
+def is_archive(path: str) -> bool:
+    """
+    Tell whether a path is a zip or tar archive (compressed or not).
+
+    Args:
+        path: Path given as the input directory
+
+    Returns:
+        True for a regular file that zipfile or tarfile can open
+    """
+    if not os.path.isfile(path):
+        return False
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+
+def member_path(name: str) -> Optional[str]:
+    """
+    Normalize the name of an archive member into a relative path.
+
+    Args:
+        name: Member name as stored in the archive
+
+    Returns:
+        The path with `/` separators, or None for names that climb out of the archive
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or '..' in parts:
+        return None
+    return '/'.join(parts)
+
+
+def wants_member(relative_path: str, options: DiscoveryOptions) -> bool:
+    """
+    Apply the discovery filters to an archive member.
+
+    Directories are checked like discover_sources prunes them: any excluded
+    directory on the way, or a path deeper than max_depth, drops the member.
+
+    Args:
+        relative_path: Normalized member path
+        options: Filters to apply
+
+    Returns:
+        True if the member is a source file to print
+    """
+    parts = relative_path.split('/')
+    if options.max_depth is not None and len(parts) - 1 > options.max_depth:
+        return False
+    for depth in range(1, len(parts)):
+        name = parts[depth - 1]
+        if name in ARCHIVE_EXCLUDED_DIRS or not options.wants_dir(name, '/'.join(parts[:depth])):
+            return False
+    return options.wants_file(parts[-1], relative_path)
+
+
+class SourceArchive(SourceSet):
+    """
+    The source files of a zip or tar archive.
+
+    Zip members are listed from the central directory and decompressed one
+    by one when read, so they can be read in any order. Tar archives have
+    no index and compressed ones cannot seek, so the wanted members are read
+    in one pass when the archive is opened. Members are referred to by the
+    path they would have if the archive were extracted in place, e.g.
+    `lista.zip/turma1/1.c`, so the rest of the pipeline treats the archive
+    as a directory.
+
+    .gitignore files are not applied inside archives.
+    """
+
+    def __init__(
+        self, path: str, options: Optional[DiscoveryOptions] = None, limits: Optional[ReadLimits] = None
+    ) -> None:
+        """
+        Open the archive and list its source files.
+
+        Args:
+            path: Path to the archive
+            options: Filters applied to the members (defaults to .c files)
+            limits: Size limits of each file; bigger members are only read up to the byte limit
+
+        Raises:
+            OSError: If the archive cannot be read
+            zipfile.BadZipFile, tarfile.TarError: If the archive is corrupt
+        """
+        super().__init__(path, limits)
+        options = options or DiscoveryOptions()
+        self._zip: Optional[zipfile.ZipFile] = None
+        # Full path -> zip entry, or the contents read from a tar archive
+        self._entries: Dict[str, Union[zipfile.ZipInfo, bytes]] = {}
+        self._sizes: Dict[str, int] = {}
+        found: Dict[str, str] = {}
+
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                relative = member_path(info.filename)
+                if info.is_dir() or relative is None or not wants_member(relative, options):
+                    continue
+                full_path = self._full_path(relative)
+                found[full_path] = relative
+                self._entries[full_path] = info
+                self._sizes[full_path] = info.file_size
+        else:
+            # Stream mode never seeks back, so compressed archives are decompressed once
+            with tarfile.open(path, 'r|*') as tar:
+                for member in tar:
+                    relative = member_path(member.name)
+                    if not member.isfile() or relative is None or not wants_member(relative, options):
+                        continue
+                    file = tar.extractfile(member)
+                    if file is None:
+                        continue
+                    full_path = self._full_path(relative)
+                    found[full_path] = relative
+                    self._entries[full_path] = file.read(self._read_size)
+                    self._sizes[full_path] = member.size
+
+        ordered = sorted(found.items(), key=lambda item: document_order_key(item[1]))
+        self.files = [(full_path, relative.rsplit('/', 1)[-1]) for full_path, relative in ordered]
+
+    def close(self) -> None:
+        """Close the archive file."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def size(self, full_path: str) -> int:
+        """Return the uncompressed size of a member, or 0 if it is not in the archive."""
+        return self._sizes.get(full_path, 0)
+
+    def read_bytes(self, full_path: str) -> Optional[bytes]:
+        """
+        Read the beginning of a member, up to the byte limit.
+
+        Safe to call from several threads.
+
+        Args:
+            full_path: Path of the member, as listed in files
+
+        Returns:
+            The contents, or None if the member is missing or cannot be
+            decompressed (e.g. it is encrypted)
+        """
+        entry = self._entries.get(full_path)
+        if entry is None or isinstance(entry, bytes):
+            return entry
+        if self._zip is None:
+            return None
+        try:
+            with self._zip.open(entry) as file:
+                return file.read(self._read_size)
+        except (OSError, RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error):
+            return None
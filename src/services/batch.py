@@ -0,0 +1,265 @@
+"""Batch generation of many PDFs (one per student directory) in one invocation."""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
+from src.services.archive import ARCHIVE_SUFFIXES, is_archive
+from src.services.discovery import DiscoveryOptions
+from src.services.execution import ExecConfig
+from src.services.defaults import DEFAULT_COMPRESSION_LEVEL, DEFAULT_DUPLICATES
+from src.services.pdf_generator import create_exercises_pdf
+from src.services.render_cache import DEFAULT_CACHE_SIZE, RenderCache
+from src.services.source_reader import ReadLimits
+from src.utils import natural_sort_key
+
+
+class BatchJob:
+    """One directory to turn into one PDF."""
+
+    __slots__ = ("input_dir", "output_file", "files")
+
+    def __init__(self, input_dir: str, output_file: str, files: Optional[List[str]] = None) -> None:
+        """
+        Initialize the job.
+
+        Args:
+            input_dir: Directory or archive containing the C files
+            output_file: Path of the PDF to create
+            files: Paths of the files to print, in this order, instead of
+                scanning input_dir; input_dir is then only their common root
+        """
+        self.input_dir = input_dir
+        self.output_file = output_file
+        self.files = files
+
+    def __repr__(self) -> str:
+        """Return a readable representation of the job."""
+        return f"BatchJob({self.input_dir!r}, {self.output_file!r})"
+
+
+class BatchResult:
+    """Outcome of a BatchJob."""
+
+    __slots__ = ("job", "success", "error", "elapsed")
+
+    def __init__(self, job: BatchJob, success: bool, error: str = "", elapsed: float = 0.0) -> None:
+        """
+        Initialize the result.
+
+        Args:
+            job: The job that ran
+            success: Whether the PDF was created
+            error: Error message when the job failed
+            elapsed: Wall-clock seconds spent on the job
+        """
+        self.job = job
+        self.success = success
+        self.error = error
+        self.elapsed = elapsed
+
+
+def _pdf_name(path: str) -> str:
+    """Derive an output file name from a directory or archive path."""
+    return _input_name(os.path.basename(os.path.normpath(path))) + ".pdf"
+
+
+def _input_name(name: str) -> str:
+    """Strip the archive extension, if any, from an input name."""
+    lower = name.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def jobs_from_parent(parent_dir: str, output_dir: str) -> List[BatchJob]:
+    """
+    Create one job per immediate subdirectory or archive of a parent directory.
+
+    Args:
+        parent_dir: Directory holding one subdirectory or archive per student
+        output_dir: Directory receiving <name>.pdf for each job
+
+    Returns:
+        The jobs, in natural order of the subdirectory and archive names
+    """
+    with os.scandir(parent_dir) as scan:
+        names = [
+            entry.name for entry in scan
+            if not entry.name.startswith('.')
+            and (entry.is_dir() or entry.name.lower().endswith(ARCHIVE_SUFFIXES) and is_archive(entry.path))
+        ]
+    names.sort(key=natural_sort_key)
+    return [
+        BatchJob(os.path.join(parent_dir, name), os.path.join(output_dir, _input_name(name) + ".pdf"))
+        for name in names
+    ]
+
+
+def jobs_from_manifest(manifest_file: str, output_dir: str) -> List[BatchJob]:
+    """
+    Read jobs from a manifest file.
+
+    A .json manifest is an object mapping input directories to output PDFs.
+    Any other file has one job per line: the input directory, optionally
+    followed by a tab and the output PDF; blank lines and lines starting
+    with '#' are skipped. Relative input paths are resolved against the
+    manifest's directory, relative outputs against output_dir.
+
+    Args:
+        manifest_file: Path to the manifest
+        output_dir: Directory for relative or omitted output paths
+
+    Returns:
+        The jobs, in manifest order
+    """
+    base = os.path.dirname(os.path.abspath(manifest_file))
+    with open(manifest_file, 'r', encoding='utf-8') as file:
+        if manifest_file.lower().endswith('.json'):
+            pairs = list(json.load(file).items())
+        else:
+            pairs = []
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                input_dir, _, output_file = line.partition('\t')
+                pairs.append((input_dir.strip(), output_file.strip()))
+    jobs = []
+    for input_dir, output_file in pairs:
+        input_dir = os.path.join(base, os.path.expanduser(input_dir))
+        output_file = output_file or _pdf_name(input_dir)
+        if not output_file.lower().endswith('.pdf'):
+            output_file += '.pdf'
+        jobs.append(BatchJob(input_dir, os.path.join(output_dir, os.path.expanduser(output_file))))
+    return jobs
+
+
+def run_job(
+    job: BatchJob,
+    discovery: Optional[DiscoveryOptions] = None,
+    cache_dir: Optional[str] = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    limits: Optional[ReadLimits] = None,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> BatchResult:
+    """
+    Run one job, turning any failure into a failed result.
+
+    Args:
+        job: The job to run
+        discovery: Discovery settings for the input directory
+        cache_dir: Render cache directory shared by the jobs, if any
+        cache_size: Maximum size of the render cache in bytes
+        limits: Size limits of each source file
+        compression: zlib level of the PDF streams (0 = uncompressed)
+        compact: Write PDF 1.5 files with object streams
+        toc: Start each PDF with a table of contents
+        execution: Compile (and run) every file with these settings
+        exec_jobs: Compilations run at the same time by each job (0 uses every CPU core)
+        font: TrueType font drawing all the text instead of the core fonts
+        duplicates: What copies of an earlier file of a PDF become ("share",
+            "reference" or "render")
+
+    Returns:
+        The result of the job
+    """
+    start = time.perf_counter()
+    try:
+        if not os.path.isdir(job.input_dir) and not is_archive(job.input_dir):
+            raise FileNotFoundError(f"Directory '{job.input_dir}' does not exist.")
+        output_dir = os.path.dirname(job.output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        cache = RenderCache(cache_dir, cache_size) if cache_dir else None
+        c_files = None
+        if job.files is not None:
+            c_files = [(path, os.path.basename(path)) for path in job.files]
+        success = create_exercises_pdf(
+            job.input_dir, job.output_file, cache=cache, c_files=c_files, discovery=discovery, limits=limits,
+            compression=compression, compact=compact, toc=toc,
+            execution=execution, exec_jobs=exec_jobs, font=font, duplicates=duplicates
+        )
+        error = "" if success else "PDF generation failed"
+    except Exception as e:
+        success = False
+        error = str(e) or type(e).__name__
+    return BatchResult(job, success, error, time.perf_counter() - start)
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    workers: int = 0,
+    discovery: Optional[DiscoveryOptions] = None,
+    cache_dir: Optional[str] = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+    limits: Optional[ReadLimits] = None,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> List[BatchResult]:
+    """
+    Generate every job's PDF from a pool of worker processes.
+
+    Each worker imports fpdf and sets up fonts once and then serves many
+    jobs. A failing job is reported and never stops the others.
+
+    Args:
+        jobs: The jobs to run
+        workers: Number of worker processes (0 uses every CPU core)
+        discovery: Discovery settings for every input directory
+        cache_dir: Render cache directory shared by the jobs, if any
+        cache_size: Maximum size of the render cache in bytes
+        on_result: Called with each result as soon as its job finishes
+        limits: Size limits of each source file
+        compression: zlib level of the PDF streams (0 = uncompressed)
+        compact: Write PDF 1.5 files with object streams
+        toc: Start each PDF with a table of contents
+        execution: Compile (and run) every file with these settings
+        exec_jobs: Compilations run at the same time by each job (0 uses every CPU core)
+        font: TrueType font drawing all the text instead of the core fonts
+        duplicates: What copies of an earlier file of a PDF become ("share",
+            "reference" or "render")
+
+    Returns:
+        The results, in the same order as the jobs
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    results: List[Optional[BatchResult]] = [None] * len(jobs)
+    # Arguments of run_job after the job itself
+    settings = (discovery, cache_dir, cache_size, limits, compression, compact, toc, execution, exec_jobs, font, duplicates)
+
+    if workers == 1:
+        for i, job in enumerate(jobs):
+            results[i] = run_job(job, *settings)
+            if on_result is not None:
+                on_result(results[i])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job, *settings): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. out of memory)
+                    result = BatchResult(jobs[i], False, str(e) or type(e).__name__)
+                results[i] = result
+                if on_result is not None:
+                    on_result(result)
+    return [result for result in results if result is not None]
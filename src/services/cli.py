@@ -1,7 +1,20 @@
 """Command-line interface for the PDF generator application."""
 import os
 import argparse
-from typing import Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from src.services.defaults import (
+    DEFAULT_CACHE_SIZE, DEFAULT_COMPRESSION_LEVEL, DEFAULT_DUPLICATES, DEFAULT_PREFETCH, DUPLICATE_MODES,
+    EXEC_CONFIG_NAME, default_cache_dir,
+)
+from src.services.source_reader import DEFAULT_MAX_BYTES, DEFAULT_MAX_LINES, ReadLimits
+
+if TYPE_CHECKING:
+    from src.services.discovery import DiscoveryOptions
+    from src.services.execution import ExecConfig
+
+# Value of -o and --files-from meaning standard output or input
+STANDARD_STREAM = "-"
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -16,11 +29,186 @@ def parse_arguments() -> argparse.Namespace:
     )
     parser.add_argument(
         "-d", "--directory",
-        help="Directory containing C source files to include in the PDF"
+        help="Directory containing C source files to include in the PDF, or a .zip/.tar(.gz, .bz2, .xz) "
+             "archive read without extracting it"
     )
     parser.add_argument(
         "-o", "--output",
-        help="Output PDF filename"
+        help="Output PDF filename ('-' writes the PDF to standard output, and messages to standard error)"
+    )
+    parser.add_argument(
+        "--files-from",
+        metavar="FILE",
+        help="Print the files listed in FILE, one path per line ('-' reads standard input, e.g. from "
+             "find or git diff --name-only), in that order instead of scanning -d; files that do not "
+             "exist or do not pass --ext/--include/--exclude are skipped"
+    )
+    parser.add_argument(
+        "--ext",
+        action="append",
+        metavar="EXT",
+        help="File extension or exact file name to include, e.g. .h or Makefile "
+             "(repeatable or comma-separated; default: .c)"
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only include files whose relative path matches this glob (repeatable)"
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip files and directories matching this glob, e.g. 'build' (repeatable)"
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="Deepest subdirectory level to scan (0 = only the given directory)"
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Do not honour .gitignore files while scanning"
+    )
+    parser.add_argument(
+        "--follow-symlinks",
+        action="store_true",
+        help="Descend into symlinked directories (cycles are detected and skipped)"
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Truncate source files after this many MB (0 = no limit)"
+    )
+    parser.add_argument(
+        "--max-lines",
+        type=int,
+        default=DEFAULT_MAX_LINES,
+        help="Truncate source files after this many lines (0 = no limit)"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="Number of worker processes (0 = all CPU cores; default: 1, "
+             "or all cores with --batch)"
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=DEFAULT_PREFETCH,
+        metavar="K",
+        help="Read and decode the next K files on background threads while rendering "
+             "serially (0 = off)"
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        choices=range(10),
+        default=DEFAULT_COMPRESSION_LEVEL,
+        metavar="LEVEL",
+        help="Compression level of the PDF streams, from 1 (fastest) to 9 (smallest); "
+             f"0 = uncompressed (default: {DEFAULT_COMPRESSION_LEVEL})"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write a smaller PDF 1.5 file, packing objects into compressed object streams"
+    )
+    parser.add_argument(
+        "--exec",
+        nargs="?",
+        const="",
+        metavar="CONFIG",
+        help="Compile each file with the settings of CONFIG (default: the input directory's "
+             f"{EXEC_CONFIG_NAME}), run it if runAfterCompile is set, and print the compiler and "
+             "program output after its code"
+    )
+    parser.add_argument(
+        "--exec-jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Number of compilations and runs at the same time (default: 0 = every CPU core)"
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=DUPLICATE_MODES,
+        default=DEFAULT_DUPLICATES,
+        help="What files with the same contents as an earlier file become: the same pages sharing "
+             "one rendering (share), a page pointing at the earlier file (reference), or a new "
+             f"rendering (render) (default: {DEFAULT_DUPLICATES})"
+    )
+    parser.add_argument(
+        "--font",
+        metavar="TTF",
+        help="Draw all the text with this TrueType font instead of the built-in fonts, so any "
+             "character it has is printed; only the glyphs used are embedded"
+    )
+    parser.add_argument(
+        "--toc",
+        action="store_true",
+        help="Start the PDF with a clickable table of contents"
+    )
+    parser.add_argument(
+        "-b", "--batch",
+        metavar="PATH",
+        help="Generate one PDF per subdirectory of PATH, or per line of the manifest file PATH "
+             "(input directory, optionally followed by a tab and the output PDF); "
+             "-o is then the output directory"
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="SOCKET",
+        help="Run a render server on the Unix socket SOCKET, keeping -j warm worker processes; "
+             "the other options apply to every job it runs"
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="SOCKET",
+        help="Have the render server on SOCKET generate the PDF (-d and -o) instead of this process"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="With --connect, print the server's queue depth, job counts and latencies as JSON"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        nargs="?",
+        const=default_cache_dir(),
+        help="Reuse rendered pages of unchanged files from this cache directory "
+             "(default location when given without a value)"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Maximum size of the render cache in MB"
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove every entry from the render cache before running"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a table of per-phase timings, counters and the slowest files"
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="Write per-phase timings, counters and per-file profiles to FILE as JSON"
+    )
+    parser.add_argument(
+        "-w", "--watch",
+        action="store_true",
+        help="Keep running and regenerate the PDF whenever a source file changes"
     )
     parser.add_argument(
         "-g", "--gui",
@@ -30,6 +218,79 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def extensions_from_args(args: argparse.Namespace) -> List[str]:
+    """
+    Collect the file extensions selected with --ext.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        List of extensions and file names, ['.c'] when none were given
+    """
+    if not args.ext:
+        return ['.c']
+    return [ext.strip() for value in args.ext for ext in value.split(',') if ext.strip()]
+
+
+def discovery_from_args(args: argparse.Namespace) -> "DiscoveryOptions":
+    """
+    Build the discovery settings selected with --ext, --include, --exclude and the scan options.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        The discovery settings
+    """
+    from src.services.discovery import DiscoveryOptions
+    return DiscoveryOptions(
+        extensions=extensions_from_args(args),
+        include=args.include,
+        exclude=args.exclude,
+        use_gitignore=not args.no_gitignore,
+        max_depth=args.max_depth,
+        follow_symlinks=args.follow_symlinks,
+    )
+
+
+def read_limits_from_args(args: argparse.Namespace) -> ReadLimits:
+    """
+    Build the read limits selected with --max-file-size and --max-lines.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        The limits, with 0 meaning no limit
+    """
+    return ReadLimits(
+        max_bytes=args.max_file_size * 1024 * 1024 or None,
+        max_lines=args.max_lines or None,
+    )
+
+
+def exec_config_from_args(args: argparse.Namespace, directory: str) -> Optional["ExecConfig"]:
+    """
+    Load the compiler settings selected with --exec.
+    
+    Args:
+        args: Parsed command line arguments
+        directory: Directory holding the default configuration file
+        
+    Returns:
+        The settings, or None when --exec was not given
+        
+    Raises:
+        OSError: If the configuration file cannot be read
+        ValueError: If it is not a valid configuration
+    """
+    if args.exec is None:
+        return None
+    from src.services.execution import load_exec_config
+    return load_exec_config(args.exec or os.path.join(directory, EXEC_CONFIG_NAME))
+
+
 def get_user_input() -> Tuple[str, str]:
     """
     Get user input for the source directory and output file.
@@ -0,0 +1,29 @@
+"""
+Default settings shared by the command line and the generator.
+
+This module only imports os, so the command line can build its parser
+(and answer --help) without loading fpdf or Tkinter.
+"""
+import os
+
+# Files read ahead of the renderer by default
+DEFAULT_PREFETCH = 8
+# zlib level of the streams written by default (0 = uncompressed, 9 = smallest)
+DEFAULT_COMPRESSION_LEVEL = 6
+# Name of the compiler settings file looked for in the input directory
+EXEC_CONFIG_NAME = "CExecConfig.json"
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+# What files repeating an earlier file of the document become
+DUPLICATE_MODES = ("share", "reference", "render")
+DEFAULT_DUPLICATES = "share"
+
+
+def default_cache_dir() -> str:
+    """
+    Get the default cache location for the current user.
+
+    Returns:
+        $XDG_CACHE_HOME/lista-da-vanessador, or ~/.cache/lista-da-vanessador
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lista-da-vanessador")
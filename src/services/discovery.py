@@ -0,0 +1,358 @@
+"""Source file discovery: a pruned, parallel scan of a directory tree."""
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+from src.utils import document_order_key
+
+# Version-control metadata never contains sources worth printing
+ALWAYS_EXCLUDED_DIRS = frozenset({".git", ".hg", ".svn"})
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a glob pattern into a regular expression.
+
+    `*` and `?` do not cross `/`, `**` matches any number of directories and
+    `[...]` character classes are kept.
+
+    Args:
+        pattern: Glob pattern using `/` as separator
+
+    Returns:
+        Regular expression source matching a whole relative path
+    """
+    regex = []
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        if char == '*':
+            if pattern[i:i + 3] == '**/':
+                regex.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                regex.append('.*')
+                i += 2
+                continue
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', ']') else i + 1)
+            if end == -1:
+                regex.append('\\[')
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = end
+        elif char == '\\' and i + 1 < length:
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return ''.join(regex)
+
+
+def compile_path_glob(pattern: str) -> Pattern[str]:
+    """
+    Compile an include/exclude glob.
+
+    Patterns without a `/` match the file or directory name at any depth;
+    the others match the path relative to the scanned root.
+
+    Args:
+        pattern: Glob pattern
+
+    Returns:
+        Compiled regular expression for relative paths
+    """
+    pattern = pattern.strip('/')
+    if '/' not in pattern:
+        pattern = '**/' + pattern
+    return re.compile(glob_to_regex(pattern) + r'\Z')
+
+
+class IgnoreRule:
+    """One pattern from a .gitignore file."""
+
+    __slots__ = ("regex", "negated", "dir_only")
+
+    def __init__(self, line: str, base: str) -> None:
+        """
+        Parse a .gitignore line.
+
+        Args:
+            line: Non-empty, non-comment pattern line
+            base: Relative path of the directory holding the .gitignore ('' for the root)
+        """
+        self.negated = line.startswith('!')
+        if self.negated:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        self.dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line
+        line = line.lstrip('/')
+        if not anchored:
+            line = '**/' + line
+        prefix = re.escape(base + '/') if base else ''
+        self.regex = re.compile(prefix + glob_to_regex(line) + r'\Z')
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        """Return True when the rule applies to a relative path."""
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(relative_path) is not None
+
+
+def parse_gitignore(path: str, base: str) -> List[IgnoreRule]:
+    """
+    Read the rules of a .gitignore file.
+
+    Args:
+        path: Path to the .gitignore file
+        base: Relative path of its directory ('' for the root)
+
+    Returns:
+        The parsed rules, in file order (empty if the file cannot be read)
+    """
+    rules = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                line = line.rstrip('\n').rstrip('\r')
+                if not line.endswith('\\ '):
+                    line = line.rstrip(' ')
+                if line and not line.startswith('#'):
+                    rules.append(IgnoreRule(line, base))
+    except OSError:
+        pass
+    return rules
+
+
+def is_ignored(rules: Sequence[IgnoreRule], relative_path: str, is_dir: bool) -> bool:
+    """
+    Apply .gitignore rules to a path; the last matching rule wins.
+
+    Args:
+        rules: Rules in precedence order (parent directories first)
+        relative_path: Path relative to the scanned root
+        is_dir: Whether the path is a directory
+
+    Returns:
+        True if the path is ignored
+    """
+    ignored = False
+    for rule in rules:
+        if rule.negated == ignored and rule.matches(relative_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+class DiscoveryOptions:
+    """Settings controlling which files discover_sources returns."""
+
+    def __init__(
+        self,
+        extensions: Iterable[str] = ('.c',),
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        use_gitignore: bool = True,
+        max_depth: Optional[int] = None,
+        follow_symlinks: bool = False,
+        workers: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the discovery options.
+
+        Args:
+            extensions: Suffixes such as '.c' or '.h', or exact file names such as 'Makefile'
+            include: Globs a file must match (any of them) to be listed
+            exclude: Globs of files and directories to skip; directories are pruned
+            use_gitignore: Honour .gitignore files found while scanning
+            max_depth: Deepest directory level to enter (0 = only the root)
+            follow_symlinks: Descend into symlinked directories, skipping cycles
+            workers: Threads scanning subtrees in parallel (None picks a default)
+        """
+        extensions = tuple(extensions)
+        self.suffixes = tuple(ext for ext in extensions if ext.startswith('.'))
+        self.names = frozenset(ext for ext in extensions if not ext.startswith('.'))
+        self.include = [compile_path_glob(pattern) for pattern in include]
+        self.exclude = [compile_path_glob(pattern) for pattern in exclude]
+        self.use_gitignore = use_gitignore
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self.workers = workers if workers is not None else min(8, (os.cpu_count() or 1) + 2)
+
+    def wants_file(self, name: str, relative_path: str) -> bool:
+        """Return True when a file passes the extension and include/exclude filters."""
+        if not (name in self.names or name.endswith(self.suffixes)):
+            return False
+        if self.include and not any(regex.match(relative_path) for regex in self.include):
+            return False
+        return not any(regex.match(relative_path) for regex in self.exclude)
+
+    def wants_dir(self, name: str, relative_path: str) -> bool:
+        """Return True when a directory should be descended into."""
+        if name in ALWAYS_EXCLUDED_DIRS:
+            return False
+        return not any(regex.match(relative_path) for regex in self.exclude)
+
+
+# (absolute path, relative path, depth, inherited .gitignore rules)
+DirectoryJob = Tuple[str, str, int, Tuple[IgnoreRule, ...]]
+
+
+class DirectoryScanner:
+    """
+    Scan one tree a directory at a time, sharing the symlink-cycle bookkeeping between threads.
+
+    Besides discover_sources, the watcher uses it to rescan single
+    directories with the same filters and .gitignore pruning.
+    """
+
+    def __init__(self, options: DiscoveryOptions) -> None:
+        """
+        Initialize the scanner.
+
+        Args:
+            options: Filters and traversal settings
+        """
+        self.options = options
+        self._visited: Set[Tuple[int, int]] = set()
+        self._lock = threading.Lock()
+
+    def first_visit(self, path: str) -> bool:
+        """Record a directory by device and inode; False if it was already seen."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        identity = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            if identity in self._visited:
+                return False
+            self._visited.add(identity)
+        return True
+
+    def rules(self, job: DirectoryJob) -> Tuple[IgnoreRule, ...]:
+        """
+        Get the .gitignore rules in effect inside a directory.
+
+        Args:
+            job: Directory to scan
+
+        Returns:
+            The inherited rules followed by those of its own .gitignore, if any
+        """
+        path, relative, _, rules = job
+        if self.options.use_gitignore:
+            gitignore = os.path.join(path, '.gitignore')
+            if os.path.isfile(gitignore):
+                rules = rules + tuple(parse_gitignore(gitignore, relative))
+        return rules
+
+    def scan(
+        self, job: DirectoryJob, rules: Optional[Tuple[IgnoreRule, ...]] = None
+    ) -> Tuple[List[Tuple[str, str]], List[DirectoryJob]]:
+        """
+        List one directory.
+
+        Args:
+            job: Directory to scan
+            rules: Rules in effect inside it, when already read with rules()
+
+        Returns:
+            Tuple of (matching files as (relative_path, full_path), subdirectories to scan)
+        """
+        path, relative, depth, _ = job
+        options = self.options
+        if rules is None:
+            rules = self.rules(job)
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as scan:
+                entries = list(scan)
+        except OSError:
+            return files, subdirs
+        for entry in entries:
+            entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if options.max_depth is not None and depth + 1 > options.max_depth:
+                    continue
+                if not options.wants_dir(entry.name, entry_relative):
+                    continue
+                if rules and is_ignored(rules, entry_relative, True):
+                    continue
+                if entry.is_symlink():
+                    if not options.follow_symlinks or not self.first_visit(entry.path):
+                        continue
+                elif options.follow_symlinks and not self.first_visit(entry.path):
+                    continue
+                subdirs.append((entry.path, entry_relative, depth + 1, rules))
+            elif options.wants_file(entry.name, entry_relative):
+                if rules and is_ignored(rules, entry_relative, False):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                files.append((entry_relative, entry.path))
+        return files, subdirs
+
+
+def discover_sources(root: str, options: Optional[DiscoveryOptions] = None) -> List[Tuple[str, str]]:
+    """
+    Find the source files under a directory.
+
+    Subtrees are scanned in parallel with os.scandir; excluded and ignored
+    directories are pruned without being entered. The result is one
+    manifest in document order: the files of a directory, naturally sorted,
+    come before the contents of its subdirectories.
+
+    Args:
+        root: Directory to scan
+        options: Filters and traversal settings (defaults to .c files)
+
+    Returns:
+        List of (full_path, file_name) tuples in document order
+    """
+    options = options or DiscoveryOptions()
+    scanner = DirectoryScanner(options)
+    if options.follow_symlinks:
+        scanner.first_visit(root)
+    found: List[Tuple[str, str]] = []
+    first: DirectoryJob = (root, '', 0, ())
+
+    if options.workers <= 1:
+        stack = [first]
+        while stack:
+            files, subdirs = scanner.scan(stack.pop())
+            found.extend(files)
+            stack.extend(subdirs)
+    else:
+        with ThreadPoolExecutor(max_workers=options.workers) as executor:
+            pending: Set[Future] = {executor.submit(scanner.scan, first)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    found.extend(files)
+                    pending.update(executor.submit(scanner.scan, subdir) for subdir in subdirs)
+
+    found.sort(key=lambda item: document_order_key(item[0]))
+    return [(full_path, os.path.basename(full_path)) for _, full_path in found]
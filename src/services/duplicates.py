@@ -0,0 +1,74 @@
+"""Find source files with identical contents, so each body is rendered once per document."""
+import hashlib
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.services.source_reader import ReadLimits, SourceSet, detect_encoding
+
+# Files hashed at the same time; reads and hashing of large buffers release the GIL
+HASH_THREADS = 8
+
+
+def content_digest(
+    full_path: str, archive: Optional[SourceSet] = None, limits: Optional[ReadLimits] = None
+) -> Optional[str]:
+    """
+    Hash the contents of a source file.
+
+    Binary files get no digest: the note printed instead of their code
+    names the file, so two copies do not render alike.
+
+    Args:
+        full_path: Path to the source file, or of an archive member
+        archive: Archive (or other SourceSet) the file is read from, if any
+        limits: Limits the file is read with (its sample size detects binary files)
+
+    Returns:
+        Hex digest of the contents, or None if the file is unreadable or binary
+    """
+    limits = limits or ReadLimits()
+    digest = hashlib.sha256()
+    if archive is not None:
+        data = archive.read_bytes(full_path)
+        if data is None or detect_encoding(data[:limits.sample_size])[0] is None:
+            return None
+        # Members cut at the byte limit show their full size in the truncation note
+        digest.update(f"{archive.size(full_path)}\0".encode("ascii"))
+        digest.update(data)
+        return digest.hexdigest()
+    try:
+        with open(full_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return digest.hexdigest()
+            # Large files are hashed through a memory map instead of being loaded
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if detect_encoding(buffer[:limits.sample_size])[0] is None:
+                    return None
+                digest.update(buffer)
+    except (OSError, ValueError):
+        return None
+    return digest.hexdigest()
+
+
+def repeated_digests(
+    c_files: List[Tuple[str, str]], archive: Optional[SourceSet] = None, limits: Optional[ReadLimits] = None
+) -> List[Optional[str]]:
+    """
+    Hash every file and keep the digests that several files share.
+
+    Args:
+        c_files: List of (full_path, file_name) tuples in document order
+        archive: Archive (or other SourceSet) the files are read from, if any
+        limits: Limits the files are read with
+
+    Returns:
+        For each file, its digest if another file has the same contents,
+        otherwise None
+    """
+    with ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="hash") as pool:
+        digests = list(pool.map(lambda job: content_digest(job[0], archive, limits), c_files))
+    counts = Counter(digests)
+    return [digest if digest is not None and counts[digest] > 1 else None for digest in digests]
@@ -0,0 +1,314 @@
+"""Compile and run each exercise with the settings of a CExecConfig.json file."""
+import json
+import os
+import re
+import shlex
+import signal
+import subprocess
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    from src.services.render_cache import RenderCache
+    from src.services.source_reader import SourceSet
+
+# Bumped whenever the report format changes, to invalidate cached results
+EXEC_VERSION = 1
+DEFAULT_COMPILE_TIMEOUT = 30.0
+DEFAULT_RUN_TIMEOUT = 5.0
+DEFAULT_MEMORY_LIMIT = 256
+# Output kept in the report, and the largest file a program may write (in KiB)
+MAX_OUTPUT_BYTES = 16 * 1024
+MAX_OUTPUT_LINES = 200
+MAX_WRITE_KB = 1024
+# Control characters other than tab, which is expanded
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+
+
+class ExecConfig:
+    """How exercises are compiled and run."""
+
+    __slots__ = (
+        "compiler_path", "compiler_args", "output_name", "run_after_compile", "custom_run_command",
+        "compile_timeout", "run_timeout", "memory_limit",
+    )
+
+    def __init__(
+        self,
+        compiler_path: str = "gcc",
+        compiler_args: Sequence[str] = (),
+        output_name: str = "output",
+        run_after_compile: bool = False,
+        custom_run_command: str = "",
+        compile_timeout: float = DEFAULT_COMPILE_TIMEOUT,
+        run_timeout: float = DEFAULT_RUN_TIMEOUT,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    ) -> None:
+        """
+        Initialize the configuration.
+
+        Args:
+            compiler_path: Compiler executable
+            compiler_args: Arguments after the source file and `-o output`, e.g. libraries
+            output_name: Name of the compiled program
+            run_after_compile: Run the program once it compiles
+            custom_run_command: Shell command run instead of the program, in its directory
+            compile_timeout: Seconds a compilation may take
+            run_timeout: Seconds the program may run
+            memory_limit: Address space of the program, in MiB (0 = no limit)
+        """
+        self.compiler_path = compiler_path
+        self.compiler_args = list(compiler_args)
+        self.output_name = output_name
+        self.run_after_compile = run_after_compile
+        self.custom_run_command = custom_run_command
+        self.compile_timeout = compile_timeout
+        self.run_timeout = run_timeout
+        self.memory_limit = memory_limit
+
+    def __repr__(self) -> str:
+        """Return a representation used in cache keys."""
+        return "ExecConfig(" + ", ".join(repr(getattr(self, name)) for name in self.__slots__) + ")"
+
+    def signature(self) -> str:
+        """Return a string that changes whenever the results of a run could change."""
+        return f"exec:{EXEC_VERSION}:{self!r}"
+
+
+def load_exec_config(path: str) -> ExecConfig:
+    """
+    Read a CExecConfig.json file.
+
+    Besides the keys of the editor extension (compilerPath, compilerArgs,
+    outputName, runAfterCompile, customRunCommand), the optional keys
+    compileTimeout and runTimeout (seconds) and memoryLimit (MiB) set the
+    limits of each job. Other keys are ignored.
+
+    Args:
+        path: Path to the configuration file
+
+    Returns:
+        The configuration
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not valid JSON or a setting has the wrong type
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        data: Dict[str, Any] = json.load(file)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+
+    def setting(key: str, kind: Union[type, Tuple[type, ...]], default: Any) -> Any:
+        value = data.get(key, default)
+        if not isinstance(value, kind) or isinstance(value, bool) and kind is not bool:
+            raise ValueError(f"{path}: invalid value for {key}: {value!r}")
+        return value
+
+    args = setting("compilerArgs", list, [])
+    if not all(isinstance(arg, str) for arg in args):
+        raise ValueError(f"{path}: compilerArgs must be a list of strings")
+    return ExecConfig(
+        compiler_path=setting("compilerPath", str, "gcc") or "gcc",
+        compiler_args=args,
+        output_name=setting("outputName", str, "output") or "output",
+        run_after_compile=setting("runAfterCompile", bool, False),
+        custom_run_command=setting("customRunCommand", str, ""),
+        compile_timeout=float(setting("compileTimeout", (int, float), DEFAULT_COMPILE_TIMEOUT)),
+        run_timeout=float(setting("runTimeout", (int, float), DEFAULT_RUN_TIMEOUT)),
+        memory_limit=int(setting("memoryLimit", (int, float), DEFAULT_MEMORY_LIMIT)),
+    )
+
+
+def _run(
+    command: Union[List[str], str], cwd: str, timeout: float, output_path: str
+) -> Tuple[Optional[int], bool]:
+    """
+    Run a command with its output going to a file.
+
+    On POSIX the command gets its own process group, so a timeout also
+    kills whatever it started.
+
+    Returns:
+        Tuple of (exit code, timed out); the exit code is negative for a
+        signal and None after a timeout
+    """
+    posix = os.name == 'posix'
+    with open(output_path, 'wb') as output:
+        process = subprocess.Popen(
+            command, cwd=cwd, stdin=subprocess.DEVNULL, stdout=output, stderr=subprocess.STDOUT,
+            shell=isinstance(command, str), start_new_session=posix,
+        )
+        try:
+            return process.wait(timeout), False
+        except subprocess.TimeoutExpired:
+            if posix:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            else:
+                process.kill()
+            process.wait()
+            return None, True
+
+
+def _output_lines(path: str, strip: str = "") -> List[str]:
+    """Read the start of a command's output as printable lines."""
+    with open(path, 'rb') as file:
+        data = file.read(MAX_OUTPUT_BYTES + 1)
+    text = data[:MAX_OUTPUT_BYTES].decode('utf-8', errors='replace')
+    if strip:
+        text = text.replace(strip, "")
+    lines = [CONTROL_CHARS.sub("?", line.expandtabs(4)) for line in text.splitlines()]
+    if len(lines) > MAX_OUTPUT_LINES or len(data) > MAX_OUTPUT_BYTES:
+        lines = lines[:MAX_OUTPUT_LINES] + ["[Saída truncada]"]
+    return lines
+
+
+def _limited(program: str, config: ExecConfig) -> Union[List[str], str]:
+    """Wrap a program, or a shell command, so it runs under CPU, memory and file size limits."""
+    custom = config.custom_run_command
+    if os.name != 'posix':
+        return custom or [program]
+    limits = [f"-t {int(config.run_timeout) + 1}", f"-f {MAX_WRITE_KB * 2}", "-c 0"]
+    if config.memory_limit > 0:
+        limits.append(f"-v {config.memory_limit * 1024}")
+    # Each limit on its own, so a shell missing one still applies the others
+    prefix = "".join(f"ulimit {limit} 2>/dev/null; " for limit in limits)
+    return prefix + (custom if custom else "exec " + shlex.quote(program))
+
+
+def compile_and_run(full_path: str, file_name: str, data: bytes, config: ExecConfig) -> List[str]:
+    """
+    Compile one exercise and, if configured, run it.
+
+    Sources are compiled where they are, so local headers are found;
+    sources that are not files on disk (archive members) are compiled from
+    a copy. The program runs in a temporary directory with no input.
+
+    Args:
+        full_path: Path to the source file
+        file_name: File name shown in the exercise header
+        data: Contents of the source file
+        config: Compiler and limits
+
+    Returns:
+        The report appended to the exercise: the outcome of the compilation
+        and of the run, each followed by its output
+    """
+    with tempfile.TemporaryDirectory(prefix="lista-exec-") as work:
+        # The compiler runs in the work directory, so relative paths would not resolve
+        source = os.path.abspath(full_path)
+        if not os.path.isfile(source):
+            source = os.path.join(work, file_name)
+            with open(source, 'wb') as file:
+                file.write(data)
+        program = os.path.join(work, config.output_name)
+        output_path = os.path.join(work, ".output")
+        command = [config.compiler_path, source, "-o", program] + config.compiler_args
+        try:
+            code, timed_out = _run(command, work, config.compile_timeout, output_path)
+        except OSError as e:
+            return [f"Compilação: não foi possível executar {config.compiler_path}: {e.strerror or e}"]
+        output = _output_lines(output_path, work + os.sep)
+        if timed_out:
+            return [f"Compilação: tempo esgotado ({config.compile_timeout:g} s)"] + output
+        if code != 0:
+            return [f"Compilação: falhou (código {code})"] + output
+        report = ["Compilação: sucesso"] + output
+        if not config.run_after_compile:
+            return report
+
+        try:
+            code, timed_out = _run(_limited(program, config), work, config.run_timeout, output_path)
+        except OSError as e:
+            return report + [f"Execução: não foi possível executar o programa: {e.strerror or e}"]
+        if timed_out:
+            report.append(f"Execução: tempo esgotado ({config.run_timeout:g} s)")
+        elif code is not None and code < 0:
+            try:
+                name = signal.Signals(-code).name
+            except ValueError:
+                name = str(-code)
+            report.append(f"Execução: encerrada pelo sinal {name}")
+        else:
+            report.append(f"Execução: código de saída {code}")
+        output = _output_lines(output_path)
+        report.append("Saída do programa:" if output else "Saída do programa: (vazia)")
+        return report + output
+
+
+def _read_source_bytes(full_path: str, archive: Optional["SourceSet"]) -> Optional[bytes]:
+    """Read a whole source file, or the member of an archive."""
+    if archive is not None:
+        return archive.read_bytes(full_path)
+    try:
+        with open(full_path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def execution_reports(
+    c_files: List[Tuple[str, str]],
+    config: ExecConfig,
+    workers: int = 0,
+    cache: Optional["RenderCache"] = None,
+    archive: Optional["SourceSet"] = None,
+) -> Iterator[List[str]]:
+    """
+    Compile and run exercises on a bounded pool, ahead of the renderer.
+
+    Each job is a compiler or program process; the threads of the pool
+    only wait for them. At most twice as many jobs as workers are started
+    or waiting to be consumed at any time. Reports are cached under the
+    hash of the source and of the configuration, so unchanged files are
+    not compiled again.
+
+    Args:
+        c_files: List of (full_path, file_name) tuples in document order
+        config: Compiler and limits
+        workers: Jobs run at the same time (0 uses every CPU core)
+        cache: Cache storing the reports, if any
+        archive: Archive (or other SourceSet) the files are read from, if any
+
+    Yields:
+        The report of each file, in order
+    """
+    workers = workers if workers > 0 else os.cpu_count() or 1
+    signature = config.signature()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exec")
+    pending: Deque[Tuple[Optional[str], Union[List[str], "Future[List[str]]"]]] = deque()
+
+    def start(job: Tuple[str, str]) -> Tuple[Optional[str], Union[List[str], "Future[List[str]]"]]:
+        full_path, file_name = job
+        data = _read_source_bytes(full_path, archive)
+        if data is None:
+            return None, ["Compilação: arquivo ilegível"]
+        key = None
+        if cache is not None:
+            key = cache.key(data, file_name, signature)
+            cached = cache.get(key)
+            if cached is not None:
+                # Stored as UTF-8 in the latin-1 strings the cache holds
+                return None, [line.encode('latin-1').decode('utf-8') for line in cached]
+        return key, pool.submit(compile_and_run, full_path, file_name, data, config)
+
+    files = iter(c_files)
+    try:
+        pending.extend(start(job) for job in islice(files, 2 * workers))
+        while pending:
+            key, result = pending.popleft()
+            following = next(files, None)
+            if following is not None:
+                pending.append(start(following))
+            report = result.result() if isinstance(result, Future) else result
+            if cache is not None and key is not None:
+                cache.put(key, [line.encode('utf-8').decode('latin-1') for line in report])
+            yield report
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,16 @@
 """GUI interface for the PDF generator application using Tkinter."""
 import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+from typing import Optional, Tuple
 
-from src.services.pdf_generator import create_exercises_pdf
+from src.services.pdf_generator import GenerationCancelled, create_exercises_pdf
+
+# Milliseconds between checks for events from the generation thread
+POLL_INTERVAL_MS = 100
 
 
 class PDFGeneratorGUI:
@@ -30,6 +37,13 @@ class PDFGeneratorGUI:
         self.directory_path = tk.StringVar()
         self.output_filename = tk.StringVar()
 
+        # Generation runs on a worker thread that reports back through this queue;
+        # Tk widgets are only ever touched from the main thread
+        self._events: "queue.Queue[Tuple]" = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
         # Configure styles
         self._configure_styles()
 
@@ -135,14 +149,27 @@ class PDFGeneratorGUI:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(pady=20)
 
-        generate_button = ttk.Button(
+        self.generate_button = ttk.Button(
             button_frame,
             text="GERAR PDF",
             command=self._generate_pdf,
             width=20,
             style="Generate.TButton"
         )
-        generate_button.pack()
+        self.generate_button.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_button = ttk.Button(
+            button_frame,
+            text="Cancelar",
+            command=self._cancel_generation,
+            state=tk.DISABLED,
+            style="Browse.TButton"
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+        # Progress bar
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate", maximum=1)
+        self.progress_bar.pack(fill=tk.X, padx=5)
 
         # Status label
         status_frame = ttk.Frame(main_frame, style="Card.TFrame")
@@ -203,8 +230,9 @@ class PDFGeneratorGUI:
         """
         Generate the PDF using the selected directory and output filename.
 
-        Validates inputs, calls the PDF generation function, and displays the result.
-        Shows progress updates in the status bar.
+        Validates inputs and starts the PDF generation on a worker thread, so
+        the window stays responsive. Progress is shown in the progress bar and
+        the status bar, and the result is displayed when the worker finishes.
         """
         directory = self.directory_path.get().strip()
         output_file = self.output_filename.get().strip()
@@ -239,29 +267,106 @@ class PDFGeneratorGUI:
 
         # Update status and cursor
         self.status_var.set(f"⏳ Gerando PDF... Procurando arquivos .c em: {directory}")
-        self.root.update()
+        self.root.config(cursor="watch")
+        self.progress_bar.configure(value=0, maximum=1)
+        self.generate_button.configure(state=tk.DISABLED)
+        self.cancel_button.configure(state=tk.NORMAL)
+
+        self._cancel_event.clear()
+        self._started_at = time.monotonic()
+        self._worker = threading.Thread(
+            target=self._run_generation,
+            args=(directory, output_file),
+            daemon=True
+        )
+        self._worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._process_events)
+
+    def _run_generation(self, directory: str, output_file: str) -> None:
+        """
+        Generate the PDF on the worker thread, reporting through the event queue.
+
+        Args:
+            directory: Directory containing the C files
+            output_file: Path of the PDF to create
+        """
+        def progress(done: int, total: int, lines: int) -> None:
+            self._events.put(("progress", done, total, lines))
 
         try:
-            success = create_exercises_pdf(directory, output_file)
-
-            if success:
-                self.status_var.set("✅ PDF foi criado com sucesso!")
-                self.root.config(cursor="")
-                messagebox.showinfo(
-                    "Sucesso",
-                    f"PDF '{output_file}' foi criado com sucesso!"
-                )
-            else:
-                self.status_var.set("❌ Ocorreu um erro ao gerar o PDF.")
-                self.root.config(cursor="")
-                messagebox.showerror(
-                    "Erro",
-                    "Ocorreu um erro ao gerar o PDF."
-                )
+            success = create_exercises_pdf(
+                directory, output_file, progress=progress, cancel=self._cancel_event
+            )
+            self._events.put(("done", success, output_file))
+        except GenerationCancelled:
+            self._events.put(("cancelled",))
         except Exception as e:
-            self.status_var.set(f"❌ Erro: {str(e)}")
-            self.root.config(cursor="")
-            messagebox.showerror("Erro", f"Erro ao gerar o PDF: {str(e)}")
+            self._events.put(("error", str(e)))
+
+    def _cancel_generation(self) -> None:
+        """Ask the worker thread to stop; the PDF is left untouched."""
+        self._cancel_event.set()
+        self.cancel_button.configure(state=tk.DISABLED)
+        self.status_var.set("⏳ Cancelando...")
+
+    def _process_events(self) -> None:
+        """Apply the events sent by the worker thread to the widgets."""
+        finished = False
+        try:
+            while True:
+                event = self._events.get_nowait()
+                finished = self._handle_event(event) or finished
+        except queue.Empty:
+            pass
+        if not finished:
+            self.root.after(POLL_INTERVAL_MS, self._process_events)
+
+    def _handle_event(self, event: Tuple) -> bool:
+        """
+        Apply one event from the worker thread.
+
+        Args:
+            event: Tuple whose first item is the event kind
+
+        Returns:
+            True if the event ends the generation
+        """
+        kind = event[0]
+        if kind == "progress":
+            _, done, total, lines = event
+            elapsed = max(time.monotonic() - self._started_at, 1e-6)
+            self.progress_bar.configure(maximum=max(total, 1), value=done)
+            if not self._cancel_event.is_set():
+                self.status_var.set(
+                    f"⏳ Gerando PDF... {done}/{total} arquivos ({lines / elapsed:.0f} linhas/s)"
+                )
+            return False
+
+        self._worker = None
+        self.root.config(cursor="")
+        self.generate_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.DISABLED)
+
+        if kind == "done" and event[1]:
+            self.progress_bar.configure(value=self.progress_bar["maximum"])
+            self.status_var.set("✅ PDF foi criado com sucesso!")
+            messagebox.showinfo(
+                "Sucesso",
+                f"PDF '{event[2]}' foi criado com sucesso!"
+            )
+        elif kind == "done":
+            self.status_var.set("❌ Ocorreu um erro ao gerar o PDF.")
+            messagebox.showerror(
+                "Erro",
+                "Ocorreu um erro ao gerar o PDF."
+            )
+        elif kind == "cancelled":
+            self.progress_bar.configure(value=0)
+            self.status_var.set("⛔ Geração cancelada. Nenhum PDF foi criado.")
+        else:
+            self.status_var.set(f"❌ Erro: {event[1]}")
+            messagebox.showerror("Erro", f"Erro ao gerar o PDF: {event[1]}")
+        return True
 
 
 def run_gui() -> None:
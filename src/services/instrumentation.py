@@ -0,0 +1,254 @@
+"""Timings and counters describing where PDF generation spends its time."""
+import json
+import platform
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+# Phases measured inside the rendering of one exercise (possibly in a worker process)
+FILE_PHASES = ("read", "measure", "wrap", "paginate", "emit")
+
+# Called as hook(event, data) for "phase" events ({"name", "seconds"}) and
+# "file" events (FileProfile.to_dict())
+ProfileHook = Callable[[str, Dict[str, Any]], None]
+
+T = TypeVar("T")
+
+
+class FileProfile:
+    """Timings and counters of the rendering of one exercise."""
+
+    __slots__ = ("path", "name", "phases", "lines", "wrapped_lines", "pages", "size", "_last")
+
+    def __init__(self, path: str, name: str) -> None:
+        """
+        Initialize the profile and start its clock.
+
+        Args:
+            path: Path to the source file
+            name: File name shown in the exercise header
+        """
+        self.path = path
+        self.name = name
+        self.phases: Dict[str, float] = {}
+        self.lines = 0
+        self.wrapped_lines = 0
+        self.pages = 0
+        self.size = 0
+        self._last = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        """Return the total time spent rendering the exercise."""
+        return sum(self.phases.values())
+
+    def mark(self, phase: str) -> None:
+        """Charge the time elapsed since the previous mark to a phase."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the profile as JSON-serializable data."""
+        return {
+            "path": self.path,
+            "name": self.name,
+            "seconds": self.seconds,
+            "phases": dict(self.phases),
+            "lines": self.lines,
+            "wrapped_lines": self.wrapped_lines,
+            "pages": self.pages,
+            "bytes": self.size,
+        }
+
+
+class Profiler:
+    """
+    Collect per-phase timings, counters and per-file profiles of one run.
+
+    Run phases are wall-clock times of the process writing the document.
+    File phases are summed over every rendered exercise, so with several
+    worker processes they can add up to more than the wall-clock time.
+    Hooks receive every event as it happens, e.g. to feed a dashboard.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty profile and start the run clock."""
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.files: List[FileProfile] = []
+        self.total_seconds = 0.0
+        self._hooks: List[ProfileHook] = []
+        self._started = time.perf_counter()
+
+    def add_hook(self, hook: ProfileHook) -> None:
+        """
+        Register a callback receiving every event.
+
+        Args:
+            hook: Called as hook(event, data)
+        """
+        self._hooks.append(hook)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a block of code as (part of) a run phase.
+
+        Args:
+            name: Phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """
+        Add time to a phase.
+
+        Args:
+            name: Phase name
+            seconds: Time to add
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self._emit("phase", {"name": name, "seconds": seconds})
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name: Counter name
+            amount: Value to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_file(self, profile: FileProfile) -> None:
+        """
+        Record the profile of a rendered exercise.
+
+        Args:
+            profile: Profile returned by the renderer
+        """
+        self.files.append(profile)
+        self.count("lines", profile.lines)
+        self.count("wrapped_lines", profile.wrapped_lines)
+        self.count("rendered_files")
+        self._emit("file", profile.to_dict())
+
+    def finish(self) -> None:
+        """Stop the run clock."""
+        self.total_seconds = time.perf_counter() - self._started
+
+    def file_phases(self) -> Dict[str, float]:
+        """Return the file phases summed over every rendered exercise."""
+        totals = {phase: 0.0 for phase in FILE_PHASES}
+        for profile in self.files:
+            for phase, seconds in profile.phases.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the whole profile as JSON-serializable data."""
+        return {
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "total_seconds": self.total_seconds,
+            "phases": dict(self.phases),
+            "file_phases": self.file_phases(),
+            "counters": dict(self.counters),
+            "files": [profile.to_dict() for profile in self.files],
+        }
+
+    def write_json(self, path: str) -> None:
+        """
+        Save the profile as JSON.
+
+        Args:
+            path: Output file
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+            file.write("\n")
+
+    def format_report(self, slowest: int = 10) -> str:
+        """
+        Format the profile as a text table.
+
+        Args:
+            slowest: Number of slowest files to list
+
+        Returns:
+            The report, one line per row
+        """
+        total = self.total_seconds or 1e-9
+        rows = [f"{'Fase':<24}{'Tempo (s)':>12}{'%':>8}"]
+        for name, seconds in self.phases.items():
+            rows.append(f"{name:<24}{seconds:>12.3f}{100 * seconds / total:>8.1f}")
+        rows.append(f"{'total':<24}{self.total_seconds:>12.3f}{100.0:>8.1f}")
+        rows.append("")
+        rows.append(f"{'Fase por arquivo':<24}{'Tempo (s)':>12}")
+        for name, seconds in self.file_phases().items():
+            rows.append(f"{name:<24}{seconds:>12.3f}")
+        rows.append("")
+        rows.append(f"{'Contador':<24}{'Valor':>12}")
+        for name, value in self.counters.items():
+            rows.append(f"{name:<24}{value:>12}")
+        if self.files:
+            rows.append("")
+            rows.append(f"{'Arquivos mais lentos':<40}{'Tempo (s)':>12}{'Linhas':>10}{'Páginas':>10}")
+            for profile in sorted(self.files, key=lambda p: p.seconds, reverse=True)[:slowest]:
+                # Names repeat across student directories; keep the end of the path
+                label = profile.path if len(profile.path) < 40 else "..." + profile.path[-36:]
+                rows.append(f"{label:<40}{profile.seconds:>12.4f}{profile.lines:>10}{profile.pages:>10}")
+        return "\n".join(rows)
+
+    def _emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Send an event to every hook."""
+        for hook in self._hooks:
+            hook(event, data)
+
+
+def timed_phase(profiler: Optional[Profiler], name: str) -> ContextManager[None]:
+    """
+    Time a run phase when profiling, or do nothing.
+
+    Args:
+        profiler: Active profiler, if any
+        name: Phase name
+
+    Returns:
+        A context manager wrapping the phase
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
+
+
+def timed_iter(profiler: Optional[Profiler], name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """
+    Charge the time spent producing each item of an iterable to a run phase.
+
+    Args:
+        profiler: Active profiler, if any
+        name: Phase name
+        iterable: Items to pass through
+
+    Yields:
+        The items of iterable
+    """
+    if profiler is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            profiler.add_time(name, time.perf_counter() - start)
+            return
+        profiler.add_time(name, time.perf_counter() - start)
+        yield item
@@ -0,0 +1,153 @@
+"""Pagination of exercises into rows and pages, independent of PDF emission."""
+from array import array
+from typing import List
+
+# Kinds of layout rows
+HEADER = 0
+NOTE = 1
+CODE = 2
+CONTINUATION = 3
+SPACER = 4
+# Rows printed by the code block: the first row of a source line, and the rows it wraps into
+CODE_KINDS = (CODE, CONTINUATION)
+
+
+class PageGeometry:
+    """Vertical measures that decide where pages break, in user units."""
+
+    __slots__ = ("top", "bottom", "line_height", "header_height", "spacer_height")
+
+    def __init__(
+        self, top: float, bottom: float, line_height: float, header_height: float, spacer_height: float
+    ) -> None:
+        """
+        Initialize the geometry.
+
+        Args:
+            top: Position of the first row of a page
+            bottom: Position no row may extend past (the page break trigger)
+            line_height: Height of notes and code rows
+            header_height: Height of the exercise header
+            spacer_height: Height of the blank space closing an exercise
+        """
+        self.top = top
+        self.bottom = bottom
+        self.line_height = line_height
+        self.header_height = header_height
+        self.spacer_height = spacer_height
+
+    def height(self, kind: int) -> float:
+        """Return the height of a row of the given kind."""
+        if kind == HEADER:
+            return self.header_height
+        if kind == SPACER:
+            return self.spacer_height
+        return self.line_height
+
+
+class ExerciseLayout:
+    """
+    Every row an exercise prints, and the pages they fall on.
+
+    Rows are stored in parallel arrays in reading order; page p holds rows
+    page_starts[p] up to the start of the next page. Layouts hold no PDF
+    state, so they can be built in worker processes, cached and inspected
+    (e.g. for page counts) before anything is emitted.
+    """
+
+    __slots__ = ("texts", "kinds", "numbers", "page_starts", "lines", "wrapped_lines")
+
+    def __init__(self) -> None:
+        """Initialize an empty layout."""
+        self.texts: List[str] = []
+        # Row kind, and the source line number of CODE rows (0 for other rows)
+        self.kinds = array('b')
+        self.numbers = array('l')
+        self.page_starts = array('l', [0])
+        self.lines = 0
+        self.wrapped_lines = 0
+
+    @property
+    def page_count(self) -> int:
+        """Return the number of pages of the exercise."""
+        return len(self.page_starts)
+
+    def page_rows(self, page: int) -> range:
+        """
+        Get the rows of one page.
+
+        Args:
+            page: Page index, from 0
+
+        Returns:
+            The indices of the page's rows
+        """
+        end = self.page_starts[page + 1] if page + 1 < len(self.page_starts) else len(self.kinds)
+        return range(self.page_starts[page], end)
+
+
+class LayoutBuilder:
+    """Append rows to a layout, breaking pages as they fill up."""
+
+    def __init__(self, geometry: PageGeometry) -> None:
+        """
+        Start an empty layout.
+
+        Args:
+            geometry: Page measures used for pagination
+        """
+        self.geometry = geometry
+        self.layout = ExerciseLayout()
+        self.y = geometry.top
+
+    def add(self, kind: int, text: str = "", number: int = 0) -> None:
+        """
+        Append one row, on a new page if it does not fit on the current one.
+
+        Args:
+            kind: Row kind
+            text: Text printed by the row
+            number: Source line number of a CODE row
+        """
+        layout = self.layout
+        height = self.geometry.height(kind)
+        if self.y + height > self.geometry.bottom and layout.kinds:
+            layout.page_starts.append(len(layout.kinds))
+            self.y = self.geometry.top
+        self.y += height
+        layout.texts.append(text)
+        layout.kinds.append(kind)
+        layout.numbers.append(number)
+
+    def add_code(self, wrapped_file: List[List[str]]) -> None:
+        """
+        Append numbered source lines.
+
+        Args:
+            wrapped_file: Rows of each source line, as returned by wrap_lines
+        """
+        # Same as calling add() for every row, with the lookups hoisted out of the loop
+        layout = self.layout
+        texts, kinds, numbers, page_starts = layout.texts, layout.kinds, layout.numbers, layout.page_starts
+        top, bottom, height = self.geometry.top, self.geometry.bottom, self.geometry.line_height
+        y = self.y
+        for number, rows in enumerate(wrapped_file, 1):
+            for index, text in enumerate(rows):
+                if y + height > bottom and kinds:
+                    page_starts.append(len(kinds))
+                    y = top
+                y += height
+                texts.append(text)
+                if index == 0:
+                    kinds.append(CODE)
+                    numbers.append(number)
+                else:
+                    kinds.append(CONTINUATION)
+                    numbers.append(0)
+        self.y = y
+        layout.lines += len(wrapped_file)
+        layout.wrapped_lines += sum(len(rows) - 1 for rows in wrapped_file)
+
+    def finish(self) -> ExerciseLayout:
+        """Return the finished layout."""
+        return self.layout
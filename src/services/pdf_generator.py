@@ -1,16 +1,184 @@
 """Module for creating PDFs from C source files."""
+import hashlib
+import io
 import os
-from typing import List
+import threading
+import zlib
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union,
+)
 from fpdf import FPDF
 
-from src.utils import natural_sort_key
+from src.services.archive import SourceArchive, is_archive
+from src.services.defaults import DEFAULT_COMPRESSION_LEVEL, DEFAULT_DUPLICATES, DEFAULT_PREFETCH
+from src.services.discovery import DiscoveryOptions, discover_sources
+from src.services.duplicates import repeated_digests
+from src.services.execution import ExecConfig, execution_reports
+from src.services.instrumentation import FileProfile, Profiler, timed_iter, timed_phase
+from src.services.layout import (
+    CODE_KINDS, HEADER, NOTE, SPACER, ExerciseLayout, LayoutBuilder, PageGeometry,
+)
+from src.services.pdf_writer import Link, StreamingPDFWriter
+from src.services.render_cache import RenderCache
+from src.services.source_reader import ReadLimits, SourceSet, SourceText, read_source
+from src.services.sources import SourceInput, SourceItems
+from src.services.text_metrics import get_font_metrics
+from src.services.toc import TocEntry, build_outline, layout_toc, toc_entries
+from src.services.truetype import TrueTypeFont, glyphs_in_content, load_font
+
+
+# Fonts used by the document, registered in this order so that every document
+# (including the ones rendered in worker processes) names them /F1, /F2, /F3
+DOCUMENT_FONTS = (("Courier", "", 10), ("Arial", "B", 12), ("Arial", "I", 8))
+# Key of an embedded TrueType font; once set, every font of the document is drawn with it
+UNICODE_FONT = "unicode"
+LINE_NUMBER_WIDTH = 20
+# Resource name of the footer Form XObject
+FOOTER_FORM = "Footer"
+LINE_HEIGHT = 5
+# Heights of the exercise header and of the blank space after each exercise
+HEADER_HEIGHT = 10
+SPACER_HEIGHT = 10
+# Indentation of each directory level in the table of contents
+TOC_INDENT = 5
+# Color of the line numbers
+GUTTER_COLOR = (128, 128, 128)
+PAGE_BREAK_MARGIN = 15
+# Bump whenever the rendering of an exercise changes, to invalidate cached pages
+LAYOUT_VERSION = 6
+
+
+# (full_path, file_name, contents); contents are raw bytes, a source already
+# read by the prefetcher, or None when the file has not been read yet
+ExerciseJob = Tuple[str, str, Union[bytes, SourceText, None]]
+# Called as progress(files_done, files_total, lines_done) after each exercise is written
+ProgressCallback = Callable[[int, int, int], None]
+# Pages of an exercise, its number of source lines, and its profile when the rendering is profiled
+RenderResult = Tuple[List[str], int, Optional[FileProfile]]
+
+
+class GenerationCancelled(Exception):
+    """Raised by create_exercises_pdf when its cancel event is set."""
 
 
 class CustomPDF(FPDF):
     """Custom PDF class that adds a footer to each page."""
     
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the document; arguments are passed on to FPDF."""
+        super().__init__(*args, **kwargs)
+        # Form XObjects: name -> content stream, and name -> object number once written
+        self.forms: Dict[str, str] = {}
+        self.form_objects: Dict[str, int] = {}
+        self.compression_level = DEFAULT_COMPRESSION_LEVEL
+        # Embedded TrueType font, if any, and the glyphs of it shown by the written pages
+        self.unicode_font: Optional[TrueTypeFont] = None
+        self.used_glyphs: Set[int] = set()
+        # Maps text to the characters the document font can show
+        self.font_text: Callable[[str], str] = core_font_text
+    
+    def set_unicode_font(self, font: TrueTypeFont) -> None:
+        """
+        Draw all the text of the document with a TrueType font.
+        
+        Every family, style and size selected afterwards maps to this font
+        at that size. Text is written as two-byte glyph IDs (Identity-H),
+        and only the glyphs shown on the written pages are embedded.
+        
+        Args:
+            font: The font, from load_font
+        """
+        self.unicode_font = font
+        self.font_text = font.printable
+        self.fonts[UNICODE_FONT] = {
+            'i': len(self.fonts) + 1, 'type': 'Unicode', 'name': font.name,
+            'up': font.underline_position, 'ut': font.underline_thickness, 'cw': font.widths,
+        }
+    
+    def set_font(self, family: str, style: str = '', size: float = 0) -> None:
+        """Select a font; with a TrueType font set, only the size is used (see set_unicode_font)."""
+        if self.unicode_font is not None:
+            family, style = UNICODE_FONT, ''
+        super().set_font(family, style, size)
+    
+    def _escape(self, s: str) -> str:
+        """Escape a string for the content stream, encoding it as glyph IDs with a TrueType font."""
+        if self.unicode_font is not None:
+            # The glyph codes come escaped
+            return s.translate(self.unicode_font.glyph_codes)
+        return super()._escape(s)
+    
+    def observe_content(self, content: str) -> None:
+        """
+        Note the glyphs a page written by StreamingPDFWriter shows.
+        
+        Args:
+            content: Page content stream, possibly rendered by another document
+        """
+        if self.unicode_font is not None:
+            self.used_glyphs |= glyphs_in_content(content)
+    
+    def set_compression_level(self, level: int) -> None:
+        """
+        Set how hard streams are compressed.
+        
+        Args:
+            level: zlib level from 1 (fastest) to 9 (smallest); 0 disables compression
+        """
+        self.compress = level != 0
+        self.compression_level = level
+    
+    def set_text_color(self, r: int, g: int = -1, b: int = -1) -> None:
+        """
+        Set the color of the text drawn by the following cells.
+        
+        fpdf wraps every cell in "q <color> ... Q" when the text color differs
+        from the fill color. No cell of this document is filled, so the color
+        is instead written once, by the next cell that draws text, as the
+        fill color (which is what text is painted with).
+        
+        Args:
+            r: Red component, or gray level when g is omitted
+            g: Green component
+            b: Blue component
+        """
+        if r == g == b:
+            # Shorter gray operator for the same color
+            g = b = -1
+        super().set_text_color(r, g, b)
+        if self.text_color == '0.000 g':
+            # fpdf's initial spelling of black, so black pages need no color at all
+            self.text_color = '0 g'
+        self.color_flag = False
+    
+    def cell(self, w: float, h: float = 0, txt: str = '', border: Any = 0, ln: int = 0,
+             align: str = '', fill: int = 0, link: str = '') -> None:
+        """Draw a cell, first writing the text color if it changed (see set_text_color)."""
+        if self.unicode_font is not None:
+            txt = self.font_text(txt)
+        if txt != '' and self.text_color != self.fill_color:
+            self.fill_color = self.text_color
+            if self.page > 0:
+                self._out(self.fill_color)
+        super().cell(w, h, txt, border, ln, align, fill, link)
+    
     def footer(self) -> None:
         """Add footer to each page with repository information."""
+        # The footer is drawn once into a Form XObject and each page only
+        # references it; the form inherits the text color in effect, as the
+        # footer cells did. Do saves and restores the graphics state itself.
+        self.define_form(FOOTER_FORM, self.draw_footer)
+        if self.text_color == self.fill_color:
+            self._out(f"/{FOOTER_FORM} Do")
+        else:
+            self._out(f"q {self.text_color} /{FOOTER_FORM} Do Q")
+    
+    def draw_footer(self) -> None:
+        """Draw the footer cells at the bottom of the current page."""
         # Position at 1.5 cm from bottom
         self.set_y(-15)
         # Arial italic 8
@@ -22,10 +190,208 @@ class CustomPDF(FPDF):
         self.ln(4)
         self.cell(0, 10, 'By: André Rodrigues e Pedro Giroldo', 0, 0, 'R')
     
+    def define_form(self, name: str, draw: Callable[[], None]) -> None:
+        """
+        Record what a drawing method outputs as a reusable Form XObject.
+        
+        The method draws on a scratch page of this document, so it uses the
+        same fonts, units and page size; the document state is restored
+        afterwards. Nothing happens if the form is already defined.
+        
+        Args:
+            name: Resource name of the form, used as `/name Do`
+            draw: Method drawing the form content with the usual fpdf calls
+        """
+        if name in self.forms:
+            return
+        saved = dict(self.__dict__)
+        scratch = max(self.pages, default=0) + 1
+        self.page = scratch
+        self.pages[scratch] = ''
+        self.state = 2
+        self.in_footer = 1  # No page breaks while drawing
+        self.font_family = ''  # Always select the font inside the form
+        self.text_color = self.fill_color  # Colors are inherited from the page
+        self.color_flag = False
+        try:
+            draw()
+            self.forms[name] = self.pages[scratch]
+        finally:
+            del self.pages[scratch]
+            self.__dict__.update(saved)
+    
+    def _putfonts(self) -> None:
+        """Write the fonts, embedding the subset of the TrueType font the pages use."""
+        if self.unicode_font is None:
+            super()._putfonts()
+            return
+        fonts = self.fonts
+        self.fonts = {key: font for key, font in fonts.items() if key != UNICODE_FONT}
+        try:
+            super()._putfonts()
+        finally:
+            self.fonts = fonts
+        self._put_unicode_font(fonts[UNICODE_FONT])
+    
+    def _put_unicode_font(self, font: Dict[str, Any]) -> None:
+        """
+        Write a TrueType font as a Type0 font with glyph IDs as character codes.
+        
+        Args:
+            font: Entry of the font in self.fonts; receives its object number
+        """
+        ttf = self.unicode_font
+        for content in self.forms.values():
+            self.observe_content(content)
+        glyphs = sorted(self.used_glyphs | {0})
+        scale = 1000 / ttf.units_per_em
+        # Subset fonts are named with a tag that changes with the glyphs they hold
+        tag = "".join(chr(ord('A') + int(digit, 16)) for digit in hashlib.sha1(repr(glyphs).encode()).hexdigest()[:6])
+        name = f"{tag}+{ttf.name}"
+        
+        default_width = ttf.advance(ttf.glyph(0x20))
+        widths: List[str] = []
+        for glyph in glyphs:
+            width = ttf.advance(glyph)
+            if width != default_width:
+                widths.append(f"{glyph} [{width}]")
+        
+        font['n'] = self.n + 1
+        self._newobj()
+        self._out(
+            f'<</Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H '
+            f'/DescendantFonts [{self.n + 1} 0 R] /ToUnicode {self.n + 2} 0 R>>'
+        )
+        self._out('endobj')
+        self._newobj()
+        self._out(
+            f'<</Type /Font /Subtype /CIDFontType2 /BaseFont /{name} '
+            f'/CIDSystemInfo <</Registry (Adobe) /Ordering (Identity) /Supplement 0>> '
+            f'/FontDescriptor {self.n + 2} 0 R /DW {default_width} /W [{" ".join(widths)}] /CIDToGIDMap /Identity>>'
+        )
+        self._out('endobj')
+        self._put_font_stream(_to_unicode_cmap(ttf.unicode_map(glyphs)))
+        
+        flags = 4 | (1 if ttf.fixed_pitch else 0) | (64 if ttf.italic_angle else 0)
+        bbox = " ".join(str(round(value * scale)) for value in ttf.bbox)
+        self._newobj()
+        self._out(
+            f'<</Type /FontDescriptor /FontName /{name} /Flags {flags} /FontBBox [{bbox}] '
+            f'/ItalicAngle {ttf.italic_angle:g} /Ascent {round(ttf.ascent * scale)} '
+            f'/Descent {round(ttf.descent * scale)} /CapHeight {round(ttf.cap_height * scale)} '
+            f'/StemV {50 + int((ttf.weight / 65) ** 2)} /MissingWidth {ttf.advance(0)} /FontFile2 {self.n + 1} 0 R>>'
+        )
+        self._out('endobj')
+        program = ttf.subset(glyphs)
+        self._put_font_stream(program.decode("latin1"), f"/Length1 {len(program)} ")
+    
+    def _put_font_stream(self, data: str, entries: str = '') -> None:
+        """Write a stream object, compressed like the pages."""
+        self._newobj()
+        stream_filter = ''
+        if self.compress:
+            data = zlib.compress(data.encode("latin1"), self.compression_level).decode("latin1")
+            stream_filter = '/Filter /FlateDecode '
+        self._out(f'<<{entries}{stream_filter}/Length {len(data)}>>')
+        self._putstream(data)
+        self._out('endobj')
+    
+    def _putimages(self) -> None:
+        """Write the images, then the Form XObjects."""
+        super()._putimages()
+        for name, content in self.forms.items():
+            self._newobj()
+            self.form_objects[name] = self.n
+            if self.compress:
+                data = zlib.compress(content.encode("latin1"), self.compression_level).decode("latin1")
+                stream_filter = '/Filter /FlateDecode '
+            else:
+                data = content
+                stream_filter = ''
+            self._out(
+                f'<</Type /XObject /Subtype /Form /BBox [0 0 {self.w_pt:.2f} {self.h_pt:.2f}] '
+                f'/Resources 2 0 R {stream_filter}/Length {len(data)}>>'
+            )
+            self._putstream(data)
+            self._out('endobj')
+    
+    def _putxobjectdict(self) -> None:
+        """List the images and Form XObjects in the resource dictionary."""
+        super()._putxobjectdict()
+        for name, number in self.form_objects.items():
+            self._out(f'/{name} {number} 0 R')
+    
+    def write_code_block(
+        self, texts: Sequence[str], numbers: Sequence[int], number_width: float, line_height: float
+    ) -> None:
+        """
+        Write rows of numbered source lines as one text object.
+        
+        The text object holds a gray run of line numbers followed by a black
+        run of code rows. Rows advance with the text leading instead of being
+        placed one cell at a time, starting at the current position exactly
+        where cell() would put them. The rows must fit on the current page;
+        pages are broken by the layout.
+        
+        Args:
+            texts: Text of each row
+            numbers: Line number of each row, or 0 for the rows a wrapped
+                line continues on
+            number_width: Width of the line-number gutter
+            line_height: Height of each row
+        """
+        self.set_text_color(*GUTTER_COLOR)
+        gray = self.text_color
+        self.set_text_color(0, 0, 0)
+        black = self.text_color
+        gutter: List[str] = []
+        code: List[str] = []
+        last_numbered = 0
+        unicode = self.unicode_font is not None
+        for row, (text, number) in enumerate(zip(texts, numbers)):
+            if number:
+                label = self._escape(str(number)) if unicode else number
+                # Skip the rows of wrapped lines, then show the number on the next line
+                gutter.append(f"({label}) Tj" if row == 0 else "T*\n" * (row - last_numbered - 1) + f"({label}) '")
+                last_numbered = row
+            escaped = self._escape(f"\t{text}")
+            code.append(f"({escaped}) Tj" if row == 0 else f"({escaped}) '")
+        self._put_code_run(self.y, gutter, code, last_numbered, number_width, line_height, gray, black)
+        self.y += len(code) * line_height
+        self.x = self.l_margin
+    
+    def _put_code_run(
+        self, top: float, gutter: List[str], code: List[str], last_numbered: int,
+        number_width: float, line_height: float, gray: str, black: str,
+    ) -> None:
+        """Write the text object of a code block (see write_code_block)."""
+        if not code:
+            return
+        k = self.k
+        x = (self.l_margin + self.c_margin) * k
+        # Baseline of the first row, as cell() computes it
+        y = (self.h - (top + 0.5 * line_height + 0.3 * self.font_size)) * k
+        parts = ["BT", f"{line_height * k:.4f} TL", f"{x:.2f} {y:.2f} Td"]
+        if gutter:
+            if self.fill_color != gray:
+                parts.append(gray)
+            parts.extend(gutter)
+            self.fill_color = gray
+        # Back up from the last line number to the first code row
+        parts.append(f"{number_width * k:.2f} {last_numbered * line_height * k:.2f} Td")
+        if self.fill_color != black:
+            parts.append(black)
+        parts.extend(code)
+        parts.append("ET")
+        self._out("\n".join(parts))
+        self.fill_color = black
+    
     def wrap_text_to_lines(self, text: str, max_width: float) -> List[str]:
         """
         Wrap text to fit within the specified width.
         
+        Words longer than the available width are split across lines.
+        
         Args:
             text: The text to wrap
             max_width: Maximum width in points
@@ -33,120 +399,984 @@ class CustomPDF(FPDF):
         Returns:
             List of wrapped lines
         """
-        words = text.split(' ')
-        lines = []
-        current_line = ""
+        return get_font_metrics(self).wrap(text, max_width)
+    
+    def finish_page(self) -> None:
+        """Close the current page, drawing its footer."""
+        self.in_footer = 1
+        self.footer()
+        self.in_footer = 0
+        self._endpage()
+
+
+def new_document(font: Optional[str] = None) -> CustomPDF:
+    """
+    Create an empty document with the standard page and font setup.
+    
+    Args:
+        font: TrueType font drawing all the text instead of the core fonts
         
-        for word in words:
-            # Test if adding this word would exceed the width
-            test_line = current_line + (" " if current_line else "") + word
-            
-            # Get width of test line
-            test_width = self.get_string_width(test_line)
-            
-            if test_width <= max_width:
-                current_line = test_line
+    Returns:
+        A CustomPDF without pages, with Courier 10 (or the TrueType font at 10) selected
+    """
+    pdf = CustomPDF()
+    if font is not None:
+        pdf.set_unicode_font(load_font(font))
+    pdf.set_auto_page_break(auto=True, margin=PAGE_BREAK_MARGIN)
+    for family, style, size in DOCUMENT_FONTS:
+        pdf.set_font(family, style, size)
+    pdf.set_font("Courier", size=10)
+    # Define the footer up front, so documents that only assemble pages
+    # rendered elsewhere still write it
+    pdf.define_form(FOOTER_FORM, pdf.draw_footer)
+    return pdf
+
+
+def find_c_files(root_folder: str, discovery: Optional[DiscoveryOptions] = None) -> List[Tuple[str, str]]:
+    """
+    List the C source files under a directory in document order.
+    
+    Args:
+        root_folder: Path to the directory containing the C files
+        discovery: Filters and traversal settings (defaults to .c files)
+        
+    Returns:
+        List of (full_path, file_name) tuples, naturally sorted per directory
+    """
+    return discover_sources(root_folder, discovery)
+
+
+def layout_signature(limits: Optional[ReadLimits] = None, font: Optional[str] = None) -> str:
+    """
+    Describe the layout parameters that affect how an exercise is rendered.
+    
+    Args:
+        limits: Read limits the exercises are rendered with
+        font: TrueType font the exercises are rendered with, if any
+        
+    Returns:
+        String that changes whenever fonts, sizes, margins, the line-number
+        gutter or the read limits change, used to key the render cache
+    """
+    pdf = new_document(font)
+    signature = repr((
+        LAYOUT_VERSION, DOCUMENT_FONTS, LINE_NUMBER_WIDTH, LINE_HEIGHT, HEADER_HEIGHT, SPACER_HEIGHT,
+        PAGE_BREAK_MARGIN,
+        round(pdf.w, 4), round(pdf.h, 4), round(pdf.l_margin, 4), round(pdf.t_margin, 4),
+        pdf.compress, limits or ReadLimits(),
+    ))
+    if pdf.unicode_font is not None:
+        signature += pdf.unicode_font.signature()
+    return signature
+
+
+def core_font_text(text: str) -> str:
+    """
+    Map text to the encoding of fpdf's core fonts.
+    
+    The core fonts use the Windows-1252 character set, while fpdf writes
+    each character of a string as one latin-1 byte; characters outside
+    Windows-1252 become '?'.
+    
+    Args:
+        text: Text to print
+        
+    Returns:
+        The text with one character per Windows-1252 byte
+    """
+    return text.encode('cp1252', 'replace').decode('latin-1')
+
+
+def _to_unicode_cmap(characters: Dict[int, int]) -> str:
+    """
+    Build the ToUnicode CMap of a font whose character codes are glyph IDs.
+    
+    Args:
+        characters: Mapping from glyph ID to code point
+        
+    Returns:
+        The CMap program, so text can be copied and searched
+    """
+    lines = [
+        "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+        "/CIDSystemInfo <</Registry (Adobe) /Ordering (UCS) /Supplement 0>> def",
+        "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+        "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange",
+    ]
+    pairs = sorted(characters.items())
+    # At most 100 mappings per block
+    for start in range(0, len(pairs), 100):
+        block = pairs[start:start + 100]
+        lines.append(f"{len(block)} beginbfchar")
+        lines.extend(
+            f"<{glyph:04X}> <{chr(codepoint).encode('utf-16-be').hex().upper()}>" for glyph, codepoint in block
+        )
+        lines.append("endbfchar")
+    lines.extend(["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"])
+    return "\n".join(lines)
+
+
+def _no_mark(phase: str) -> None:
+    """Stand-in for FileProfile.mark when the rendering is not profiled."""
+
+
+def page_geometry(pdf: FPDF) -> PageGeometry:
+    """
+    Get the measures that paginate exercises in a document.
+    
+    Args:
+        pdf: Document created by new_document()
+        
+    Returns:
+        The page geometry of the document
+    """
+    return PageGeometry(pdf.t_margin, pdf.page_break_trigger, LINE_HEIGHT, HEADER_HEIGHT, SPACER_HEIGHT)
+
+
+def layout_exercise(
+    job: ExerciseJob,
+    profile: Optional[FileProfile] = None,
+    limits: Optional[ReadLimits] = None,
+    report: Sequence[str] = (),
+    font: Optional[str] = None,
+) -> ExerciseLayout:
+    """
+    Read, wrap and paginate one exercise, without emitting anything.
+    
+    Args:
+        job: Tuple of (full_path, file_name, contents) for the C source file;
+            the file is read here when contents is None
+        profile: Receives the timings and counters of the layout, if given
+        limits: Size limits of the file (defaults to ReadLimits())
+        report: Compiler and program output printed after the code
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        The rows of the exercise and the pages they fall on
+    """
+    full_path, c_file, data = job
+    mark = profile.mark if profile is not None else _no_mark
+    pdf = new_document(font)
+    font_text = pdf.font_text
+    builder = LayoutBuilder(page_geometry(pdf))
+    builder.add(HEADER, font_text(f"Exercício: {c_file}"))
+    
+    try:
+        # Lines are split like text-mode open() does, including newline translation
+        source = data if isinstance(data, SourceText) else read_source(full_path, data, limits)
+        mark("read")
+        if source.binary:
+            # Misnamed binary files have no lines to print
+            builder.add(NOTE, font_text(f"Arquivo {c_file} parece ser binário e foi ignorado."))
+        
+        # Calculate available width for code content (total width - line number width - margins)
+        page_width = pdf.w - 2 * pdf.l_margin  # Total usable width
+        line_number_width = LINE_NUMBER_WIDTH  # Width reserved for line numbers
+        metrics = get_font_metrics(pdf)
+        tab_width = metrics.char_width("\t")  # Width of tab character
+        available_width = page_width - line_number_width - tab_width
+        mark("measure")
+        
+        # Wrap the whole file at once; lines that fit come back as a single row
+        wrapped_file = metrics.wrap_lines(
+            [font_text(line) for line in source.lines], available_width - tab_width
+        )
+        mark("wrap")
+        if profile is not None:
+            profile.size = source.size
+        
+        builder.add_code(wrapped_file)
+        if source.truncated:
+            builder.add(
+                NOTE,
+                f"[Arquivo truncado após {len(wrapped_file)} linhas; o arquivo completo tem {source.size} bytes]"
+            )
+        builder.add(NOTE, f"Total de linhas: {len(wrapped_file)}")
+        
+        # Compiler and program output, wrapped to the full text width
+        for rows in metrics.wrap_lines([font_text(line) for line in report], page_width):
+            for text in rows:
+                builder.add(NOTE, text)
+    except Exception as e:
+        builder.add(NOTE, font_text(f"Erro ao ler arquivo {c_file}: {str(e)}"))
+    
+    builder.add(SPACER)
+    layout = builder.finish()
+    mark("paginate")
+    if profile is not None:
+        profile.lines = layout.lines
+        profile.wrapped_lines = layout.wrapped_lines
+        profile.pages = layout.page_count
+    return layout
+
+
+def emit_exercise(layout: ExerciseLayout, font: Optional[str] = None) -> List[str]:
+    """
+    Turn the layout of an exercise into closed page content streams.
+    
+    Pages break exactly where the layout says; fpdf's automatic page
+    breaks are turned off.
+    
+    Args:
+        layout: Layout returned by layout_exercise
+        font: TrueType font the layout was made with, if any
+        
+    Returns:
+        The page content streams of the exercise, footer included
+    """
+    pdf = new_document(font)
+    pdf.set_auto_page_break(False, PAGE_BREAK_MARGIN)
+    geometry = page_geometry(pdf)
+    texts, kinds, numbers = layout.texts, layout.kinds, layout.numbers
+    # Select the header font before the page opens, so it is the first font set on it
+    pdf.set_font("Arial", 'B', 12)
+    for page in range(layout.page_count):
+        rows = layout.page_rows(page)
+        if page > 0:
+            # The footer of a page full of code inherits the gutter color,
+            # as it did when a line-number cell broke the page
+            if kinds[rows.start] in CODE_KINDS:
+                pdf.set_text_color(*GUTTER_COLOR)
+            pdf.add_page()
+            pdf.set_text_color(0, 0, 0)
+        else:
+            pdf.add_page()
+        code_start = None
+        for row in rows:
+            kind = kinds[row]
+            if kind in CODE_KINDS:
+                if code_start is None:
+                    code_start = row
+                continue
+            if code_start is not None:
+                # Gray line numbers and black code, a page-sized text object at a time
+                pdf.write_code_block(texts[code_start:row], numbers[code_start:row], LINE_NUMBER_WIDTH, LINE_HEIGHT)
+                code_start = None
+            pdf.cell(0, geometry.height(kind), texts[row], ln=True)
+            if kind == HEADER:
+                pdf.set_font("Courier", size=10)
+        if code_start is not None:
+            pdf.write_code_block(
+                texts[code_start:rows.stop], numbers[code_start:rows.stop], LINE_NUMBER_WIDTH, LINE_HEIGHT
+            )
+    pdf.finish_page()
+    return [pdf.pages[n] for n in range(1, pdf.page + 1)]
+
+
+def render_exercise_pages(
+    job: ExerciseJob,
+    profile: Optional[FileProfile] = None,
+    limits: Optional[ReadLimits] = None,
+    report: Sequence[str] = (),
+    font: Optional[str] = None,
+) -> List[str]:
+    """
+    Render one exercise into its own, closed pages.
+    
+    Every exercise starts on a new page, so its pages can be rendered in a
+    separate document (possibly in a worker process) and appended to the
+    final document afterwards.
+    
+    Args:
+        job: Tuple of (full_path, file_name, contents) for the C source file;
+            the file is read here when contents is None
+        profile: Receives the timings and counters of the rendering, if given
+        limits: Size limits of the file (defaults to ReadLimits())
+        report: Compiler and program output printed after the code
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        The page content streams of the exercise, footer included
+    """
+    layout = layout_exercise(job, profile, limits, report, font)
+    pages = emit_exercise(layout, font)
+    if profile is not None:
+        profile.mark("emit")
+    return pages
+
+
+def render_exercise_counted(
+    job: ExerciseJob,
+    profiled: bool = False,
+    limits: Optional[ReadLimits] = None,
+    report: Sequence[str] = (),
+    font: Optional[str] = None,
+) -> RenderResult:
+    """
+    Render one exercise and count its source lines, profiling the rendering if asked.
+    
+    Args:
+        job: Tuple of (full_path, file_name, contents) for the C source file
+        profiled: Profile the rendering
+        limits: Size limits of the file (defaults to ReadLimits())
+        report: Compiler and program output printed after the code
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        Tuple of (page content streams, lines numbered in the PDF, profile
+        of the rendering or None)
+    """
+    # The layout counts the lines into the profile, which costs a few clock reads
+    profile = FileProfile(job[0], job[1])
+    pages = render_exercise_pages(job, profile, limits, report, font)
+    return pages, profile.lines, profile if profiled else None
+
+
+def exercise_header(file_name: str, font: Optional[str] = None) -> str:
+    """
+    Render the start of the first page of an exercise, up to its header.
+    
+    The first page emit_exercise produces begins with exactly this text,
+    whatever the file holds; the rest of the page does not depend on the
+    file name, so it can be shared by files with the same contents.
+    
+    Args:
+        file_name: File name shown in the header
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        The content stream of the page so far
+    """
+    pdf = new_document(font)
+    pdf.set_auto_page_break(False, PAGE_BREAK_MARGIN)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.add_page()
+    pdf.cell(0, HEADER_HEIGHT, pdf.font_text(f"Exercício: {file_name}"), ln=True)
+    return pdf.pages[1]
+
+
+def render_reference_page(
+    file_name: str, original: str, page_number: int, target: int, font: Optional[str] = None
+) -> Tuple[str, List[Link]]:
+    """
+    Render the page standing for a file that repeats an earlier one.
+    
+    Args:
+        file_name: File name shown in the header
+        original: Path of the earlier file, as shown to the reader
+        page_number: Page number of the earlier file
+        target: Object number of the first page of the earlier file
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        The closed page content stream, with the note linking to the earlier file
+    """
+    pdf = new_document(font)
+    pdf.set_auto_page_break(False, PAGE_BREAK_MARGIN)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.add_page()
+    pdf.cell(0, HEADER_HEIGHT, pdf.font_text(f"Exercício: {file_name}"), ln=True)
+    pdf.set_font("Courier", size=10)
+    top = pdf.y
+    pdf.cell(0, LINE_HEIGHT, pdf.font_text(f"Idêntico a {original} (página {page_number})"), ln=True)
+    k = pdf.k
+    area = (pdf.l_margin * k, (pdf.h - top - LINE_HEIGHT) * k, (pdf.w - pdf.r_margin) * k, (pdf.h - top) * k)
+    pdf.finish_page()
+    return pdf.pages[1], [(area, target)]
+
+
+def render_blank_page(font: Optional[str] = None) -> List[str]:
+    """
+    Render an empty page carrying only the footer.
+    
+    Args:
+        font: TrueType font drawing the footer instead of the core fonts
+        
+    Returns:
+        A single closed page content stream
+    """
+    pdf = new_document(font)
+    pdf.add_page()
+    pdf.finish_page()
+    return [pdf.pages[1]]
+
+
+def render_toc_pages(
+    layout: ExerciseLayout,
+    entries: List[TocEntry],
+    page_numbers: List[int],
+    targets: List[int],
+    font: Optional[str] = None,
+) -> List[Tuple[str, List[Link]]]:
+    """
+    Render the table of contents once the exercises have been written.
+    
+    Args:
+        layout: Pagination of the contents, from layout_toc
+        entries: Rows of the table of contents
+        page_numbers: Page number shown for each exercise
+        targets: Page object number of the first page of each exercise
+        font: TrueType font drawing the text instead of the core fonts
+        
+    Returns:
+        The content stream of each contents page, with the areas of its
+        rows linking to the exercises
+    """
+    pdf = new_document(font)
+    pdf.set_auto_page_break(False, PAGE_BREAK_MARGIN)
+    k = pdf.k
+    pages_links: List[List[Link]] = []
+    pdf.set_font("Arial", 'B', 12)
+    for page in range(layout.page_count):
+        pdf.add_page()
+        links: List[Link] = []
+        for row in layout.page_rows(page):
+            if layout.kinds[row] == HEADER:
+                pdf.cell(0, HEADER_HEIGHT, pdf.font_text(layout.texts[row]), ln=True)
+                continue
+            entry = entries[row - 1]
+            top = pdf.y
+            if entry.directory:
+                pdf.set_font("Arial", 'B', 10)
             else:
-                # If current line has content, save it and start new line
-                if current_line:
-                    lines.append(current_line)
-                    current_line = word
-                else:
-                    # Single word is too long, force break it
-                    lines.append(word)
+                pdf.set_font("Courier", size=10)
+            pdf.set_x(pdf.l_margin + entry.level * TOC_INDENT)
+            pdf.cell(0, LINE_HEIGHT, pdf.font_text(entry.title))
+            if not entry.directory:
+                pdf.set_x(pdf.l_margin)
+                pdf.cell(0, LINE_HEIGHT, str(page_numbers[entry.exercise]), align='R')
+            pdf.ln(LINE_HEIGHT)
+            area = (pdf.l_margin * k, (pdf.h - top - LINE_HEIGHT) * k, (pdf.w - pdf.r_margin) * k, (pdf.h - top) * k)
+            links.append((area, targets[entry.exercise]))
+        pages_links.append(links)
+    pdf.finish_page()
+    return [(pdf.pages[n], pages_links[n - 1]) for n in range(1, pdf.page + 1)]
+
+
+def _start_exercise(
+    executor: Optional[Executor],
+    job: Tuple[str, str],
+    cache: Optional[RenderCache],
+    layout: str,
+    profiled: bool = False,
+    limits: Optional[ReadLimits] = None,
+    source: Optional[SourceText] = None,
+    archive: Optional[SourceSet] = None,
+    report: Sequence[str] = (),
+    font: Optional[str] = None,
+) -> Tuple[Optional[str], Union[RenderResult, "Future[RenderResult]"]]:
+    """
+    Look an exercise up in the cache, or start rendering it.
+    
+    Args:
+        executor: Pool rendering the exercise, or None to render in-process
+        job: Tuple of (full_path, file_name)
+        cache: Render cache, if enabled
+        layout: Layout signature used in cache keys
+        profiled: Profile the rendering
+        limits: Size limits of the file
+        source: The file, already read by the prefetcher
+        archive: Archive (or other SourceSet) the file is read from, if any
+        report: Compiler and program output printed after the code
+        font: TrueType font drawing the text instead of the core fonts
         
-        # Add the last line if it has content
-        if current_line:
-            lines.append(current_line)
+    Returns:
+        Tuple of (cache key to store the result under, rendering result or
+        pending future)
+    """
+    full_path, c_file = job
+    data: Union[bytes, SourceText, None] = source
+    if archive is not None and data is None:
+        data = archive.read(full_path)
+    key = None
+    if cache is not None:
+        if report:
+            # The same source renders differently with another report
+            layout += "\0" + "\n".join(report)
+        if archive is None:
+            key, data = cache.file_key(full_path, c_file, layout)
+        elif isinstance(data, bytes):
+            # Members cut at the byte limit come back decoded and are not cached
+            key = cache.key(data, c_file, layout)
+        if key is not None:
+            cached = cache.get(key)
+            if cached:
+                # Entries end with the line count, stored after the pages
+                return None, (cached[:-1], int(cached[-1]), None)
+    exercise = (full_path, c_file, data)
+    if executor is None:
+        return key, render_exercise_counted(exercise, profiled, limits, report, font)
+    return key, executor.submit(render_exercise_counted, exercise, profiled, limits, report, font)
+
+
+def _load_source(
+    full_path: str, limits: Optional[ReadLimits], archive: Optional[SourceSet] = None
+) -> Optional[SourceText]:
+    """Read and decode a file on a prefetch thread; None lets the renderer report errors."""
+    try:
+        if archive is None:
+            return read_source(full_path, limits=limits, use_mmap=False)
+        data = archive.read(full_path)
+        if data is None or isinstance(data, SourceText):
+            return data
+        return read_source(full_path, data, limits)
+    except OSError:
+        return None
+
+
+def _prefetched_sources(
+    c_files: List[Tuple[str, str]], depth: int, limits: Optional[ReadLimits], archive: Optional[SourceSet] = None
+) -> Iterator[Optional[SourceText]]:
+    """
+    Read and decode files ahead of the renderer on a thread pool.
+    
+    At most `depth` files are being read or waiting to be rendered at any
+    time, so memory stays bounded however many files there are.
+    
+    Args:
+        c_files: List of (full_path, file_name) tuples in document order
+        depth: Number of files read ahead
+        limits: Size limits of each file
+        archive: Archive (or other SourceSet) the files are read from, if any
+        
+    Yields:
+        The source of each file, in order (None if it could not be read)
+    """
+    files = iter(c_files)
+    pool = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="prefetch")
+    pending: Deque["Future[Optional[SourceText]]"] = deque(
+        pool.submit(_load_source, full_path, limits, archive) for full_path, _ in islice(files, depth)
+    )
+    try:
+        while pending:
+            future = pending.popleft()
+            following = next(files, None)
+            if following is not None:
+                pending.append(pool.submit(_load_source, following[0], limits, archive))
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _rendered_exercises(
+    c_files: List[Tuple[str, str]],
+    jobs: int,
+    cache: Optional[RenderCache],
+    profiler: Optional[Profiler] = None,
+    limits: Optional[ReadLimits] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    archive: Optional[SourceSet] = None,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    digests: Optional[Sequence[Optional[str]]] = None,
+) -> Iterator[Tuple[Union[List[str], int], int]]:
+    """
+    Render exercises (or fetch them from the cache) in document order.
+    
+    With more than one job, at most a bounded window of exercises is in
+    flight, so finished pages never pile up faster than they are written.
+    When rendering in-process without a cache, the next files are read and
+    decoded on background threads while the current one is laid out.
+    
+    Args:
+        c_files: List of (full_path, file_name) tuples in document order
+        jobs: Number of worker processes
+        cache: Render cache, if enabled
+        profiler: Receives the profile of every rendered exercise, if given
+        limits: Size limits of each file
+        prefetch: Number of files read ahead (0 disables prefetching)
+        archive: Archive (or other SourceSet) the files are read from, if any
+        execution: Compile (and run) each file with these settings, printing
+            the outcome after its code
+        exec_jobs: Compilations run at the same time (0 uses every CPU core)
+        font: TrueType font drawing the text instead of the core fonts
+        digests: Digest of each file whose contents other files repeat
+            (None for the others); only the first file with a digest is
+            rendered
         
-        return lines if lines else [""]
+    Yields:
+        Tuple of (pages, source lines numbered in the PDF) for each exercise,
+        in order; for a file repeating an earlier one, the index of that
+        file stands for its pages
+    """
+    layout = layout_signature(limits, font) if cache is not None else ""
+    # Index of the earlier file each copy repeats; copies are neither read nor rendered
+    copies: Dict[int, int] = {}
+    if digests is not None:
+        originals: Dict[str, int] = {}
+        for index, digest in enumerate(digests):
+            if digest is not None and originals.setdefault(digest, index) != index:
+                copies[index] = originals[digest]
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    # Workers read their own files in parallel, and the cache reads files to hash them
+    sources = None
+    if executor is None and cache is None and prefetch > 0:
+        rendered = [job for index, job in enumerate(c_files) if index not in copies]
+        sources = _prefetched_sources(rendered, prefetch, limits, archive)
+    reports = None
+    if execution is not None:
+        # A second view of the cache directory, so results do not count as page hits or misses
+        results = RenderCache(cache.directory, cache.max_bytes) if cache is not None else None
+        reports = execution_reports(c_files, execution, exec_jobs, results, archive)
+    window = jobs * 4
+    pending: Deque[Tuple[Optional[str], Union[RenderResult, "Future[RenderResult]", int]]] = deque()
+    # Source lines of each exercise finished so far, which copies repeat
+    line_counts: List[int] = []
+    
+    def finish() -> Tuple[Union[List[str], int], int]:
+        key, result = pending.popleft()
+        if isinstance(result, int):
+            line_counts.append(line_counts[result])
+            return result, line_counts[-1]
+        pages, lines, profile = result.result() if isinstance(result, Future) else result
+        if profile is not None:
+            profiler.add_file(profile)
+        if cache is not None and key is not None:
+            cache.put(key, pages + [str(lines)])
+        line_counts.append(lines)
+        return pages, lines
+    
+    try:
+        for index, job in enumerate(c_files):
+            report = next(reports) if reports is not None else ()
+            if index in copies:
+                pending.append((None, copies[index]))
+            else:
+                source = next(sources) if sources is not None else None
+                pending.append(_start_exercise(
+                    executor, job, cache, layout, profiler is not None, limits, source, archive, report, font
+                ))
+            if len(pending) >= window:
+                yield finish()
+        while pending:
+            yield finish()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if sources is not None:
+            sources.close()
+        if reports is not None:
+            reports.close()
 
 
-def create_exercises_pdf(root_folder: str, output_file: str = "exercises.pdf") -> bool:
+def _write_shared_exercise(writer: StreamingPDFWriter, pages: List[str], header: str) -> Tuple[int, List[int]]:
+    """
+    Write an exercise whose contents later files repeat, keeping its body shareable.
+    
+    Each page body (the first page without its header) becomes a content
+    stream of its own, which the pages of the copies reference as well.
+    
+    Args:
+        writer: Writer of the document
+        pages: Page content streams of the exercise
+        header: Start of the first page, from exercise_header
+        
+    Returns:
+        Tuple of (object number of the first page, body streams); there are
+        no body streams when the first page does not start with the header
+    """
+    if not pages or not pages[0].startswith(header):
+        return writer.add_pages(pages), []
+    bodies = [writer.add_stream(pages[0][len(header):])] + [writer.add_stream(page) for page in pages[1:]]
+    return _write_copy(writer, header, bodies), bodies
+
+
+def _write_copy(writer: StreamingPDFWriter, header: str, bodies: List[int]) -> int:
+    """Write the pages of an exercise: its own header followed by shared page bodies."""
+    first = writer.add_page(header, shared=bodies[:1])
+    for body in bodies[1:]:
+        writer.add_page("", shared=[body])
+    return first
+
+
+def _write_document(
+    stream: BinaryIO,
+    root_folder: str,
+    c_files: List[Tuple[str, str]],
+    archive: Optional[SourceSet] = None,
+    jobs: int = 1,
+    cache: Optional[RenderCache] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    profiler: Optional[Profiler] = None,
+    limits: Optional[ReadLimits] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> None:
+    """
+    Render the exercises and write the whole document to a binary stream.
+    
+    The stream is only written to, in order, so it may be a pipe or a socket.
+    The arguments after archive are those of create_exercises_pdf.
+    
+    Args:
+        stream: Binary stream receiving the document
+        root_folder: Directory (or archive) the files were found in
+        c_files: List of (full_path, file_name) tuples in document order
+        archive: Archive (or other SourceSet) the files are read from, if any
+        
+    Raises:
+        GenerationCancelled: If cancel was set before the document was finished
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(c_files))
+    
+    digests = None
+    if duplicates != "render" and execution is None:
+        with timed_phase(profiler, "discovery"):
+            digests = repeated_digests(c_files, archive, limits)
+    
+    total = len(c_files)
+    lines = 0
+    copies = 0
+    document = new_document(font)
+    document.set_compression_level(compression)
+    writer = StreamingPDFWriter(stream, document, compact)
+    entries = toc_entries(root_folder, c_files)
+    toc_layout = layout_toc(entries, page_geometry(document)) if toc else None
+    front = toc_layout.page_count if toc_layout is not None else 0
+    # First page of each exercise: its number as shown, and its object
+    page_numbers: List[int] = []
+    first_pages: List[int] = []
+    # Body streams of the files that later files repeat, by index
+    bodies: Dict[int, List[int]] = {}
+    exercises = timed_iter(
+        profiler, "render", _rendered_exercises(
+            c_files, jobs, cache, profiler, limits, prefetch, archive, execution, exec_jobs, font, digests
+        )
+    )
+    for done, (pages, exercise_lines) in enumerate(exercises, 1):
+        if cancel is not None and cancel.is_set():
+            raise GenerationCancelled()
+        full_path, c_file = c_files[done - 1]
+        with timed_phase(profiler, "write"):
+            page_numbers.append(front + writer.page_count + 1)
+            if isinstance(pages, int):
+                # A copy of an earlier file, which was not rendered again
+                copies += 1
+                if duplicates == "reference":
+                    content, links = render_reference_page(
+                        c_file, os.path.relpath(c_files[pages][0], root_folder), page_numbers[pages],
+                        first_pages[pages], font
+                    )
+                    first_pages.append(writer.add_page(content, links))
+                elif bodies.get(pages):
+                    first_pages.append(_write_copy(writer, exercise_header(c_file, font), bodies[pages]))
+                else:
+                    data = archive.read(full_path) if archive is not None else None
+                    pages = render_exercise_pages((full_path, c_file, data), limits=limits, font=font)
+                    first_pages.append(writer.add_pages(pages))
+            elif duplicates == "share" and digests is not None and digests[done - 1] is not None:
+                first, bodies[done - 1] = _write_shared_exercise(
+                    writer, pages, exercise_header(c_file, font)
+                )
+                first_pages.append(first)
+            else:
+                first_pages.append(writer.add_pages(pages))
+        if progress is not None:
+            lines += exercise_lines
+            progress(done, total, lines)
+    
+    # Trailing page, as every exercise is followed by a page break
+    with timed_phase(profiler, "write"):
+        writer.add_pages(render_blank_page(font))
+        toc_page = None
+        if toc_layout is not None:
+            for content, links in render_toc_pages(toc_layout, entries, page_numbers, first_pages, font):
+                page_object = writer.add_page(content, links, front=True)
+                toc_page = toc_page or page_object
+        writer.set_outline(build_outline(entries, first_pages, toc_page))
+        writer.close()
+    if profiler is not None:
+        profiler.count("files", total)
+        profiler.count("pages", writer.page_count)
+        profiler.count("duplicates", copies)
+        profiler.count("bytes_written", writer.position)
+        if cache is not None:
+            profiler.count("cache_hits", cache.hits)
+            profiler.count("cache_misses", cache.misses)
+
+
+def create_exercises_pdf(
+    root_folder: str,
+    output_file: Union[str, BinaryIO] = "exercises.pdf",
+    jobs: int = 1,
+    cache: Optional[RenderCache] = None,
+    c_files: Optional[List[Tuple[str, str]]] = None,
+    discovery: Optional[DiscoveryOptions] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    profiler: Optional[Profiler] = None,
+    limits: Optional[ReadLimits] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> bool:
     """
     Create a PDF containing all C source files found in the given directory.
     
     The function traverses the directory structure recursively, finding all .c files,
     and adds their content to a PDF document with proper formatting.
     
+    root_folder may also be a zip or tar archive (optionally compressed):
+    its members are listed, filtered and sorted like the files of a
+    directory and decoded straight from the archive, without extracting it.
+    
+    Each exercise's pages are written to the output file as soon as they are
+    rendered, so memory use does not grow with the size of the document.
+    With more than one job, exercises are laid out in worker processes and
+    written in natural-sort order, producing the same document as a serial run.
+    With a cache, only new or changed files are rendered again.
+    
+    Files with identical contents are found by hash before rendering, and
+    only the first of them is laid out and encoded. By default its page
+    bodies are written once and shared by the pages of every copy, which
+    only add their own header; a copy can also be a single page pointing
+    at the first file instead.
+    
+    Every file and directory gets a bookmark in the document outline. The
+    optional table of contents is paginated before rendering starts, so the
+    page numbers it shows are known as exercises are written; its pages are
+    rendered last and placed first in the page tree, in the same pass.
+    
+    The document is written to a temporary file next to output_file and
+    moved into place once complete, so a failed or cancelled run never
+    leaves a partial PDF behind. output_file may also be a binary stream
+    (e.g. sys.stdout.buffer or a socket file), which receives the pages as
+    they are rendered.
+    
     Args:
-        root_folder: Path to the directory containing the C files
-        output_file: Name of the output PDF file
+        root_folder: Path to the directory containing the C files, or to an archive
+        output_file: Name of the output PDF file, or a binary stream to write it to
+        jobs: Number of worker processes (0 uses every CPU core)
+        cache: Cache of rendered pages reused across runs
+        c_files: Files to include, as (full_path, file_name) tuples in document
+            order; when omitted, root_folder is scanned
+        discovery: Filters and traversal settings used when scanning root_folder
+        progress: Called after each exercise is written; may run on a
+            background thread, so it must be thread-safe
+        cancel: Event that stops the generation between exercises when set
+        profiler: Receives phase timings, counters and per-file profiles
+        limits: Size limits of each file; larger files are truncated
+        prefetch: Number of files read ahead of a serial, uncached renderer
+        compression: zlib level of the page streams (0 = uncompressed, 9 = smallest)
+        compact: Write a PDF 1.5 file with object streams and a cross-reference
+            stream, which is noticeably smaller for documents with many pages
+        toc: Start the document with a clickable table of contents
+        execution: Compile each file with these settings (and run it, if
+            configured), printing the compiler and program output after its code
+        exec_jobs: Compilations run at the same time (0 uses every CPU core)
+        font: TrueType (.ttf) font drawing all the text instead of the core
+            fonts, so any character it has can be printed; only the glyphs
+            the document uses are embedded
+        duplicates: What files repeating an earlier file become: "share"
+            (the same pages, sharing their content streams), "reference" (one
+            page linking to the earlier file) or "render" (rendered again);
+            with execution, every file is rendered, as compiling the same
+            source elsewhere can give another result
         
     Returns:
         True if PDF was created successfully, False otherwise
+        
+    Raises:
+        GenerationCancelled: If cancel was set before the document was finished
     """
     if not os.path.exists(root_folder):
         print(f"Error: Directory '{root_folder}' does not exist.")
         return False
-        
-    pdf = CustomPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Courier", size=10)
     
-    for dirpath, dirnames, filenames in os.walk(root_folder):
-        dirnames.sort(key=natural_sort_key)
-        c_files = [f for f in filenames if f.endswith('.c')]
-        c_files.sort(key=natural_sort_key)
+    archive = None
+    if is_archive(root_folder):
+        with timed_phase(profiler, "discovery"):
+            archive = SourceArchive(root_folder, discovery, limits)
+        if c_files is None:
+            c_files = archive.files
+    if c_files is None:
+        with timed_phase(profiler, "discovery"):
+            c_files = find_c_files(root_folder, discovery)
+    
+    temp_file = output_file + ".part" if isinstance(output_file, str) else None
+    try:
+        with open(temp_file, 'wb') if temp_file is not None else nullcontext(output_file) as stream:
+            _write_document(
+                stream, root_folder, c_files, archive, jobs, cache, progress, cancel, profiler, limits, prefetch,
+                compression, compact, toc, execution, exec_jobs, font, duplicates
+            )
+        if temp_file is not None:
+            os.replace(temp_file, output_file)
+    except BaseException:
+        if temp_file is not None and os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    finally:
+        if archive is not None:
+            archive.close()
+    return True
+
+
+def write_exercises_pdf(
+    sources: Iterable[Tuple[str, SourceInput]],
+    stream: BinaryIO,
+    jobs: int = 1,
+    cache: Optional[RenderCache] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    profiler: Optional[Profiler] = None,
+    limits: Optional[ReadLimits] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    compression: int = DEFAULT_COMPRESSION_LEVEL,
+    compact: bool = False,
+    toc: bool = False,
+    execution: Optional[ExecConfig] = None,
+    exec_jobs: int = 0,
+    font: Optional[str] = None,
+    duplicates: str = DEFAULT_DUPLICATES,
+) -> None:
+    """
+    Create a PDF of the given source files and write it to a binary stream.
+    
+    This is the entry point for programs that hold the sources themselves,
+    e.g. a web service receiving uploads: nothing is scanned, extracted or
+    written to disk. Each source is a (name, contents) pair, where contents
+    are bytes or the path of a file; names are relative paths whose
+    directories group the table of contents. Files are printed in the given
+    order.
+    
+    sources may be a generator. It is consumed before rendering starts, as
+    the table of contents and the search for identical files need every
+    name, but contents given as paths are only read when rendered, so a
+    generator of paths keeps memory flat. Pages reach the stream as soon as
+    they are rendered. The other arguments are those of create_exercises_pdf.
+    
+    Args:
+        sources: (name, bytes or path) pairs in document order
+        stream: Binary stream receiving the document, written in order only
         
-        for c_file in c_files:
-            full_path = os.path.join(dirpath, c_file)
-            
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 10, f"Exercício: {c_file}", ln=True)
-            pdf.set_font("Courier", size=10)
-            
-            try:
-                with open(full_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    lineNumber = 1
-                    
-                    # Calculate available width for code content (total width - line number width - margins)
-                    page_width = pdf.w - 2 * pdf.l_margin  # Total usable width
-                    line_number_width = 20  # Width reserved for line numbers
-                    tab_width = pdf.get_string_width("\t")  # Width of tab character
-                    available_width = page_width - line_number_width - tab_width
-                    
-                    for line in content.split('\n'):
-                        # Set gray color for line number
-                        pdf.set_text_color(128, 128, 128)  # Gray color
-                        pdf.cell(line_number_width, 5, f"{lineNumber}", ln=0)
-                        
-                        # Reset to black for code content
-                        pdf.set_text_color(0, 0, 0)  # Black color
-                        
-                        # Check if line needs wrapping
-                        line_content = f"\t{line}"
-                        line_width = pdf.get_string_width(line_content)
-                        
-                        if line_width <= available_width:
-                            # Line fits, print normally
-                            pdf.cell(0, 5, line_content, ln=True)
-                        else:
-                            # Line needs wrapping
-                            wrapped_lines = pdf.wrap_text_to_lines(line, available_width - tab_width)
-                            
-                            # Print first wrapped line with tab
-                            if wrapped_lines:
-                                pdf.cell(0, 5, f"\t{wrapped_lines[0]}", ln=True)
-                                
-                                # Print continuation lines with proper indentation
-                                for wrapped_line in wrapped_lines[1:]:
-                                    # Empty line number cell for continuation lines
-                                    pdf.set_text_color(128, 128, 128)
-                                    pdf.cell(line_number_width, 5, "", ln=0)
-                                    pdf.set_text_color(0, 0, 0)
-                                    pdf.cell(0, 5, f"\t{wrapped_line}", ln=True)
-                        
-                        lineNumber += 1
-                    
-                    pdf.cell(0, 5, f"Total de linhas: {lineNumber-1}", ln=True)
-            except Exception as e:
-                pdf.cell(0, 5, f"Erro ao ler arquivo {c_file}: {str(e)}", ln=True)
-            
-            pdf.cell(0, 10, "", ln=True)
-            pdf.add_page()
+    Raises:
+        ValueError: If a name is empty, leaves its root or is given twice
+        GenerationCancelled: If cancel was set before the document was finished
+    """
+    items = SourceItems(sources, limits)
+    _write_document(
+        stream, items.path, items.files, items, jobs, cache, progress, cancel, profiler, limits, prefetch,
+        compression, compact, toc, execution, exec_jobs, font, duplicates
+    )
+
+
+def exercises_pdf_bytes(sources: Iterable[Tuple[str, SourceInput]], **settings: Any) -> bytes:
+    """
+    Create a PDF of the given source files in memory.
     
-    pdf.output(output_file)
-    return True 
\ No newline at end of file
+    Args:
+        sources: (name, bytes or path) pairs in document order
+        settings: Keyword arguments of write_exercises_pdf
+        
+    Returns:
+        The whole document
+    """
+    buffer = io.BytesIO()
+    write_exercises_pdf(sources, buffer, **settings)
+    return buffer.getvalue()
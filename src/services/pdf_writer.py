@@ -0,0 +1,455 @@
+"""Incremental PDF writer that streams finished pages to the output file."""
+import zlib
+from array import array
+from typing import BinaryIO, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from fpdf import FPDF
+
+# Objects gathered into one object stream in compact mode
+OBJECTS_PER_STREAM = 256
+
+# Clickable area of a page, in points from the bottom-left corner
+# (x1, y1, x2, y2), and the object number of the page it jumps to
+Link = Tuple[Tuple[float, float, float, float], int]
+
+
+class OutlineItem:
+    """One bookmark of the document outline."""
+
+    __slots__ = ("title", "page_object", "children", "number")
+
+    def __init__(self, title: str, page_object: int) -> None:
+        """
+        Initialize the bookmark.
+
+        Args:
+            title: Text shown in the viewer's outline panel
+            page_object: Object number of the page it opens
+        """
+        self.title = title
+        self.page_object = page_object
+        self.children: List["OutlineItem"] = []
+        # Object number, assigned when the outline is written
+        self.number = 0
+
+    def __repr__(self) -> str:
+        """Return a readable representation of the bookmark."""
+        return f"OutlineItem({self.title!r}, {self.page_object!r})"
+
+
+def pdf_text_string(text: str) -> str:
+    """
+    Encode text as a PDF text string, e.g. for bookmark titles.
+
+    Args:
+        text: Any Unicode text
+
+    Returns:
+        A literal string for printable ASCII, UTF-16 hex with a byte order mark otherwise
+    """
+    if text.isascii() and text.isprintable():
+        return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+    return "<FEFF" + text.encode("utf-16-be").hex().upper() + ">"
+
+
+class StreamingPDFWriter:
+    """
+    Write a PDF document page by page with bounded memory.
+
+    Page objects and their content streams are written as soon as they are
+    added; only the object offsets (the cross-reference table) and the page
+    object numbers stay in memory. Fonts, resources and the page tree are
+    written when the writer is closed.
+
+    Object numbers follow fpdf's layout: 1 is the page tree, 2 is the shared
+    resource dictionary, and everything else is numbered as it is written.
+
+    In compact mode the document is written as PDF 1.5: objects that are
+    not streams (page dictionaries, fonts, the page tree, ...) are packed
+    into compressed object streams of OBJECTS_PER_STREAM objects, and the
+    cross-reference table becomes a compressed cross-reference stream.
+    """
+
+    def __init__(self, stream: BinaryIO, document: FPDF, compact: bool = False) -> None:
+        """
+        Initialize the writer and write the PDF header.
+
+        Args:
+            stream: Binary stream receiving the PDF bytes
+            document: Document providing fonts, page size and compression
+                settings (including its compression_level, if it has one);
+                its registered fonts become the shared resources, and its
+                observe_content method, if any, sees every page written
+            compact: Pack objects into object streams and write a
+                cross-reference stream
+        """
+        self.stream = stream
+        self.document = document
+        self.compact = compact
+        self.level = getattr(document, "compression_level", zlib.Z_DEFAULT_COMPRESSION)
+        self.position = 0
+        self.n = 2
+        # offsets[n] is the byte offset of object n, or its index inside
+        # object stream containers[n] when that is not 0
+        self.offsets = array('q', [0, 0, 0])
+        self.containers = array('q', [0, 0, 0])
+        self.page_objects = array('q')
+        # Pages shown before every other page, e.g. a table of contents written last
+        self.front_objects = array('q')
+        self.outline: List[OutlineItem] = []
+        # Objects waiting for the next object stream: (number, body)
+        self.pending: List[Tuple[int, bytes]] = []
+        # Told about every page, e.g. so the document embeds the glyphs the pages show
+        self.content_observer: Optional[Callable[[str], None]] = getattr(document, "observe_content", None)
+        version = "1.5" if compact else document.pdf_version
+        self._write(f"%PDF-{version}\n".encode("latin1"))
+
+    @property
+    def page_count(self) -> int:
+        """Return the number of pages written so far."""
+        return len(self.front_objects) + len(self.page_objects)
+
+    def add_page(
+        self, content: str, links: Sequence[Link] = (), front: bool = False, shared: Sequence[int] = ()
+    ) -> int:
+        """
+        Write one page and its content stream.
+
+        Args:
+            content: Page content stream, as produced by fpdf; with shared
+                streams it may be empty, and is then not written
+            links: Areas of the page jumping to other pages
+            front: Show the page before every page that is not a front page,
+                in the order front pages are added
+            shared: Content streams from add_stream drawn after content, in
+                order, e.g. the body of a file that several pages show
+
+        Returns:
+            The object number of the page
+        """
+        page_object = self._new_object()
+        streams = list(shared)
+        if content or not shared:
+            if self.content_observer is not None:
+                self.content_observer(content)
+            streams.insert(0, self._new_object())
+        (self.front_objects if front else self.page_objects).append(page_object)
+        annotations = ""
+        if links:
+            annotations = "/Annots [" + " ".join(
+                f"<</Type /Annot /Subtype /Link /Rect [{x1:.2f} {y1:.2f} {x2:.2f} {y2:.2f}] "
+                f"/Border [0 0 0] /Dest [{target} 0 R /XYZ null null null]>>"
+                for (x1, y1, x2, y2), target in links
+            ) + "]\n"
+        if len(streams) == 1:
+            contents = f"{streams[0]} 0 R"
+        else:
+            # The streams of an array are drawn as if they were one
+            contents = "[" + " ".join(f"{stream} 0 R" for stream in streams) + "]"
+        self._put_object(
+            page_object,
+            f"<</Type /Page\n/Parent 1 0 R\n/Resources 2 0 R\n{annotations}"
+            f"/Contents {contents}>>\n".encode("latin1")
+        )
+        if content or not shared:
+            self._put_stream(streams[0], "", content.encode("latin1"))
+        return page_object
+
+    def add_stream(self, content: str) -> int:
+        """
+        Write a content stream that pages can share (see add_page).
+
+        Args:
+            content: Content stream, as produced by fpdf
+
+        Returns:
+            The object number of the stream
+        """
+        if self.content_observer is not None:
+            self.content_observer(content)
+        stream_object = self._new_object()
+        self._put_stream(stream_object, "", content.encode("latin1"))
+        return stream_object
+
+    def add_pages(self, pages: Iterable[str]) -> int:
+        """
+        Write several pages in order.
+
+        Args:
+            pages: Page content streams
+
+        Returns:
+            The object number of the first page, or 0 if there were no pages
+        """
+        first = 0
+        for content in pages:
+            page_object = self.add_page(content)
+            first = first or page_object
+        return first
+
+    def set_outline(self, items: List[OutlineItem]) -> None:
+        """
+        Set the bookmarks written when the writer is closed.
+
+        Args:
+            items: Top-level outline items
+        """
+        self.outline = items
+
+    def close(self) -> None:
+        """Write the fonts, resources, page tree, outline, catalog and cross-reference table."""
+        document = self.document
+        self._write_from_document(document._putresources)
+
+        # Page tree
+        if document.def_orientation == 'P':
+            width, height = document.fw_pt, document.fh_pt
+        else:
+            width, height = document.fh_pt, document.fw_pt
+        kids = self.front_objects + self.page_objects
+        tree = [b"<</Type /Pages\n/Kids ["]
+        for start in range(0, len(kids), 1024):
+            tree.append("".join(f"{n} 0 R " for n in kids[start:start + 1024]).encode("latin1"))
+        tree.append(f"]\n/Count {len(kids)}\n/MediaBox [0 0 {width:.2f} {height:.2f}]\n>>\n".encode("latin1"))
+        self._put_object(1, b"".join(tree))
+        outline = self._write_outline()
+
+        # Info; in compact mode a full object stream may be written between it and the catalog
+        info = 0
+
+        def put_info() -> None:
+            nonlocal info
+            document._newobj()
+            info = document.n
+            document._out('<<')
+            document._putinfo()
+            document._out('>>')
+            document._out('endobj')
+        self._write_from_document(put_info)
+
+        # Catalog
+        catalog = self._new_object()
+        first_page = kids[0] if len(kids) else 3
+        entries = ["/Type /Catalog", "/Pages 1 0 R"]
+        if outline:
+            entries.append(f"/Outlines {outline} 0 R")
+        entries.extend(self._catalog_view_entries(first_page))
+        self._put_object(catalog, ("<<\n" + "\n".join(entries) + "\n>>\n").encode("latin1"))
+
+        if self.compact:
+            self._flush_object_stream()
+            self._write_xref_stream(catalog, info)
+        else:
+            self._write_xref_table(catalog, info)
+        self.stream.flush()
+
+    def _write_outline(self) -> int:
+        """
+        Write the outline tree.
+
+        Returns:
+            The object number of the outline dictionary, or 0 without bookmarks
+        """
+        if not self.outline:
+            return 0
+        root = self._new_object()
+        # Number every item first, as each one refers to its siblings and children
+        stack = list(self.outline)
+        while stack:
+            item = stack.pop()
+            item.number = self._new_object()
+            stack.extend(item.children)
+
+        def put_items(items: List[OutlineItem], parent: int) -> int:
+            """Write sibling items and their descendants; return how many were written."""
+            count = 0
+            for i, item in enumerate(items):
+                entries = [f"/Title {pdf_text_string(item.title)}", f"/Parent {parent} 0 R"]
+                if i > 0:
+                    entries.append(f"/Prev {items[i - 1].number} 0 R")
+                if i + 1 < len(items):
+                    entries.append(f"/Next {items[i + 1].number} 0 R")
+                if item.children:
+                    descendants = put_items(item.children, item.number)
+                    entries.append(f"/First {item.children[0].number} 0 R /Last {item.children[-1].number} 0 R")
+                    entries.append(f"/Count {descendants}")
+                    count += descendants
+                entries.append(f"/Dest [{item.page_object} 0 R /XYZ null null null]")
+                self._put_object(item.number, ("<<" + " ".join(entries) + ">>\n").encode("latin1"))
+                count += 1
+            return count
+
+        count = put_items(self.outline, root)
+        self._put_object(
+            root,
+            f"<</Type /Outlines /First {self.outline[0].number} 0 R /Last {self.outline[-1].number} 0 R "
+            f"/Count {count}>>\n".encode("latin1")
+        )
+        return root
+
+    def _write_xref_table(self, catalog: int, info: int) -> None:
+        """Write the classic cross-reference table and trailer."""
+        xref_position = self.position
+        self._write(f"xref\n0 {self.n + 1}\n0000000000 65535 f \n".encode("latin1"))
+        for start in range(1, self.n + 1, 1024):
+            chunk = self.offsets[start:min(start + 1024, self.n + 1)]
+            self._write("".join(f"{offset:010d} 00000 n \n" for offset in chunk).encode("latin1"))
+        self._write(
+            f"trailer\n<<\n/Size {self.n + 1}\n/Root {catalog} 0 R\n/Info {info} 0 R\n>>\n"
+            f"startxref\n{xref_position}\n%%EOF\n".encode("latin1")
+        )
+
+    def _write_xref_stream(self, catalog: int, info: int) -> None:
+        """Write the cross-reference stream, which also serves as the trailer."""
+        xref = self._new_object()
+        xref_position = self.position
+        self.offsets[xref] = xref_position
+        size = self.n + 1
+        # Field widths: type, offset or object stream number, generation or index
+        width = max(1, (max(xref_position, max(self.containers)).bit_length() + 7) // 8)
+        index_width = max(1, (OBJECTS_PER_STREAM.bit_length() + 7) // 8)
+        rows = bytearray(b"\x00" + bytes(width) + b"\xff" * index_width)
+        for number in range(1, size):
+            container = self.containers[number]
+            if container:
+                rows += b"\x02" + container.to_bytes(width, "big")
+                rows += self.offsets[number].to_bytes(index_width, "big")
+            else:
+                rows += b"\x01" + self.offsets[number].to_bytes(width, "big") + bytes(index_width)
+        self._put_stream(
+            xref,
+            f"/Type /XRef /Size {size} /W [1 {width} {index_width}] "
+            f"/Root {catalog} 0 R /Info {info} 0 R ",
+            bytes(rows),
+        )
+        self._write(f"startxref\n{xref_position}\n%%EOF\n".encode("latin1"))
+
+    def _catalog_view_entries(self, first_page: int) -> List[str]:
+        """Translate fpdf's display mode into catalog entries."""
+        document = self.document
+        entries = []
+        zoom = document.zoom_mode
+        if zoom == 'fullpage':
+            entries.append(f"/OpenAction [{first_page} 0 R /Fit]")
+        elif zoom == 'fullwidth':
+            entries.append(f"/OpenAction [{first_page} 0 R /FitH null]")
+        elif zoom == 'real':
+            entries.append(f"/OpenAction [{first_page} 0 R /XYZ null null 1]")
+        elif not isinstance(zoom, str):
+            entries.append(f"/OpenAction [{first_page} 0 R /XYZ null null {zoom / 100}]")
+        layout = {'single': '/SinglePage', 'continuous': '/OneColumn', 'two': '/TwoColumnLeft'}
+        if document.layout_mode in layout:
+            entries.append(f"/PageLayout {layout[document.layout_mode]}")
+        return entries
+
+    def _new_object(self) -> int:
+        """Allocate the next object number."""
+        self.n += 1
+        self.offsets.append(0)
+        self.containers.append(0)
+        return self.n
+
+    def _put_object(self, number: int, body: bytes) -> None:
+        """
+        Write an object that is not a stream, or queue it for an object stream.
+
+        Args:
+            number: Object number
+            body: Object contents, without the obj/endobj keywords
+        """
+        if self.compact:
+            self.pending.append((number, body))
+            if len(self.pending) >= OBJECTS_PER_STREAM:
+                self._flush_object_stream()
+            return
+        self.offsets[number] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"endobj\n")
+
+    def _put_stream(self, number: int, entries: str, data: bytes) -> None:
+        """
+        Write a stream object, compressing its data when compression is on.
+
+        Args:
+            number: Object number
+            entries: Extra dictionary entries, each followed by a space
+            data: Uncompressed stream data
+        """
+        if self.document.compress:
+            data = zlib.compress(data, self.level)
+            entries += "/Filter /FlateDecode "
+        self.offsets[number] = self.position
+        self._write(
+            f"{number} 0 obj\n<<{entries}/Length {len(data)}>>\nstream\n".encode("latin1")
+            + data + b"\nendstream\nendobj\n"
+        )
+
+    def _flush_object_stream(self) -> None:
+        """Write the queued objects as one object stream."""
+        if not self.pending:
+            return
+        container = self._new_object()
+        index = []
+        bodies = []
+        offset = 0
+        for position, (number, body) in enumerate(self.pending):
+            self.offsets[number] = position
+            self.containers[number] = container
+            index.append(f"{number} {offset}")
+            bodies.append(body)
+            offset += len(body)
+        header = (" ".join(index) + "\n").encode("latin1")
+        self._put_stream(
+            container,
+            f"/Type /ObjStm /N {len(self.pending)} /First {len(header)} ",
+            header + b"".join(bodies),
+        )
+        self.pending = []
+
+    def _write_from_document(self, emit: Callable[[], None]) -> None:
+        """
+        Run one of fpdf's object writers and copy its output to the stream.
+
+        fpdf writes objects into its in-memory buffer and records their
+        offsets relative to it; both are rebased onto the stream here. In
+        compact mode the objects that are not streams are split out of the
+        buffer and queued for an object stream instead.
+
+        Args:
+            emit: Bound fpdf method (or closure) writing whole objects
+        """
+        document = self.document
+        document.buffer = ''
+        document.offsets = {}
+        document.n = self.n
+        document.state = 1
+        emit()
+        while len(self.offsets) <= document.n:
+            self.offsets.append(0)
+            self.containers.append(0)
+        self.n = document.n
+        buffer = document.buffer.encode("latin1")
+        document.buffer = ''
+        if not self.compact:
+            for number, offset in document.offsets.items():
+                self.offsets[number] = self.position + offset
+            self._write(buffer)
+            return
+
+        starts = sorted((offset, number) for number, offset in document.offsets.items())
+        for i, (offset, number) in enumerate(starts):
+            end = starts[i + 1][0] if i + 1 < len(starts) else len(buffer)
+            segment = buffer[offset:end]
+            if b"\nstream\n" in segment:
+                self.offsets[number] = self.position
+                self._write(segment)
+            else:
+                header = b"%d 0 obj\n" % number
+                body = segment[len(header):]
+                if body.endswith(b"endobj\n"):
+                    body = body[:-len(b"endobj\n")]
+                self._put_object(number, body)
+
+    def _write(self, data: bytes) -> None:
+        """Write bytes to the stream, keeping track of the offset."""
+        self.stream.write(data)
+        self.position += len(data)
@@ -0,0 +1,211 @@
+"""On-disk cache of rendered exercise pages, keyed by content hash."""
+import hashlib
+import mmap
+import os
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from src.services.defaults import DEFAULT_CACHE_SIZE, default_cache_dir
+
+CACHE_SUFFIX = ".pages"
+# Files up to this size are read into memory when hashed and handed to the renderer
+INLINE_FILE_SIZE = 1024 * 1024
+
+
+class RenderCache:
+    """
+    Size-bounded cache of the page content streams of each exercise.
+
+    Entries are keyed by a hash of the file contents, the name shown in the
+    exercise header and the layout parameters, so a rebuild only needs to
+    render files that are new or changed. When the cache grows past its size
+    limit, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE) -> None:
+        """
+        Initialize the cache, creating its directory if needed.
+
+        Args:
+            directory: Directory holding the cache entries
+            max_bytes: Maximum total size of the entries, in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # (path, name, layout) -> ((mtime_ns, size), key), to skip rehashing unchanged files
+        self._file_keys: Dict[Tuple[str, str, str], Tuple[Tuple[int, int], str]] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(data: bytes, name: str, layout: str) -> str:
+        """
+        Build the cache key of an exercise.
+
+        Args:
+            data: Raw contents of the source file (any bytes-like object)
+            name: File name shown in the exercise header
+            layout: Signature of the layout parameters
+
+        Returns:
+            Hex digest identifying the rendered pages
+        """
+        digest = hashlib.sha256()
+        digest.update(layout.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(data)
+        return digest.hexdigest()
+
+    def file_key(self, path: str, name: str, layout: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """
+        Get the cache key of a source file, reading it only when needed.
+        
+        Files whose modification time and size are unchanged since they were
+        last hashed by this cache are not read again.
+        
+        Args:
+            path: Path to the source file
+            name: File name shown in the exercise header
+            layout: Signature of the layout parameters
+            
+        Returns:
+            Tuple of (key, contents); contents is None when the key was known
+            from a previous call or the file is larger than INLINE_FILE_SIZE,
+            and both are None if the file is unreadable
+        """
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            known = self._file_keys.get((path, name, layout))
+            if known is not None and known[0] == signature:
+                return known[1], None
+            with open(path, 'rb') as file:
+                if stat.st_size <= INLINE_FILE_SIZE:
+                    data: Optional[bytes] = file.read()
+                    key = self.key(data, name, layout)
+                else:
+                    # Hash large files through a memory map instead of loading them
+                    data = None
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                        key = self.key(view, name, layout)
+        except OSError:
+            return None, None
+        self._file_keys[(path, name, layout)] = (signature, key)
+        return key, data
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        Look up the pages of an exercise.
+
+        Args:
+            key: Key returned by RenderCache.key
+
+        Returns:
+            The cached page content streams, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                blob = file.read()
+            pages = self._decode(blob)
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return pages
+
+    def put(self, key: str, pages: List[str]) -> None:
+        """
+        Store the pages of an exercise, evicting old entries if needed.
+
+        Args:
+            key: Key returned by RenderCache.key
+            pages: Page content streams to store
+        """
+        blob = self._encode(pages)
+        path = self._path(key)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(blob)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._size += len(blob) - previous
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = 0
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache is 90% of its limit."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        size = sum(entry_size for _, _, entry_size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, entry_size in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+        self._size = size
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        """List (path, mtime, size) for every entry in the cache directory."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(CACHE_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _path(self, key: str) -> str:
+        """Return the file path of an entry."""
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    @staticmethod
+    def _encode(pages: List[str]) -> bytes:
+        """Serialize pages as a length header followed by the compressed streams."""
+        header = ",".join(str(len(page)) for page in pages)
+        return zlib.compress((header + "\n" + "".join(pages)).encode("latin1"), 1)
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[str]:
+        """Deserialize pages written by _encode."""
+        text = zlib.decompress(blob).decode("latin1")
+        header, _, body = text.partition("\n")
+        pages = []
+        position = 0
+        for length in header.split(",") if header else []:
+            end = position + int(length)
+            pages.append(body[position:end])
+            position = end
+        if position != len(body):
+            raise ValueError("Corrupt cache entry")
+        return pages
@@ -0,0 +1,407 @@
+"""
+Render server: warm worker processes taking jobs over a local Unix socket.
+
+The protocol is one JSON object per line. A client connects, sends one
+request and reads one response line. Requests are:
+
+    {"op": "render", "input": DIRECTORY_OR_ARCHIVE, "output": PDF}
+    {"op": "render", "files": [FILE, ...], "input": ROOT, "output": PDF}
+    {"op": "stats"}
+
+Paths must be absolute, as the server does not share the client's working
+directory. With "files", the files are printed in the given order and
+"input" (their common directory by default) is the root of the table of
+contents. A render request may also set "toc", "compact", "compression"
+and "duplicates"; every other setting is the server's. Without "output", the
+PDF itself is sent back: the response line holds its "size" and is
+followed by that many bytes.
+
+Every response has "ok"; failures carry an "error" message.
+"""
+import json
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+from typing import TYPE_CHECKING, Any, BinaryIO, Deque, Dict, List, Optional, Tuple
+
+from src.services.defaults import DEFAULT_DUPLICATES, DUPLICATE_MODES
+
+if TYPE_CHECKING:
+    from src.services.batch import BatchJob
+
+# Unix sockets are missing on some platforms, e.g. older Windows builds
+UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+# Longest request line accepted, which bounds the size of a file list
+MAX_REQUEST_BYTES = 1024 * 1024
+# Latencies kept for the percentiles reported by "stats"
+LATENCY_WINDOW = 1000
+# Settings a render request may override, with their types
+REQUEST_SETTINGS = {"toc": bool, "compact": bool, "compression": int, "duplicates": str}
+
+
+class RequestError(ValueError):
+    """Raised for a request the server cannot run; its message is sent back."""
+
+
+class ServerStats:
+    """Queue depth and latency of the jobs, shared by the connection threads."""
+
+    def __init__(self, workers: int) -> None:
+        """
+        Initialize the counters.
+
+        Args:
+            workers: Number of worker processes, which bounds the running jobs
+        """
+        self.workers = workers
+        self.started = time.monotonic()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.render_times: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def job_started(self) -> None:
+        """Count a job handed to the worker pool."""
+        with self._lock:
+            self.pending += 1
+
+    def job_finished(self, success: bool, latency: float, render_time: float) -> None:
+        """
+        Count a finished job.
+
+        Args:
+            success: Whether the PDF was created
+            latency: Seconds from the request to the end of the job, waiting included
+            render_time: Seconds the worker spent on the job
+        """
+        with self._lock:
+            self.pending -= 1
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.latencies.append(latency)
+            self.render_times.append(render_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the current figures.
+
+        Returns:
+            Jobs queued and running, jobs completed and failed since the
+            start, and the mean, median, 95th percentile and maximum latency
+            (in seconds) of the latest jobs
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            render_times = list(self.render_times)
+            running = min(self.pending, self.workers)
+            figures: Dict[str, Any] = {
+                "uptime": time.monotonic() - self.started,
+                "workers": self.workers,
+                "queued": self.pending - running,
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+        if latencies:
+            figures["latency"] = {
+                "mean": sum(latencies) / len(latencies),
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "max": latencies[-1],
+            }
+            figures["render_mean"] = sum(render_times) / len(render_times)
+        return figures
+
+
+def _percentile(ordered: List[float], percent: int) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    return ordered[max(0, -(-len(ordered) * percent // 100) - 1)]
+
+
+def _warm_worker(font: Optional[str] = None) -> None:
+    """Import the renderer and build the fonts and their metrics once per worker process."""
+    from src.services.pdf_generator import DOCUMENT_FONTS, new_document
+    from src.services.text_metrics import get_font_metrics
+
+    document = new_document(font)
+    for family, style, size in DOCUMENT_FONTS:
+        document.set_font(family, style, size)
+        get_font_metrics(document)
+
+
+def _ready() -> None:
+    """Do nothing; submitted once per worker so the pool starts them all up front."""
+
+
+def _absolute(value: Any, name: str) -> str:
+    """Check that a request field is an absolute path."""
+    if not isinstance(value, str) or not os.path.isabs(value):
+        raise RequestError(f"{name} must be an absolute path")
+    return os.path.normpath(value)
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serve render jobs from a pool of warm worker processes.
+
+    Each connection is handled on its own thread, which only waits for the
+    pool. Worker processes import fpdf and build the font metrics when the
+    server starts, so a job only pays for its own files; with a cache
+    directory, unchanged exercises are not rendered again across jobs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, workers: int = 0, **settings: Any) -> None:
+        """
+        Start the worker processes and listen on a Unix socket.
+
+        Args:
+            socket_path: Path of the socket; a stale socket left by a server
+                that is no longer running is replaced
+            workers: Number of worker processes (0 uses every CPU core)
+            **settings: Keyword arguments of batch.run_job applied to every job
+
+        Raises:
+            OSError: If the socket cannot be created or another server is
+                listening on it
+        """
+        if not UNIX_SOCKETS:
+            raise OSError("Unix sockets are not available on this platform")
+        _remove_stale_socket(socket_path)
+        # Only the user running the server may connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.settings = settings
+        self.stats = ServerStats(self.workers)
+        self._spool = tempfile.mkdtemp(prefix="lista-server-")
+        self._numbers = count()
+        self._pool_lock = threading.Lock()
+        self._executor = self._start_pool()
+
+    def server_close(self) -> None:
+        """Stop listening, remove the socket and stop the workers."""
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+        self._executor.shutdown(cancel_futures=True)
+        shutil.rmtree(self._spool, ignore_errors=True)
+
+    def handle_request_line(self, line: bytes) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Run one request.
+
+        Args:
+            line: The request, as sent by the client
+
+        Returns:
+            Tuple of (response, path of a PDF to send after it and delete)
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("the request must be a JSON object")
+            op = request.get("op", "render")
+            if op == "stats":
+                return {"ok": True, **self.stats.snapshot()}, None
+            if op != "render":
+                raise RequestError(f"unknown op: {op!r}")
+            return self._render(request)
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}, None
+
+    def _render(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Run a render request on the worker pool."""
+        from src.services.batch import BatchResult, run_job
+
+        start = time.monotonic()
+        job = self._job(request)
+        settings = dict(self.settings)
+        for name, kind in REQUEST_SETTINGS.items():
+            if name in request:
+                if type(request[name]) is not kind:
+                    raise RequestError(f"invalid value for {name}: {request[name]!r}")
+                settings[name] = request[name]
+        if not 0 <= settings.get("compression", 0) <= 9:
+            raise RequestError("compression must be between 0 and 9")
+        if settings.get("duplicates", DEFAULT_DUPLICATES) not in DUPLICATE_MODES:
+            raise RequestError("duplicates must be one of " + ", ".join(DUPLICATE_MODES))
+
+        self.stats.job_started()
+        executor = self._executor
+        try:
+            result: BatchResult = executor.submit(run_job, job, **settings).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); later jobs get a fresh pool
+            self._replace_pool(executor)
+            result = BatchResult(job, False, "worker process died")
+        self.stats.job_finished(result.success, time.monotonic() - start, result.elapsed)
+
+        if not result.success:
+            return {"ok": False, "error": result.error}, None
+        response = {"ok": True, "elapsed": result.elapsed}
+        if "output" in request:
+            return {**response, "output": job.output_file}, None
+        return {**response, "size": os.path.getsize(job.output_file)}, job.output_file
+
+    def _job(self, request: Dict[str, Any]) -> "BatchJob":
+        """Check the paths of a render request and build its job."""
+        from src.services.batch import BatchJob
+
+        files = request.get("files")
+        if files is not None:
+            if not isinstance(files, list) or not files:
+                raise RequestError("files must be a non-empty list of paths")
+            files = [_absolute(path, "every file") for path in files]
+            missing = [path for path in files if not os.path.isfile(path)]
+            if missing:
+                raise RequestError(f"file not found: {missing[0]}")
+            default_root = os.path.commonpath([os.path.dirname(path) for path in files])
+            input_dir = _absolute(request["input"], "input") if "input" in request else default_root
+        else:
+            input_dir = _absolute(request.get("input"), "input")
+        if "output" in request:
+            output_file = _absolute(request["output"], "output")
+        else:
+            output_file = os.path.join(self._spool, f"{next(self._numbers)}.pdf")
+        return BatchJob(input_dir, output_file, files)
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        """Start the worker processes and wait until they are warm."""
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_worker, initargs=(self.settings.get("font"),)
+        )
+        for future in [executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken pool, unless another thread already did."""
+        with self._pool_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._start_pool()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Read one request from a connection and send its response."""
+
+    server: RenderServer
+
+    def handle(self) -> None:
+        """Answer the request, streaming the PDF after the response line when asked to."""
+        line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_REQUEST_BYTES:
+            response: Dict[str, Any] = {"ok": False, "error": "request too long"}
+            attachment = None
+        else:
+            response, attachment = self.server.handle_request_line(line)
+        try:
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            if attachment is not None:
+                with open(attachment, 'rb') as file:
+                    shutil.copyfileobj(file, self.wfile)
+        finally:
+            if attachment is not None:
+                os.remove(attachment)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file no server is listening on."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+            return
+    raise OSError(f"a server is already listening on {socket_path}")
+
+
+def request(
+    socket_path: str, message: Dict[str, Any], timeout: Optional[float] = None, pdf: Optional[BinaryIO] = None
+) -> Dict[str, Any]:
+    """
+    Send one request to a render server and wait for its response.
+
+    Args:
+        socket_path: Path of the server's socket
+        message: The request; see the module documentation
+        timeout: Seconds to wait for the server (None = no limit)
+        pdf: Receives the PDF when the response is followed by one
+
+    Returns:
+        The response
+
+    Raises:
+        OSError: If the server cannot be reached or closes the connection early
+    """
+    if not UNIX_SOCKETS:
+        raise OSError("Unix sockets are not available on this platform")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode('utf-8') + b"\n")
+        with connection.makefile('rb') as stream:
+            line = stream.readline(MAX_REQUEST_BYTES)
+            if not line:
+                raise ConnectionError("the server closed the connection")
+            response: Dict[str, Any] = json.loads(line)
+            remaining = response.get("size", 0)
+            while remaining > 0:
+                chunk = stream.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    raise ConnectionError("the server closed the connection before the end of the PDF")
+                if pdf is not None:
+                    pdf.write(chunk)
+                remaining -= len(chunk)
+    return response
+
+
+def render_message(
+    input_path: Optional[str] = None,
+    output_file: Optional[str] = None,
+    files: Optional[List[str]] = None,
+    **settings: Any,
+) -> Dict[str, Any]:
+    """
+    Build a render request with absolute paths.
+
+    Args:
+        input_path: Directory or archive to print, or the root of files
+        output_file: PDF the server writes; omit to have the PDF sent back
+        files: Files to print, in this order, instead of scanning input_path
+        **settings: toc, compact, compression or duplicates, overriding the server's
+
+    Returns:
+        The request
+    """
+    message: Dict[str, Any] = {"op": "render", **settings}
+    if input_path is not None:
+        message["input"] = os.path.abspath(input_path)
+    if output_file is not None:
+        message["output"] = os.path.abspath(output_file)
+    if files is not None:
+        message["files"] = [os.path.abspath(path) for path in files]
+    return message
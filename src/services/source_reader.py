@@ -0,0 +1,318 @@
+"""Read source files as lines: encoding detection, binary and size guards."""
+import codecs
+import mmap
+import os
+from typing import Iterator, List, Optional, Tuple, Union
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_LINES = 20000
+SAMPLE_SIZE = 64 * 1024
+
+# Byte order marks, longest first so UTF-32 LE is not mistaken for UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# Control bytes that never appear in text files (everything below 0x20 except \t \n \f \r and ESC)
+BINARY_BYTES = bytes(set(range(0x20)) - {0x09, 0x0A, 0x0C, 0x0D, 0x1B})
+
+
+class ReadLimits:
+    """Limits applied while reading one source file."""
+
+    __slots__ = ("max_bytes", "max_lines", "sample_size")
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        max_lines: Optional[int] = DEFAULT_MAX_LINES,
+        sample_size: int = SAMPLE_SIZE,
+    ) -> None:
+        """
+        Initialize the limits.
+
+        Args:
+            max_bytes: Bytes read before the file is truncated (None = no limit)
+            max_lines: Lines read before the file is truncated (None = no limit)
+            sample_size: Bytes inspected to detect binary files and the encoding
+        """
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.sample_size = sample_size
+
+    def __repr__(self) -> str:
+        """Return a representation used in cache keys."""
+        return f"ReadLimits({self.max_bytes!r}, {self.max_lines!r}, {self.sample_size!r})"
+
+
+class SourceText:
+    """Lines of a source file, as they should be printed."""
+
+    __slots__ = ("lines", "encoding", "binary", "truncated", "size")
+
+    def __init__(
+        self,
+        lines: List[str],
+        encoding: Optional[str],
+        binary: bool = False,
+        truncated: bool = False,
+        size: int = 0,
+    ) -> None:
+        """
+        Initialize the result.
+
+        Args:
+            lines: Decoded lines without line terminators
+            encoding: Detected encoding (None for binary files)
+            binary: Whether the file looks binary; lines is then empty
+            truncated: Whether a limit stopped the reading early
+            size: Size of the file in bytes
+        """
+        self.lines = lines
+        self.encoding = encoding
+        self.binary = binary
+        self.truncated = truncated
+        self.size = size
+
+
+def looks_binary(sample: bytes) -> bool:
+    """
+    Tell whether a sample comes from a binary file.
+
+    Args:
+        sample: First bytes of the file, without any BOM
+
+    Returns:
+        True if the sample holds NUL bytes or many other control bytes
+    """
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    controls = len(sample) - len(sample.translate(None, BINARY_BYTES))
+    return controls * 10 > len(sample)
+
+
+def detect_encoding(sample: bytes) -> Tuple[Optional[str], int]:
+    """
+    Detect the encoding of a file from its first bytes.
+
+    Args:
+        sample: First bytes of the file
+
+    Returns:
+        Tuple of (encoding, BOM length); the encoding is None for binary files.
+        Without a BOM, UTF-8 is preferred, then cp1252, then latin-1.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    if looks_binary(sample):
+        return None, 0
+    try:
+        # The sample may end in the middle of a character; that is not an error
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+
+def _decode_line(raw: bytes, encoding: str) -> str:
+    """Decode one line, falling back to latin-1 for bytes the encoding rejects."""
+    try:
+        return raw.decode(encoding)
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def iter_lines(
+    buffer: Union[bytes, mmap.mmap], start: int, end: int, encoding: str
+) -> Iterator[Tuple[str, int]]:
+    """
+    Decode lines from a byte buffer without copying it whole.
+
+    Lines end at \\n, \\r\\n or \\r, like text-mode open(); the text after the
+    last terminator is always yielded, even when empty.
+
+    Args:
+        buffer: Bytes or memory map holding the file
+        start: Offset of the first byte (after any BOM)
+        end: Offset after the last byte to read
+        encoding: An ASCII-compatible encoding
+
+    Yields:
+        Tuples of (line, offset after the line and its terminator)
+    """
+    position = start
+    while True:
+        newline = buffer.find(b"\n", position, end)
+        stop = end if newline == -1 else newline
+        raw = buffer[position:stop]
+        if raw.endswith(b"\r") and newline != -1:
+            raw = raw[:-1]
+        after = end if newline == -1 else newline + 1
+        if b"\r" in raw:
+            parts = raw.split(b"\r")
+            for part in parts[:-1]:
+                yield _decode_line(part, encoding), after
+            raw = parts[-1]
+        yield _decode_line(raw, encoding), after
+        if newline == -1:
+            return
+        position = after
+
+
+def _read_lines(
+    buffer: Union[bytes, mmap.mmap], size: int, limits: ReadLimits
+) -> SourceText:
+    """Detect the encoding of a buffer and decode its lines within the limits."""
+    encoding, bom = detect_encoding(bytes(buffer[:limits.sample_size]))
+    if encoding is None:
+        return SourceText([], None, binary=True, size=size)
+
+    end = size if limits.max_bytes is None else min(size, bom + limits.max_bytes)
+    truncated = end < size
+    if encoding in ("utf-8", "cp1252", "latin-1"):
+        lines: List[str] = []
+        read = bom
+        for line, after in iter_lines(buffer, bom, end, encoding):
+            if limits.max_lines is not None and len(lines) >= limits.max_lines:
+                truncated = True
+                break
+            lines.append(line)
+            read = after
+        if end < size and read == end and len(lines) > 1:
+            # Drop the line cut off by the byte limit
+            lines.pop()
+        return SourceText(lines, encoding, truncated=truncated, size=size)
+
+    # UTF-16/32: newlines are not single bytes, so decode the bounded range at once
+    unit = 4 if encoding.startswith("utf-32") else 2
+    end -= (end - bom) % unit
+    text = bytes(buffer[bom:end]).decode(encoding, errors="replace")
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if limits.max_lines is not None and len(lines) > limits.max_lines:
+        lines = lines[:limits.max_lines]
+        truncated = True
+    return SourceText(lines, encoding, truncated=truncated, size=size)
+
+
+def read_source(
+    path: str,
+    data: Optional[bytes] = None,
+    limits: Optional[ReadLimits] = None,
+    use_mmap: bool = True,
+    size: Optional[int] = None,
+) -> SourceText:
+    """
+    Read a source file as lines.
+
+    Files are memory-mapped by default, so only the pages holding the lines
+    that are actually read (at most the byte limit) are loaded. Without
+    mmap, at most the byte limit is read with plain reads, which release
+    the GIL while they wait for the disk; use that from threads that
+    prefetch files.
+
+    Args:
+        path: Path to the source file
+        data: Contents of the file when already in memory; path is then not read
+        limits: Size limits and sample size (defaults to ReadLimits())
+        use_mmap: Map the file instead of reading it
+        size: Size of the whole file when data only holds its beginning
+            (at least the byte limit plus 4 bytes)
+
+    Returns:
+        The decoded lines and what was found while reading them
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    limits = limits or ReadLimits()
+    if data is not None:
+        return _read_lines(data, len(data) if size is None else size, limits)
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return _read_lines(b"", 0, limits)
+        if not use_mmap:
+            # Enough for the byte limit plus the longest BOM
+            wanted = size if limits.max_bytes is None else min(size, limits.max_bytes + 4)
+            return _read_lines(file.read(wanted), size, limits)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _read_lines(buffer, size, limits)
+
+
+class SourceSet:
+    """
+    Source files that are not read from a directory, such as the members of an archive.
+
+    Files are referred to by the path they would have under `path`, so the
+    rest of the pipeline treats the set as a directory. Subclasses list
+    their files and read their raw bytes; read() decodes what the byte
+    limit cut, as read_source would from a file.
+    """
+
+    def __init__(self, path: str, limits: Optional[ReadLimits] = None) -> None:
+        """
+        Initialize an empty set.
+
+        Args:
+            path: Root of the full paths of the files
+            limits: Size limits of each file; bigger files are only read up to the byte limit
+        """
+        self.path = path
+        self.limits = limits or ReadLimits()
+        # Enough for the byte limit plus the longest BOM, as read_source reads
+        self._read_size = -1 if self.limits.max_bytes is None else self.limits.max_bytes + 4
+        # (full_path, file_name) tuples in document order
+        self.files: List[Tuple[str, str]] = []
+
+    def close(self) -> None:
+        """Release what the set holds open; nothing by default."""
+
+    def size(self, full_path: str) -> int:
+        """Return the whole size of a file, or 0 if it is not in the set."""
+        raise NotImplementedError
+
+    def read_bytes(self, full_path: str) -> Optional[bytes]:
+        """
+        Read the beginning of a file, up to the byte limit.
+
+        Safe to call from several threads.
+
+        Args:
+            full_path: Path of the file, as listed in files
+
+        Returns:
+            The contents, or None if the file is missing or cannot be read
+        """
+        raise NotImplementedError
+
+    def read(self, full_path: str) -> Union[bytes, SourceText, None]:
+        """
+        Read a file for the renderer.
+
+        Args:
+            full_path: Path of the file, as listed in files
+
+        Returns:
+            The raw contents when the whole file was read; for a file cut at
+            the byte limit, its decoded lines, so the truncation note shows
+            the real size; None if it cannot be read
+        """
+        data = self.read_bytes(full_path)
+        if data is None or len(data) >= self.size(full_path):
+            return data
+        return read_source(full_path, data, self.limits, size=self.size(full_path))
+
+    def _full_path(self, relative: str) -> str:
+        """Return the full path of a file from its `/`-separated relative path."""
+        return os.path.join(self.path, *relative.split('/'))
@@ -0,0 +1,144 @@
+"""Source files handed over by the caller, as contents or paths, instead of found by scanning."""
+import os
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.services.archive import member_path
+from src.services.discovery import DiscoveryOptions
+from src.services.source_reader import ReadLimits, SourceSet
+
+# Contents of a source file, or the path to read it from
+SourceInput = Union[bytes, bytearray, memoryview, str, "os.PathLike[str]"]
+# Root of the paths given to the sources; it never exists on disk, so nothing is read from it
+SOURCES_ROOT = "<sources>"
+
+
+class SourceItems(SourceSet):
+    """
+    Source files given as (name, contents or path) pairs.
+
+    Names are relative paths such as `turma1/1.c`: the header shows the
+    last part, and the directories group the table of contents and the
+    outline. The files are printed in the given order. Contents given as
+    bytes are kept in memory; those given as a path are only read when
+    the renderer gets to them, at most up to the byte limit.
+
+    The files are listed under SOURCES_ROOT, which does not exist on disk.
+    """
+
+    def __init__(
+        self, items: Iterable[Tuple[str, SourceInput]], limits: Optional[ReadLimits] = None
+    ) -> None:
+        """
+        List the sources.
+
+        Args:
+            items: (name, contents or path) pairs in document order
+            limits: Size limits of each file
+
+        Raises:
+            ValueError: If a name is empty, climbs out of its root or is given twice
+        """
+        super().__init__(SOURCES_ROOT, limits)
+        self._contents: Dict[str, bytes] = {}
+        self._paths: Dict[str, str] = {}
+
+        for name, source in items:
+            relative = member_path(name)
+            if relative is None:
+                raise ValueError(f"invalid source name: {name!r}")
+            full_path = self._full_path(relative)
+            if full_path in self._contents or full_path in self._paths:
+                raise ValueError(f"source given twice: {relative}")
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                self._contents[full_path] = bytes(source)
+            else:
+                self._paths[full_path] = os.fspath(source)
+            self.files.append((full_path, relative.rsplit('/', 1)[-1]))
+
+    def size(self, full_path: str) -> int:
+        """Return the size of a source, or 0 if it is unknown or cannot be read."""
+        path = self._paths.get(full_path)
+        if path is None:
+            return len(self._contents.get(full_path, b""))
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def read_bytes(self, full_path: str) -> Optional[bytes]:
+        """
+        Read the beginning of a source, up to the byte limit.
+
+        Safe to call from several threads.
+
+        Args:
+            full_path: Path of the source, as listed in files
+
+        Returns:
+            The contents, or None if the source is missing or its file cannot be read
+        """
+        path = self._paths.get(full_path)
+        if path is None:
+            data = self._contents.get(full_path)
+            # Slicing a bytes object to its own length does not copy it
+            return data if data is None or self._read_size < 0 else data[:self._read_size]
+        try:
+            with open(path, 'rb') as file:
+                return file.read(self._read_size)
+        except OSError:
+            return None
+
+
+def read_file_list(stream: IO[str]) -> Iterator[str]:
+    """
+    Read the paths of a file list, one per line, as written by find or git.
+
+    Blank lines are skipped; lines are not stripped of other spaces, which
+    file names may hold.
+
+    Args:
+        stream: Text stream holding the list, e.g. sys.stdin
+
+    Yields:
+        The paths, in order
+    """
+    for line in stream:
+        path = line.rstrip('\r\n')
+        if path:
+            yield path
+
+
+def listed_sources(
+    paths: Iterable[str], options: Optional[DiscoveryOptions] = None
+) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Keep the listed files that pass the discovery filters and still exist.
+
+    Lists from `git diff --name-only` name deleted files and files of other
+    types, which are left out like a directory scan would leave them out.
+
+    Args:
+        paths: Paths of the files, relative to the working directory or absolute
+        options: Extension and include/exclude filters (defaults to .c files)
+
+    Returns:
+        Tuple of (common directory of the files, list of (full_path, file_name)
+        tuples in the listed order); the directory is the working directory
+        when no file is left
+    """
+    options = options or DiscoveryOptions()
+    found: List[str] = []
+    seen = set()
+    for path in paths:
+        full_path = os.path.abspath(path)
+        if full_path in seen or not os.path.isfile(full_path):
+            continue
+        seen.add(full_path)
+        # Globs match the path as listed, relative to the working directory
+        relative = os.path.relpath(full_path).replace(os.sep, '/')
+        if options.wants_file(os.path.basename(full_path), relative):
+            found.append(full_path)
+    if not found:
+        return os.getcwd(), []
+    root = os.path.commonpath([os.path.dirname(path) for path in found])
+    return root, [(path, os.path.basename(path)) for path in found]
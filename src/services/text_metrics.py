@@ -0,0 +1,195 @@
+"""Text measurement helpers built on precomputed font width tables."""
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fpdf import FPDF
+
+
+class FontMetrics:
+    """
+    Glyph advance widths for a single font at a single size.
+
+    The width table is computed once from the fpdf font definition and
+    scaled to user units. When every glyph has the same advance (as in
+    Courier), measuring a string only needs its character count.
+    """
+
+    __slots__ = ("widths", "fixed_width", "missing_width")
+
+    def __init__(self, widths: Dict[str, float], missing_width: float = 0.0) -> None:
+        """
+        Initialize the metrics from a scaled width table.
+
+        Args:
+            widths: Mapping from character to advance width in user units
+            missing_width: Width used for characters absent from the table
+        """
+        self.widths = widths
+        self.missing_width = missing_width
+        distinct = set(widths.values())
+        self.fixed_width: Optional[float] = distinct.pop() if len(distinct) == 1 else None
+
+    @property
+    def is_monospace(self) -> bool:
+        """Return True when all glyphs share the same advance width."""
+        return self.fixed_width is not None
+
+    def char_width(self, char: str) -> float:
+        """
+        Get the advance width of a single character.
+
+        Args:
+            char: The character to measure
+
+        Returns:
+            Width in user units
+        """
+        if self.fixed_width is not None:
+            return self.fixed_width
+        return self.widths.get(char, self.missing_width)
+
+    def string_width(self, text: str) -> float:
+        """
+        Get the width of a string.
+
+        Args:
+            text: The text to measure
+
+        Returns:
+            Width in user units
+        """
+        if self.fixed_width is not None:
+            return len(text) * self.fixed_width
+        widths = self.widths
+        missing = self.missing_width
+        return sum([widths.get(char, missing) for char in text])
+
+    def measure_lines(self, lines: Iterable[str]) -> List[float]:
+        """
+        Measure many lines in one call.
+
+        Args:
+            lines: The lines to measure
+
+        Returns:
+            List with the width of each line, in the same order
+        """
+        if self.fixed_width is not None:
+            fixed = self.fixed_width
+            return [len(line) * fixed for line in lines]
+        return [self.string_width(line) for line in lines]
+
+    def wrap(self, text: str, max_width: float) -> List[str]:
+        """
+        Wrap text to fit within the specified width.
+
+        Lines are broken at the last space that still fits; the space itself
+        is dropped. Runs without a usable space, such as very long tokens,
+        are split at the last character that fits. Each line is found with
+        cumulative glyph widths, so the cost is linear in the text length.
+
+        Args:
+            text: The text to wrap
+            max_width: Maximum width in user units
+
+        Returns:
+            List of wrapped lines (a single empty string for empty text)
+        """
+        length = len(text)
+        if length == 0:
+            return [""]
+        fit = self._fitter(text, max_width)
+        lines = []
+        start = 0
+        while start < length:
+            end = fit(start)
+            if end >= length:
+                lines.append(text[start:])
+                break
+            # The character at `end` does not fit, but a space there can still be the break
+            space = text.rfind(' ', start, end + 1)
+            if space > start:
+                lines.append(text[start:space])
+                start = space + 1
+            else:
+                lines.append(text[start:end])
+                start = end
+        return lines
+
+    def wrap_lines(self, lines: Iterable[str], max_width: float) -> List[List[str]]:
+        """
+        Wrap many lines in one call.
+
+        Args:
+            lines: The lines to wrap, typically a whole file
+            max_width: Maximum width in user units
+
+        Returns:
+            For each input line, the list of rows it wraps into
+        """
+        if self.fixed_width is not None:
+            limit = self._fixed_limit(max_width)
+            wrap = self.wrap
+            return [[line] if len(line) <= limit else wrap(line, max_width) for line in lines]
+        return [self.wrap(line, max_width) for line in lines]
+
+    def _fixed_limit(self, max_width: float) -> int:
+        """Return how many fixed-width glyphs fit in max_width (at least one)."""
+        return max(1, int(max_width / self.fixed_width + 1e-9))
+
+    def _fitter(self, text: str, max_width: float) -> Callable[[int], int]:
+        """
+        Build a function returning the end index of the longest fitting run.
+
+        Args:
+            text: The text being wrapped
+            max_width: Maximum width in user units
+
+        Returns:
+            Function mapping a start index to the exclusive end of the run
+            that fits, always advancing by at least one character
+        """
+        length = len(text)
+        if self.fixed_width is not None:
+            limit = self._fixed_limit(max_width)
+            return lambda start: min(length, start + limit)
+
+        widths = self.widths
+        missing = self.missing_width
+        offsets = [0.0]
+        offsets.extend(accumulate([widths.get(char, missing) for char in text]))
+        tolerance = max_width + 1e-9
+
+        def fit(start: int) -> int:
+            end = bisect_right(offsets, offsets[start] + tolerance, start + 1) - 1
+            return max(end, start + 1)
+
+        return fit
+
+
+_metrics_cache: Dict[Tuple[str, float], FontMetrics] = {}
+
+
+def get_font_metrics(pdf: FPDF) -> FontMetrics:
+    """
+    Get the metrics for the font currently selected in a PDF document.
+
+    Metrics are cached per font and size, so the width table is only built
+    the first time a given combination is used.
+
+    Args:
+        pdf: Document whose current font should be measured
+
+    Returns:
+        The cached FontMetrics for the current font and size
+    """
+    font = pdf.current_font
+    key = (font["name"], pdf.font_size)
+    metrics = _metrics_cache.get(key)
+    if metrics is None:
+        scale = pdf.font_size / 1000.0
+        widths = {char: width * scale for char, width in font["cw"].items()}
+        metrics = FontMetrics(widths)
+        _metrics_cache[key] = metrics
+    return metrics
@@ -0,0 +1,113 @@
+"""Table of contents and outline (bookmarks) of a generated document."""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from src.services.layout import HEADER, NOTE, ExerciseLayout, LayoutBuilder, PageGeometry
+from src.services.pdf_writer import OutlineItem
+
+TOC_TITLE = "Sumário"
+
+
+class TocEntry:
+    """One row of the table of contents: a directory heading or an exercise."""
+
+    __slots__ = ("title", "level", "exercise", "directory")
+
+    def __init__(self, title: str, level: int, exercise: int, directory: bool = False) -> None:
+        """
+        Initialize the entry.
+
+        Args:
+            title: Directory or file name
+            level: Nesting depth below the root directory
+            exercise: Index of the exercise it points to; for a directory,
+                its first exercise
+            directory: Whether the entry is a directory heading
+        """
+        self.title = title
+        self.level = level
+        self.exercise = exercise
+        self.directory = directory
+
+    def __repr__(self) -> str:
+        """Return a readable representation of the entry."""
+        return f"TocEntry({self.title!r}, {self.level!r}, {self.exercise!r}, {self.directory!r})"
+
+
+def toc_entries(root_folder: str, c_files: Sequence[Tuple[str, str]]) -> List[TocEntry]:
+    """
+    List the directory headings and exercises of a document in order.
+
+    A heading is added whenever the files enter a directory they were not
+    in before; files come naturally sorted, each directory's own files
+    before its subdirectories.
+
+    Args:
+        root_folder: Directory the files were found in
+        c_files: List of (full_path, file_name) tuples in document order
+
+    Returns:
+        The entries, each exercise after the headings of its directories
+    """
+    entries: List[TocEntry] = []
+    current: Tuple[str, ...] = ()
+    for index, (full_path, file_name) in enumerate(c_files):
+        directory = os.path.relpath(os.path.dirname(full_path), root_folder)
+        parts = () if directory == os.curdir else tuple(directory.split(os.sep))
+        common = 0
+        while common < min(len(parts), len(current)) and parts[common] == current[common]:
+            common += 1
+        for level in range(common, len(parts)):
+            entries.append(TocEntry(parts[level], level, index, directory=True))
+        current = parts
+        entries.append(TocEntry(file_name, len(parts), index))
+    return entries
+
+
+def layout_toc(entries: Sequence[TocEntry], geometry: PageGeometry) -> ExerciseLayout:
+    """
+    Paginate the table of contents: a title row, then one row per entry.
+
+    Page numbers do not change the layout, so the number of contents pages
+    is known before any exercise is rendered.
+
+    Args:
+        entries: Rows of the table of contents
+        geometry: Page measures used for pagination
+
+    Returns:
+        The layout; row i + 1 shows entries[i]
+    """
+    builder = LayoutBuilder(geometry)
+    builder.add(HEADER, TOC_TITLE)
+    for entry in entries:
+        builder.add(NOTE, entry.title)
+    return builder.finish()
+
+
+def build_outline(
+    entries: Sequence[TocEntry], first_pages: Sequence[int], toc_page: Optional[int] = None
+) -> List[OutlineItem]:
+    """
+    Nest the entries into outline items pointing at their first pages.
+
+    Args:
+        entries: Rows of the table of contents
+        first_pages: Page object number of the first page of each exercise
+        toc_page: Page object number of the first contents page, if any
+
+    Returns:
+        The top-level outline items
+    """
+    top: List[OutlineItem] = []
+    if toc_page is not None:
+        top.append(OutlineItem(TOC_TITLE, toc_page))
+    # Directories the current entry is nested in, one per level
+    parents: List[OutlineItem] = []
+    for entry in entries:
+        item = OutlineItem(entry.title, first_pages[entry.exercise])
+        del parents[entry.level:]
+        (parents[-1].children if parents else top).append(item)
+        if entry.directory:
+            parents.append(item)
+    return top
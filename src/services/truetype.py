@@ -0,0 +1,544 @@
+"""TrueType fonts: metrics cached in memory-mapped files, and glyph subsets for embedding."""
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.services.defaults import default_cache_dir
+
+# Bumped whenever the layout of the metrics files changes
+METRICS_VERSION = 1
+METRICS_MAGIC = b"LVTTF\0"
+METRICS_SUFFIX = ".metrics"
+# Tables of the font program a CIDFontType2 font needs (PDF 32000-1, 9.9)
+SUBSET_TABLES = (b"cvt ", b"fpgm", b"glyf", b"head", b"hhea", b"hmtx", b"loca", b"maxp", b"prep")
+# Flags of a composite glyph component (OpenType, glyf table)
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+# magic, version, byte order, fixed pitch, units per em, ascent, descent,
+# cap height, bounding box, italic angle, weight class, underline position and
+# thickness, glyph count, mapping count, PostScript name length
+_HEADER = struct.Struct("=6sHBBHhhhhhhhfHhhHIH")
+# Literal strings of a content stream
+_STRING = re.compile(r"\(((?:[^\\)]+|\\.)*)\)", re.S)
+# Bytes escaped in literal strings, as fpdf escapes them
+_LITERAL = {0x5C: "\\\\", 0x28: "\\(", 0x29: "\\)", 0x0D: "\\r"}
+
+
+class FontError(ValueError):
+    """Raised for a file that is not a TrueType font this module can embed."""
+
+
+def _table_directory(data: bytes) -> Dict[bytes, Tuple[int, int]]:
+    """Map the tag of each table to its (offset, length)."""
+    if len(data) < 12:
+        raise FontError("file too short for a font")
+    version, count = struct.unpack_from(">IH", data, 0)
+    if version == 0x4F54544F:  # 'OTTO'
+        raise FontError("OpenType fonts with CFF outlines are not supported; use a TrueType (.ttf) font")
+    if version not in (0x00010000, 0x74727565):  # 1.0 or 'true'
+        raise FontError("not a TrueType font")
+    tables = {}
+    for i in range(count):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        if offset + length > len(data):
+            raise FontError(f"table {tag.decode('latin-1')} is truncated")
+        tables[tag] = (offset, length)
+    for tag in (b"head", b"hhea", b"hmtx", b"maxp", b"cmap", b"loca", b"glyf"):
+        if tag not in tables:
+            raise FontError(f"missing {tag.decode('latin-1')} table")
+    return tables
+
+
+def _parse_cmap(data: bytes, offset: int) -> Dict[int, int]:
+    """Read the best Unicode subtable of a cmap table as code point -> glyph ID."""
+    count = struct.unpack_from(">H", data, offset + 2)[0]
+    subtables = {}
+    for i in range(count):
+        platform, encoding, sub_offset = struct.unpack_from(">HHI", data, offset + 4 + 8 * i)
+        position = offset + sub_offset
+        subtables[(platform, encoding, struct.unpack_from(">H", data, position)[0])] = position
+    # Full Unicode tables first, then the Basic Multilingual Plane
+    for wanted in ((3, 10, 12), (0, 6, 12), (0, 4, 12), (3, 1, 4), (0, 3, 4), (0, 2, 4), (0, 1, 4), (0, 0, 4)):
+        if wanted in subtables:
+            position = subtables[wanted]
+            return _cmap_format_12(data, position) if wanted[2] == 12 else _cmap_format_4(data, position)
+    raise FontError("the font has no Unicode character map")
+
+
+def _cmap_format_4(data: bytes, position: int) -> Dict[int, int]:
+    """Read a segment mapping to delta values subtable."""
+    segments = struct.unpack_from(">H", data, position + 6)[0] // 2
+    ends = struct.unpack_from(f">{segments}H", data, position + 14)
+    starts = struct.unpack_from(f">{segments}H", data, position + 16 + 2 * segments)
+    deltas = struct.unpack_from(f">{segments}h", data, position + 16 + 4 * segments)
+    range_position = position + 16 + 6 * segments
+    range_offsets = struct.unpack_from(f">{segments}H", data, range_position)
+    mapping = {}
+    for i in range(segments):
+        start, end, delta, range_offset = starts[i], ends[i], deltas[i], range_offsets[i]
+        for codepoint in range(start, min(end, 0xFFFE) + 1):
+            if range_offset == 0:
+                glyph = (codepoint + delta) & 0xFFFF
+            else:
+                address = range_position + 2 * i + range_offset + 2 * (codepoint - start)
+                glyph = struct.unpack_from(">H", data, address)[0]
+                if glyph:
+                    glyph = (glyph + delta) & 0xFFFF
+            if glyph:
+                mapping[codepoint] = glyph
+    return mapping
+
+
+def _cmap_format_12(data: bytes, position: int) -> Dict[int, int]:
+    """Read a segmented coverage subtable."""
+    groups = struct.unpack_from(">I", data, position + 12)[0]
+    mapping = {}
+    for i in range(groups):
+        start, end, glyph = struct.unpack_from(">III", data, position + 16 + 12 * i)
+        for codepoint in range(start, min(end, 0x10FFFF) + 1):
+            mapping[codepoint] = glyph + codepoint - start
+    return mapping
+
+
+def _postscript_name(data: bytes, tables: Dict[bytes, Tuple[int, int]]) -> str:
+    """Read the PostScript name, keeping only the characters a PDF name may hold unescaped."""
+    name = ""
+    if b"name" in tables:
+        offset = tables[b"name"][0]
+        count, strings = struct.unpack_from(">2xHH", data, offset)
+        for i in range(count):
+            platform, _, _, name_id, length, position = struct.unpack_from(">6H", data, offset + 6 + 12 * i)
+            if name_id != 6:
+                continue
+            raw = data[offset + strings + position:offset + strings + position + length]
+            name = raw.decode("utf-16-be", "replace") if platform in (0, 3) else raw.decode("latin-1")
+            break
+    name = "".join(char for char in name if char.isascii() and char.isalnum() or char in "-_")
+    return name or "Font"
+
+
+def parse_font(data: bytes) -> bytes:
+    """
+    Parse the metrics of a TrueType font into the metrics file format.
+
+    Args:
+        data: Contents of the .ttf file
+
+    Returns:
+        The metrics: a header, the PostScript name, the mapped code points
+        in ascending order, their glyph IDs and the advance of every glyph
+
+    Raises:
+        FontError: If the font is not a TrueType font, lacks a table or a
+            Unicode character map, or its license forbids embedding
+    """
+    try:
+        tables = _table_directory(data)
+        head = tables[b"head"][0]
+        units_per_em = struct.unpack_from(">H", data, head + 18)[0]
+        bbox = struct.unpack_from(">4h", data, head + 36)
+        hhea = tables[b"hhea"][0]
+        ascent, descent = struct.unpack_from(">hh", data, hhea + 4)
+        metrics_count = struct.unpack_from(">H", data, hhea + 34)[0]
+        glyph_count = struct.unpack_from(">H", data, tables[b"maxp"][0] + 4)[0]
+        hmtx = tables[b"hmtx"][0]
+        advances = [struct.unpack_from(">H", data, hmtx + 4 * i)[0] for i in range(metrics_count)]
+        advances.extend([advances[-1]] * (glyph_count - metrics_count))
+        cap_height, weight = ascent, 400
+        if b"OS/2" in tables:
+            os2 = tables[b"OS/2"][0]
+            version, weight, embedding = struct.unpack_from(">H2xH2xH", data, os2)
+            if embedding & 0x000F == 0x0002:
+                raise FontError("the font license does not allow embedding it")
+            if version >= 2:
+                cap_height = struct.unpack_from(">h", data, os2 + 88)[0]
+        italic_angle, underline_position, underline_thickness, fixed_pitch = 0.0, -100, 50, 0
+        if b"post" in tables:
+            post = tables[b"post"][0]
+            angle, underline_position, underline_thickness, fixed_pitch = struct.unpack_from(">ihhI", data, post + 4)
+            italic_angle = angle / 65536.0
+        mapping = _parse_cmap(data, tables[b"cmap"][0])
+        name = _postscript_name(data, tables).encode("ascii")
+    except struct.error:
+        raise FontError("the font is corrupt") from None
+
+    codepoints = sorted(mapping)
+    header = _HEADER.pack(
+        METRICS_MAGIC, METRICS_VERSION, sys.byteorder == "big", bool(fixed_pitch), units_per_em,
+        ascent, descent, cap_height, *bbox, italic_angle, weight, underline_position, underline_thickness,
+        glyph_count, len(codepoints), len(name)
+    )
+    # Arrays in native byte order, each starting at a multiple of 4 bytes
+    name += b"\0" * (-(len(header) + len(name)) % 4)
+    glyphs = struct.pack(f"={len(codepoints)}H", *(mapping[codepoint] for codepoint in codepoints))
+    glyphs += b"\0" * (len(glyphs) % 4)
+    return b"".join([
+        header, name, struct.pack(f"={len(codepoints)}I", *codepoints), glyphs,
+        struct.pack(f"={glyph_count}H", *advances),
+    ])
+
+
+class _GlyphCodes(dict):
+    """
+    str.translate table from code points to the two bytes of their glyph ID, filled on demand.
+
+    The bytes are escaped for a PDF literal string, so translated text can
+    be written between parentheses as is.
+    """
+
+    def __init__(self, font: "TrueTypeFont") -> None:
+        """Initialize an empty table for a font."""
+        super().__init__()
+        self.font = font
+
+    def __missing__(self, codepoint: int) -> str:
+        """Look a code point up in the font; tabs are drawn as spaces."""
+        glyph = self.font.glyph(0x20 if codepoint == 0x09 else codepoint)
+        code = "".join(_LITERAL.get(byte, chr(byte)) for byte in (glyph >> 8, glyph & 0xFF))
+        self[codepoint] = code
+        return code
+
+
+class _Printable(dict):
+    """str.translate table replacing the characters a font lacks with '?', filled on demand."""
+
+    def __init__(self, font: "TrueTypeFont") -> None:
+        """Initialize an empty table for a font."""
+        super().__init__()
+        self.font = font
+
+    def __missing__(self, codepoint: int) -> str:
+        """Keep the character if the font has it."""
+        char = chr(codepoint) if codepoint == 0x09 or self.font.glyph(codepoint) else "?"
+        self[codepoint] = char
+        return char
+
+
+class TrueTypeFont:
+    """
+    Metrics of a TrueType font, read from a memory-mapped metrics file.
+
+    The .ttf file is only parsed the first time it is used (or after it
+    changes); later runs map the metrics file and look code points up in
+    place, so loading costs the same however large the font is. The font
+    file itself is read again only to embed the glyphs a document uses.
+    """
+
+    def __init__(self, path: str, metrics: bytes, key: str) -> None:
+        """
+        Initialize the font from its metrics.
+
+        Args:
+            path: Path to the .ttf file
+            metrics: Metrics in the format of parse_font (bytes or a memory map)
+            key: Identifies the version of the font file the metrics come from
+        """
+        self.path = path
+        self.key = key
+        self._buffer = metrics
+        view = memoryview(metrics)
+        (
+            _, _, _, fixed_pitch, self.units_per_em, self.ascent, self.descent, self.cap_height,
+            x_min, y_min, x_max, y_max, self.italic_angle, self.weight, self.underline_position,
+            self.underline_thickness, self.glyph_count, mappings, name_length,
+        ) = _HEADER.unpack_from(view)
+        self.fixed_pitch = bool(fixed_pitch)
+        self.bbox = (x_min, y_min, x_max, y_max)
+        position = _HEADER.size
+        self.name = bytes(view[position:position + name_length]).decode("ascii")
+        position += name_length + (-(position + name_length) % 4)
+        self._codepoints = view[position:position + 4 * mappings].cast("I")
+        position += 4 * mappings
+        self._glyphs = view[position:position + 2 * mappings].cast("H")
+        position += 2 * mappings + 2 * mappings % 4
+        self._advances = view[position:position + 2 * self.glyph_count].cast("H")
+        self._widths: Optional[Dict[str, int]] = None
+        self.glyph_codes = _GlyphCodes(self)
+        self._printable = _Printable(self)
+        # Printable ASCII text needs no translation when the font covers it
+        self._covers_ascii = all(self.glyph(codepoint) for codepoint in range(0x20, 0x7F))
+
+    def glyph(self, codepoint: int) -> int:
+        """
+        Get the glyph of a character.
+
+        Args:
+            codepoint: Unicode code point
+
+        Returns:
+            Its glyph ID, or 0 (the missing glyph) if the font lacks it
+        """
+        codepoints = self._codepoints
+        i = bisect_left(codepoints, codepoint)
+        if i < len(codepoints) and codepoints[i] == codepoint:
+            return self._glyphs[i]
+        return 0
+
+    def advance(self, glyph: int) -> int:
+        """Get the advance width of a glyph in 1/1000 of the font size."""
+        advances = self._advances
+        units = advances[glyph] if glyph < len(advances) else advances[-1]
+        return round(units * 1000 / self.units_per_em)
+
+    @property
+    def widths(self) -> Dict[str, int]:
+        """Map every character of the font to its advance width in 1/1000 of the font size."""
+        if self._widths is None:
+            advances = {}
+            widths = {}
+            for codepoint, glyph in zip(self._codepoints, self._glyphs):
+                width = advances.get(glyph)
+                if width is None:
+                    width = advances[glyph] = self.advance(glyph)
+                widths[chr(codepoint)] = width
+            # Tabs are drawn as spaces
+            widths["\t"] = self.advance(self.glyph(0x20))
+            self._widths = widths
+        return self._widths
+
+    def printable(self, text: str) -> str:
+        """
+        Replace the characters the font lacks with '?'.
+
+        Args:
+            text: Text to print
+
+        Returns:
+            The text, with every character drawn by one of the font's glyphs
+        """
+        if self._covers_ascii and text.isascii() and text.isprintable():
+            return text
+        return text.translate(self._printable)
+
+    def signature(self) -> str:
+        """Return a string that changes whenever the font file changes, for cache keys."""
+        return f"{self.name}:{self.key}"
+
+    def unicode_map(self, glyphs: Iterable[int]) -> Dict[int, int]:
+        """
+        Find the character each glyph stands for.
+
+        Args:
+            glyphs: Glyph IDs
+
+        Returns:
+            Mapping from glyph ID to the lowest code point drawn with it
+        """
+        wanted = set(glyphs)
+        found: Dict[int, int] = {}
+        for codepoint, glyph in zip(self._codepoints, self._glyphs):
+            if glyph in wanted and glyph not in found:
+                found[glyph] = codepoint
+        return found
+
+    def subset(self, glyphs: Iterable[int]) -> bytes:
+        """
+        Build a font program holding only some glyphs.
+
+        Glyph IDs are kept, so text encoded with them needs no change: the
+        outlines of the other glyphs are dropped from glyf and their loca
+        entries point at empty glyphs. Glyphs used by composite glyphs are
+        kept too, and so is glyph 0. Only the tables a PDF viewer reads are
+        written.
+
+        Args:
+            glyphs: Glyph IDs used by the document
+
+        Returns:
+            The contents of a TrueType font file
+
+        Raises:
+            OSError: If the font file cannot be read
+            FontError: If it is not a TrueType font
+        """
+        with open(self.path, "rb") as file:
+            data = file.read()
+        tables = _table_directory(data)
+        head = tables[b"head"][0]
+        long_offsets = struct.unpack_from(">h", data, head + 50)[0] == 1
+        glyph_count = struct.unpack_from(">H", data, tables[b"maxp"][0] + 4)[0]
+        loca = tables[b"loca"][0]
+        if long_offsets:
+            offsets = struct.unpack_from(f">{glyph_count + 1}I", data, loca)
+        else:
+            offsets = [offset * 2 for offset in struct.unpack_from(f">{glyph_count + 1}H", data, loca)]
+        glyf = tables[b"glyf"][0]
+
+        keep: Set[int] = set()
+        pending = [0] + [glyph for glyph in glyphs if glyph < glyph_count]
+        while pending:
+            glyph = pending.pop()
+            if glyph in keep or glyph >= glyph_count:
+                continue
+            keep.add(glyph)
+            pending.extend(_components(data, glyf + offsets[glyph], offsets[glyph + 1] - offsets[glyph]))
+
+        outlines = bytearray()
+        new_offsets = [0]
+        for glyph in range(glyph_count):
+            if glyph in keep:
+                outlines += data[glyf + offsets[glyph]:glyf + offsets[glyph + 1]]
+                outlines += b"\0" * (-len(outlines) % 4)
+            new_offsets.append(len(outlines))
+        if long_offsets:
+            new_loca = struct.pack(f">{glyph_count + 1}I", *new_offsets)
+        else:
+            new_loca = struct.pack(f">{glyph_count + 1}H", *(offset // 2 for offset in new_offsets))
+
+        contents = {tag: data[offset:offset + length] for tag, (offset, length) in tables.items()
+                    if tag in SUBSET_TABLES}
+        contents[b"glyf"] = bytes(outlines)
+        contents[b"loca"] = new_loca
+        # checkSumAdjustment is computed over the whole font with the field cleared
+        contents[b"head"] = contents[b"head"][:8] + b"\0\0\0\0" + contents[b"head"][12:]
+        font, offsets = _sfnt(contents)
+        adjustment = (0xB1B0AFBA - _checksum(font)) & 0xFFFFFFFF
+        position = offsets[b"head"] + 8
+        return font[:position] + struct.pack(">I", adjustment) + font[position + 4:]
+
+
+def _components(data: bytes, position: int, length: int) -> List[int]:
+    """List the glyphs a composite glyph is made of (none for a simple glyph)."""
+    if length < 10 or struct.unpack_from(">h", data, position)[0] >= 0:
+        return []
+    components = []
+    position += 10
+    while True:
+        flags, glyph = struct.unpack_from(">HH", data, position)
+        components.append(glyph)
+        position += 4 + (4 if flags & ARG_1_AND_2_ARE_WORDS else 2)
+        if flags & WE_HAVE_A_SCALE:
+            position += 2
+        elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+            position += 4
+        elif flags & WE_HAVE_A_TWO_BY_TWO:
+            position += 8
+        if not flags & MORE_COMPONENTS:
+            return components
+
+
+def _checksum(data: bytes) -> int:
+    """Sum the big-endian 32-bit words of data, padded with zeros."""
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def _sfnt(tables: Dict[bytes, bytes]) -> Tuple[bytes, Dict[bytes, int]]:
+    """Assemble tables into a font file, in tag order; also return the offset of each table."""
+    count = len(tables)
+    power = 1 << (count.bit_length() - 1)
+    directory = [struct.pack(">IHHHH", 0x00010000, count, power * 16, power.bit_length() - 1, (count - power) * 16)]
+    body = []
+    offsets = {}
+    offset = 12 + 16 * count
+    for tag in sorted(tables):
+        table = tables[tag]
+        directory.append(struct.pack(">4sIII", tag, _checksum(table), offset, len(table)))
+        padded = table + b"\0" * (-len(table) % 4)
+        body.append(padded)
+        offsets[tag] = offset
+        offset += len(padded)
+    return b"".join(directory + body), offsets
+
+
+def glyphs_in_content(content: str) -> Set[int]:
+    """
+    Collect the glyph IDs shown by a content stream written with a TrueTypeFont.
+
+    Args:
+        content: Content stream whose strings all hold two-byte glyph IDs
+
+    Returns:
+        The glyph IDs
+    """
+    # Every string holds whole glyph IDs, so they can be decoded all at once
+    text = "".join(_STRING.findall(content))
+    if "\\" in text:
+        # Escaped backslashes first, so the rest cannot be mistaken for escapes
+        text = "\\".join(
+            part.replace("\\(", "(").replace("\\)", ")").replace("\\r", "\r") for part in text.split("\\\\")
+        )
+    codes = text.encode("latin-1")
+    return set(struct.unpack(f">{len(codes) // 2}H", codes))
+
+
+# Fonts loaded by this process, by (path, size, modification time)
+_loaded: Dict[Tuple[str, int, int], TrueTypeFont] = {}
+
+
+def load_font(path: str, cache_dir: Optional[str] = None) -> TrueTypeFont:
+    """
+    Load a TrueType font, parsing it only if its metrics are not cached yet.
+
+    Metrics files are named after the path, size and modification time of
+    the font, so an edited font is parsed again. Fonts stay loaded for the
+    life of the process.
+
+    Args:
+        path: Path to the .ttf file
+        cache_dir: Directory of the metrics files (default: fonts/ in the
+            default cache directory); when it cannot be written, the metrics
+            are kept in memory
+
+    Returns:
+        The font
+
+    Raises:
+        OSError: If the font cannot be read
+        FontError: If it is not a TrueType font that can be embedded
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    identity = (path, stat.st_size, stat.st_mtime_ns)
+    font = _loaded.get(identity)
+    if font is not None:
+        return font
+
+    key = hashlib.sha256(repr((METRICS_VERSION, sys.byteorder) + identity).encode("utf-8")).hexdigest()[:16]
+    directory = cache_dir or os.path.join(default_cache_dir(), "fonts")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(directory, f"{stem}-{key}{METRICS_SUFFIX}")
+    metrics = _map_metrics(cache_path)
+    if metrics is None:
+        with open(path, "rb") as file:
+            data = file.read()
+        metrics = parse_font(data)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(metrics)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+        else:
+            metrics = _map_metrics(cache_path) or metrics
+    font = TrueTypeFont(path, metrics, key)
+    _loaded[identity] = font
+    return font
+
+
+def _map_metrics(cache_path: str) -> Optional[mmap.mmap]:
+    """Map a metrics file, or return None if it is missing or from another version."""
+    try:
+        with open(cache_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    header = buffer[:_HEADER.size]
+    if len(header) < _HEADER.size or _HEADER.unpack(header)[:3] != (
+        METRICS_MAGIC, METRICS_VERSION, sys.byteorder == "big"
+    ):
+        buffer.close()
+        return None
+    return buffer
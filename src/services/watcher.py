@@ -0,0 +1,413 @@
+"""Watch a directory tree for changes to source files."""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.services.discovery import DirectoryJob, DirectoryScanner, DiscoveryOptions, IgnoreRule, is_ignored
+from src.utils import document_order_key
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class SourceIndex:
+    """
+    Live index of the source files and directories under a root.
+
+    The tree is scanned once with the filters and .gitignore pruning of
+    discover_sources, so the index holds the same files; excluded, ignored
+    and version-control directories are never entered. Afterwards single
+    directories are rescanned when they change, so keeping the index
+    current never needs a full walk.
+    """
+
+    def __init__(self, root: str, options: Optional[DiscoveryOptions] = None) -> None:
+        """
+        Initialize the index by scanning the whole tree once.
+
+        Args:
+            root: Directory to index
+            options: Filters and traversal settings (defaults to .c files)
+        """
+        self.root = os.path.abspath(root)
+        self.options = options or DiscoveryOptions()
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.dirs: Dict[str, int] = {}
+        # Scan job and .gitignore rules in effect of each indexed directory
+        self._jobs: Dict[str, DirectoryJob] = {}
+        self._rules: Dict[str, Tuple[IgnoreRule, ...]] = {}
+        # Signature of the .gitignore of each indexed directory holding one
+        self._ignores: Dict[str, Tuple[int, int]] = {}
+        self._add_tree((self.root, '', 0, ()))
+
+    def wants_file(self, path: str) -> bool:
+        """Return True when a file in an indexed directory passes the filters and .gitignore rules."""
+        directory, name = os.path.split(path)
+        rules = self._rules.get(directory)
+        if rules is None:
+            return False
+        relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if not self.options.wants_file(name, relative):
+            return False
+        return not (rules and is_ignored(rules, relative, False))
+
+    def _add_tree(self, job: DirectoryJob) -> Set[str]:
+        """
+        Index a directory and everything below it that discovery would enter.
+
+        Args:
+            job: Scan job of the directory to add
+
+        Returns:
+            The paths of the source files that were added
+        """
+        added: Set[str] = set()
+        scanner = DirectoryScanner(self.options)
+        if self.options.follow_symlinks:
+            scanner.first_visit(job[0])
+        stack = [job]
+        while stack:
+            job = stack.pop()
+            directory = job[0]
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            ignore = self._ignore_signature(directory)
+            rules = scanner.rules(job)
+            files, subdirs = scanner.scan(job, rules)
+            self.dirs[directory] = mtime
+            self._jobs[directory] = job
+            self._rules[directory] = rules
+            if ignore is not None:
+                self._ignores[directory] = ignore
+            for _, path in files:
+                if self.refresh_file(path):
+                    added.add(path)
+            stack.extend(subdirs)
+        return added
+
+    def remove_tree(self, path: str) -> Set[str]:
+        """
+        Drop a directory and everything below it from the index.
+
+        Args:
+            path: Directory to remove
+
+        Returns:
+            The paths of the source files that were removed
+        """
+        prefix = path + os.sep
+        removed = {file for file in self.files if file.startswith(prefix)}
+        for file in removed:
+            del self.files[file]
+        for directory in [d for d in self.dirs if d == path or d.startswith(prefix)]:
+            del self.dirs[directory]
+            del self._jobs[directory]
+            del self._rules[directory]
+            self._ignores.pop(directory, None)
+        return removed
+
+    def reload_tree(self, path: str) -> Set[str]:
+        """
+        Index a directory again from scratch, after its .gitignore changed.
+
+        Args:
+            path: Indexed directory
+
+        Returns:
+            The source files that were added or removed
+        """
+        job = self._jobs.get(path)
+        if job is None:
+            return set()
+        removed = self.remove_tree(path)
+        return removed ^ self._add_tree(job)
+
+    def refresh_ignores(self) -> Set[str]:
+        """
+        Reindex the directories whose .gitignore was edited.
+
+        Creating or deleting a .gitignore changes its directory, which
+        refresh_dir notices; editing one in place does not.
+
+        Returns:
+            The source files that were added or removed
+        """
+        changed: Set[str] = set()
+        for directory, signature in list(self._ignores.items()):
+            if self._ignores.get(directory) == signature and self._ignore_signature(directory) != signature:
+                changed |= self.reload_tree(directory)
+        return changed
+
+    def _ignore_signature(self, directory: str) -> Optional[Tuple[int, int]]:
+        """Return the modification time and size of the .gitignore of a directory, if it is honoured."""
+        if not self.options.use_gitignore:
+            return None
+        try:
+            stat = os.stat(os.path.join(directory, '.gitignore'))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh_file(self, path: str) -> bool:
+        """
+        Update the entry of one file.
+
+        Args:
+            path: File that may have been created, modified or deleted
+
+        Returns:
+            True if the file was added, changed or removed
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self.files.pop(path, None) is not None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self.files.get(path) == signature:
+            return False
+        self.files[path] = signature
+        return True
+
+    def refresh_dir(self, path: str) -> Set[str]:
+        """
+        Rescan the entries of one directory (not its subdirectories).
+
+        New subdirectories that discovery would enter are indexed whole.
+
+        Args:
+            path: Directory whose entries may have changed
+
+        Returns:
+            The source files that were added or removed
+        """
+        job = self._jobs.get(path)
+        if job is None:
+            return set()
+        if self._ignore_signature(path) != self._ignores.get(path):
+            return self.reload_tree(path)
+        changed: Set[str] = set()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return self.remove_tree(path)
+        files, subdirs = DirectoryScanner(self.options).scan(job, self._rules[path])
+        self.dirs[path] = mtime
+        present = set()
+        for subdir in subdirs:
+            present.add(subdir[0])
+            if subdir[0] not in self.dirs:
+                changed |= self._add_tree(subdir)
+        for _, file in files:
+            present.add(file)
+            if file not in self.files and self.refresh_file(file):
+                changed.add(file)
+        for file in [f for f in self.files if os.path.dirname(f) == path and f not in present]:
+            del self.files[file]
+            changed.add(file)
+        for directory in [d for d in self.dirs if os.path.dirname(d) == path and d not in present]:
+            changed |= self.remove_tree(directory)
+        return changed
+
+    def ordered_files(self) -> List[Tuple[str, str]]:
+        """
+        List the indexed files in document order.
+
+        Returns:
+            List of (full_path, file_name) tuples, naturally sorted per directory
+        """
+        ordered = sorted(self.files, key=lambda path: document_order_key(os.path.relpath(path, self.root)))
+        return [(path, os.path.basename(path)) for path in ordered]
+
+
+class SourceWatcher:
+    """
+    Report debounced batches of changed source files under a directory.
+
+    Uses Linux inotify when available, watching only the indexed
+    directories; otherwise polls them and the indexed files with stat calls.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        options: Optional[DiscoveryOptions] = None,
+        debounce: float = 0.3,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        """
+        Initialize the watcher and index the tree.
+
+        Args:
+            root: Directory to watch
+            options: Filters and traversal settings of the watched files (defaults to .c files)
+            debounce: Quiet period, in seconds, that ends a burst of changes
+            poll_interval: Seconds between polls when inotify is unavailable
+            use_inotify: Set to False to force stat polling
+        """
+        self.index = SourceIndex(root, options)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._libc = None
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        if use_inotify and sys.platform.startswith("linux"):
+            self._start_inotify()
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Return True when changes come from inotify rather than polling."""
+        return self._fd >= 0
+
+    def files(self) -> List[Tuple[str, str]]:
+        """Return the watched source files in document order."""
+        return self.index.ordered_files()
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Block until a burst of changes has settled.
+
+        Args:
+            timeout: Maximum seconds to wait for the first change (None waits forever)
+
+        Returns:
+            The source files that changed, or an empty set on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: Set[str] = set()
+        while not changed:
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return changed
+            changed |= self._collect(wait)
+        # Keep collecting until the tree has been quiet for the debounce period
+        while True:
+            more = self._collect(self.debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self) -> None:
+        """Release the inotify descriptor, if any."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _collect(self, wait: float) -> Set[str]:
+        """Gather changes for up to `wait` seconds."""
+        if self._fd >= 0:
+            return self._read_inotify(wait)
+        time.sleep(max(wait, 0))
+        return self._poll()
+
+    def _poll(self) -> Set[str]:
+        """Find changes by comparing stat results with the index."""
+        index = self.index
+        changed: Set[str] = set()
+        for directory, mtime in list(index.dirs.items()):
+            if directory not in index.dirs:
+                continue  # Removed while rescanning its parent
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                changed |= index.remove_tree(directory)
+                continue
+            if current != mtime:
+                changed |= index.refresh_dir(directory)
+        for path in list(index.files):
+            if index.refresh_file(path):
+                changed.add(path)
+        return changed | index.refresh_ignores()
+
+    def _start_inotify(self) -> None:
+        """Create the inotify descriptor and watch every indexed directory."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self._libc = libc
+        self._fd = fd
+        self._sync_watches()
+
+    def _sync_watches(self) -> None:
+        """Watch the directories that joined the index, and stop watching those that left it."""
+        watched = {directory: wd for wd, directory in self._watches.items()}
+        for directory in self.index.dirs.keys() - watched.keys():
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+        for directory in watched.keys() - self.index.dirs.keys():
+            # Pruned directories that still exist, e.g. newly ignored ones
+            self._libc.inotify_rm_watch(self._fd, watched[directory])
+            del self._watches[watched[directory]]
+
+    def _read_inotify(self, wait: float) -> Set[str]:
+        """Read and apply pending inotify events."""
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], max(wait, 0))
+        if not ready:
+            return changed
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        index = self.index
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; resynchronise the affected state from disk
+                changed |= self._poll()
+                self._sync_watches()
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            if not name:
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    changed |= index.remove_tree(directory)
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR or (name == '.gitignore' and index.options.use_gitignore):
+                # The parent decides, with its filters and rules, which subdirectories are indexed
+                changed |= index.refresh_dir(directory)
+                self._sync_watches()
+            elif (path in index.files or index.wants_file(path)) and index.refresh_file(path):
+                changed.add(path)
+        return changed
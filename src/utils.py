@@ -16,4 +16,23 @@ def natural_sort_key(s: str) -> List[Union[int, str]]:
         A list of integers and strings that can be used as a sort key
     """
     return [int(text) if text.isdigit() else text.lower()
-            for text in re.split('([0-9]+)', s)] 
\ No newline at end of file
+            for text in re.split('([0-9]+)', s)]
+
+
+def document_order_key(relative_path: str) -> List[List[Union[int, str]]]:
+    """
+    Generate a key that orders file paths like a sorted top-down walk.
+    
+    Files of a directory come before the contents of its subdirectories, and
+    names at every level are compared with natural sorting.
+    
+    Args:
+        relative_path: Path of a file relative to the scanned root
+        
+    Returns:
+        A list of keys, one per path component, usable as a sort key
+    """
+    parts = relative_path.replace('\\', '/').split('/')
+    key: List[List[Union[int, str]]] = [[1] + natural_sort_key(part) for part in parts[:-1]]
+    key.append([0] + natural_sort_key(parts[-1]))
+    return key
@@ -0,0 +1,123 @@
+"""Test module for reading sources from archives."""
+import io
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from src.services.archive import SourceArchive, is_archive, member_path
+from src.services.discovery import DiscoveryOptions
+from src.services.pdf_generator import create_exercises_pdf
+from src.services.source_reader import ReadLimits, SourceText
+
+MEMBERS = {
+    "10.c": "int ten;\n",
+    "2.c": "int two;\n",
+    "notes.txt": "not a source\n",
+    "turma/1.c": "int one;\n",
+    "__MACOSX/._2.c": "\0\0binary",
+    "build/out.c": "int out;\n",
+}
+
+
+def _write_zip(path: str) -> None:
+    """Write MEMBERS into a zip archive."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, text in MEMBERS.items():
+            archive.writestr(name, text)
+
+
+def _write_tar(path: str) -> None:
+    """Write MEMBERS into a gzip-compressed tar archive."""
+    with tarfile.open(path, 'w:gz') as archive:
+        for name, text in MEMBERS.items():
+            data = text.encode()
+            info = tarfile.TarInfo("./" + name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class TestSourceArchive:
+    """Test cases for SourceArchive."""
+
+    def test_members_are_filtered_and_sorted(self) -> None:
+        """Test that zip and tar members are listed like the files of a directory."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, write in [("a.zip", _write_zip), ("a.tar.gz", _write_tar)]:
+                path = os.path.join(temp_dir, name)
+                write(path)
+
+                archive = SourceArchive(path, DiscoveryOptions(exclude=["build"]))
+                try:
+                    assert [file_name for _, file_name in archive.files] == ["2.c", "10.c", "1.c"]
+                    assert archive.files[2][0] == os.path.join(path, "turma", "1.c")
+                    assert archive.read(archive.files[2][0]) == b"int one;\n"
+                    assert archive.read(os.path.join(path, "notes.txt")) is None
+                finally:
+                    archive.close()
+
+    def test_members_past_the_byte_limit_are_truncated(self) -> None:
+        """Test that big members are read only up to the byte limit, with their real size."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "a.zip")
+            with zipfile.ZipFile(path, 'w') as archive:
+                archive.writestr("big.c", "int x;\n" * 1000)
+
+            archive = SourceArchive(path, limits=ReadLimits(max_bytes=70))
+            try:
+                source = archive.read(archive.files[0][0])
+            finally:
+                archive.close()
+
+            assert isinstance(source, SourceText)
+            assert source.truncated
+            assert source.size == 7000
+            assert source.lines == ["int x;"] * 10
+
+    def test_member_paths(self) -> None:
+        """Test that member names are normalized and unsafe ones refused."""
+        assert member_path("./a//b/c.c") == "a/b/c.c"
+        assert member_path("a\\b.c") == "a/b.c"
+        assert member_path("../evil.c") is None
+        assert member_path("./") is None
+
+    def test_is_archive(self) -> None:
+        """Test that only real archives are recognized."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "a.zip")
+            _write_zip(path)
+            fake = os.path.join(temp_dir, "fake.zip")
+            with open(fake, 'w', encoding='utf-8') as f:
+                f.write("int main;")
+
+            assert is_archive(path)
+            assert not is_archive(fake)
+            assert not is_archive(temp_dir)
+
+
+class TestCreatePDFFromArchive:
+    """Test cases for generating PDFs from archives."""
+
+    def test_archive_matches_extracted_directory(self) -> None:
+        """Test that an archive and its extracted copy produce the same document."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = os.path.join(temp_dir, "lista")
+            for name, text in MEMBERS.items():
+                os.makedirs(os.path.join(directory, os.path.dirname(name)), exist_ok=True)
+                with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            os.remove(os.path.join(directory, "__MACOSX", "._2.c"))
+            outputs = {}
+            for name, write in [("lista", None), ("lista.zip", _write_zip), ("lista.tgz", _write_tar)]:
+                source = os.path.join(temp_dir, name)
+                if write is not None:
+                    write(source)
+                output_file = os.path.join(temp_dir, name + ".pdf")
+
+                assert create_exercises_pdf(source, output_file, toc=True)
+
+                with open(output_file, 'rb') as f:
+                    outputs[name] = b"".join(line for line in f if b"/CreationDate" not in line)
+
+            assert outputs["lista.zip"] == outputs["lista"]
+            assert outputs["lista.tgz"] == outputs["lista"]
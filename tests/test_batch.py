@@ -0,0 +1,88 @@
+"""Test module for batch generation."""
+import os
+import tempfile
+import zipfile
+
+from src.services.batch import BatchJob, jobs_from_manifest, jobs_from_parent, run_batch
+
+
+def _make_student(parent: str, name: str) -> str:
+    """Create a student directory with one C file and return its path."""
+    path = os.path.join(parent, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "1.c"), 'w', encoding='utf-8') as f:
+        f.write("int main() { return 0; }\n")
+    return path
+
+
+class TestBatchJobs:
+    """Test cases for building batch job lists."""
+
+    def test_jobs_from_parent(self) -> None:
+        """Test that every subdirectory becomes a job, in natural order."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["aluno10", "aluno2", ".hidden"]:
+                os.makedirs(os.path.join(temp_dir, name))
+
+            jobs = jobs_from_parent(temp_dir, "/out")
+
+            assert [os.path.basename(job.input_dir) for job in jobs] == ["aluno2", "aluno10"]
+            assert jobs[0].output_file == os.path.join("/out", "aluno2.pdf")
+
+    def test_archives_become_jobs(self) -> None:
+        """Test that archives next to the student directories are jobs too."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_student(temp_dir, "aluno1")
+            with zipfile.ZipFile(os.path.join(temp_dir, "aluno2.zip"), 'w') as archive:
+                archive.writestr("1.c", "int main() { return 0; }\n")
+            with open(os.path.join(temp_dir, "notas.zip"), 'w', encoding='utf-8') as f:
+                f.write("not an archive")
+
+            output_dir = os.path.join(temp_dir, "pdfs")
+
+            jobs = jobs_from_parent(temp_dir, output_dir)
+            results = run_batch(jobs, 1)
+
+            assert [os.path.basename(job.input_dir) for job in jobs] == ["aluno1", "aluno2.zip"]
+            assert jobs[1].output_file == os.path.join(output_dir, "aluno2.pdf")
+            assert all(result.success for result in results)
+            assert os.path.isfile(os.path.join(output_dir, "aluno2.pdf"))
+
+    def test_jobs_from_manifest(self) -> None:
+        """Test text manifests with optional output names and comments."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = os.path.join(temp_dir, "jobs.txt")
+            with open(manifest, 'w', encoding='utf-8') as f:
+                f.write("# students\nana\tana_final\n\n/abs/bruno\n")
+
+            jobs = jobs_from_manifest(manifest, "/out")
+
+            assert jobs[0].input_dir == os.path.join(temp_dir, "ana")
+            assert jobs[0].output_file == os.path.join("/out", "ana_final.pdf")
+            assert jobs[1].input_dir == "/abs/bruno"
+            assert jobs[1].output_file == os.path.join("/out", "bruno.pdf")
+
+
+class TestRunBatch:
+    """Test cases for run_batch."""
+
+    def test_failures_do_not_stop_the_batch(self) -> None:
+        """Test that each job reports its own outcome."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            good = _make_student(temp_dir, "good")
+            other = _make_student(temp_dir, "other")
+            out = os.path.join(temp_dir, "out")
+            jobs = [
+                BatchJob(os.path.join(temp_dir, "missing"), os.path.join(out, "missing.pdf")),
+                BatchJob(good, os.path.join(out, "good.pdf")),
+                BatchJob(other, os.path.join(out, "other.pdf")),
+            ]
+            reported = []
+
+            results = run_batch(jobs, workers=2, on_result=reported.append)
+
+            assert [result.success for result in results] == [False, True, True]
+            assert "does not exist" in results[0].error
+            assert len(reported) == 3
+            assert os.path.getsize(os.path.join(out, "good.pdf")) > 0
+            assert os.path.getsize(os.path.join(out, "other.pdf")) > 0
@@ -0,0 +1,72 @@
+"""Test module for the benchmark suite and its corpus generator."""
+import json
+import os
+import tempfile
+from typing import Dict
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from benchmarks.run import compare, main
+
+
+def _read_tree(root: str) -> Dict[str, str]:
+    """Map every file under root (relative path) to its contents."""
+    contents = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            with open(path, 'r', encoding='utf-8') as f:
+                contents[os.path.relpath(path, root)] = f.read()
+    return contents
+
+
+class TestCorpus:
+    """Test cases for the synthetic corpus generator."""
+
+    def test_same_spec_same_tree(self) -> None:
+        """Test that a spec always produces the same files."""
+        spec = CorpusSpec(files=12, min_lines=5, max_lines=50, depth=2, long_lines=3, seed=7)
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            generate_corpus(first, spec)
+            generate_corpus(second, spec)
+
+            assert _read_tree(first) == _read_tree(second)
+            assert len(_read_tree(first)) == 12
+
+    def test_shape_follows_spec(self) -> None:
+        """Test line counts and pathological lines."""
+        spec = CorpusSpec(files=5, min_lines=10, max_lines=20, depth=0, long_lines=2, long_line_length=500)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = generate_corpus(temp_dir, spec)
+            lines = []
+            for path in paths:
+                assert os.path.dirname(path) == temp_dir
+                with open(path, 'r', encoding='utf-8') as f:
+                    file_lines = f.read().splitlines()
+                assert 10 <= len(file_lines) <= 20
+                lines.extend(file_lines)
+
+            assert sum(len(line) > 500 for line in lines) == 2
+
+
+class TestRunner:
+    """Test cases for the benchmark runner."""
+
+    def test_save_and_compare(self) -> None:
+        """Test that results are saved and compared against a baseline."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results_file = os.path.join(temp_dir, "results.json")
+            args = ["--files", "3", "--max-lines", "30", "--long-lines", "1", "--repeat", "1"]
+
+            assert main(args + ["--save", results_file]) == 0
+            with open(results_file, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+
+            assert set(report["results"]) == {
+                "create_exercises_pdf", "wrap_text_to_lines", "natural_sort_key", "cli_startup"
+            }
+            assert report["results"]["create_exercises_pdf"]["throughput"]["pages_per_second"] > 0
+            assert compare(report, report, 0.1) == []
+
+            slower = json.loads(json.dumps(report))
+            slower["results"]["natural_sort_key"]["best_seconds"] *= 2
+            assert compare(slower, report, 0.1) == ["natural_sort_key"]
@@ -0,0 +1,116 @@
+"""Test module for source discovery."""
+import os
+import re
+import tempfile
+from typing import List
+
+import pytest
+
+from src.services.discovery import DiscoveryOptions, discover_sources, glob_to_regex
+
+
+def _make_tree(root: str, paths: List[str]) -> None:
+    """Create empty files (and their directories) under root."""
+    for path in paths:
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write("")
+
+
+def _relative(root: str, found: List[tuple]) -> List[str]:
+    """Return the discovered paths relative to root, with '/' separators."""
+    return [os.path.relpath(full_path, root).replace(os.sep, '/') for full_path, _ in found]
+
+
+class TestDiscoverSources:
+    """Test cases for discover_sources."""
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_document_order(self, workers: int) -> None:
+        """Test that files come naturally sorted, directory files before subdirectories."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, ["10.c", "2.c", "sub10/a.c", "sub2/b.c", "sub2/z/1.c", "sub2/a10.c", "sub2/a9.c"])
+
+            found = discover_sources(temp_dir, DiscoveryOptions(workers=workers))
+
+            assert _relative(temp_dir, found) == [
+                "2.c", "10.c", "sub2/a9.c", "sub2/a10.c", "sub2/b.c", "sub2/z/1.c", "sub10/a.c",
+            ]
+            assert found[0][1] == "2.c"
+
+    def test_extensions_and_file_names(self) -> None:
+        """Test that several extensions and exact names can be selected."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, ["main.c", "util.h", "Makefile", "notes.txt", "lib.cpp"])
+
+            found = discover_sources(temp_dir, DiscoveryOptions(extensions=['.c', '.h', 'Makefile']))
+
+            assert sorted(_relative(temp_dir, found)) == ["Makefile", "main.c", "util.h"]
+
+    def test_include_and_exclude(self) -> None:
+        """Test include/exclude globs, with excluded directories pruned."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, ["a/1.c", "a/test_1.c", "build/gen.c", "b/deep/build/x.c", "b/2.c"])
+            options = DiscoveryOptions(include=["a/**", "b/*.c", "**/build/*"], exclude=["build", "test_*"])
+
+            found = discover_sources(temp_dir, options)
+
+            assert _relative(temp_dir, found) == ["a/1.c", "b/2.c"]
+
+    def test_gitignore_and_vcs_directories(self) -> None:
+        """Test that .gitignore rules (with negation and nesting) and .git are honoured."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, [
+                ".git/hooks/x.c", "build/out.c", "gen_1.c", "gen_keep.c", "src/main.c",
+                "src/tmp/t.c", "src/local.c",
+            ])
+            with open(os.path.join(temp_dir, ".gitignore"), 'w', encoding='utf-8') as f:
+                f.write("# generated\nbuild/\ngen_*.c\n!gen_keep.c\n")
+            with open(os.path.join(temp_dir, "src", ".gitignore"), 'w', encoding='utf-8') as f:
+                f.write("/tmp\nlocal.c\n")
+
+            found = discover_sources(temp_dir)
+            unfiltered = discover_sources(temp_dir, DiscoveryOptions(use_gitignore=False))
+
+            assert _relative(temp_dir, found) == ["gen_keep.c", "src/main.c"]
+            assert len(unfiltered) == 6
+
+    def test_max_depth(self) -> None:
+        """Test that scanning stops at the requested depth."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, ["0.c", "a/1.c", "a/b/2.c"])
+
+            assert _relative(temp_dir, discover_sources(temp_dir, DiscoveryOptions(max_depth=0))) == ["0.c"]
+            assert _relative(temp_dir, discover_sources(temp_dir, DiscoveryOptions(max_depth=1))) == ["0.c", "a/1.c"]
+
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks not supported")
+    def test_symlink_cycle_is_skipped(self) -> None:
+        """Test that following symlinks does not loop forever on cycles."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _make_tree(temp_dir, ["a/1.c"])
+            os.symlink(temp_dir, os.path.join(temp_dir, "a", "loop"))
+            os.symlink(os.path.join(temp_dir, "a"), os.path.join(temp_dir, "alias"))
+
+            followed = discover_sources(temp_dir, DiscoveryOptions(follow_symlinks=True))
+            not_followed = discover_sources(temp_dir)
+
+            assert len(followed) == 1
+            assert _relative(temp_dir, not_followed) == ["a/1.c"]
+
+
+class TestGlobToRegex:
+    """Test cases for glob translation."""
+
+    @pytest.mark.parametrize("pattern,path,expected", [
+        ("*.c", "a.c", True),
+        ("*.c", "dir/a.c", False),
+        ("**/*.c", "dir/sub/a.c", True),
+        ("**/*.c", "a.c", True),
+        ("src/**", "src/a/b.c", True),
+        ("[!a]?.c", "b1.c", True),
+        ("[!a]?.c", "a1.c", False),
+    ])
+    def test_patterns(self, pattern: str, path: str, expected: bool) -> None:
+        """Test glob semantics for common patterns."""
+        assert (re.match(glob_to_regex(pattern) + r'\Z', path) is not None) == expected
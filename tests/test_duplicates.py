@@ -0,0 +1,132 @@
+"""Test module for the deduplication of identical source files."""
+import os
+import re
+import tempfile
+import zipfile
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
+
+import pytest
+
+from src.services import pdf_generator
+from src.services.archive import SourceArchive
+from src.services.discovery import DiscoveryOptions
+from src.services.duplicates import content_digest, repeated_digests
+from src.services.pdf_generator import create_exercises_pdf, exercise_header, render_exercise_pages
+from src.services.source_reader import SourceText
+
+if TYPE_CHECKING:
+    from _pytest.monkeypatch import MonkeyPatch
+
+TEMPLATE = "#include <stdio.h>\n\nint main(void) {\n    printf(\"(modelo)\\n\");\n    return 0;\n}\n"
+FILES = {
+    "a/exemplo.c": TEMPLATE,
+    "a/resposta.c": "int a;\n",
+    "b/exemplo.c": TEMPLATE,
+    "b/resposta.c": "int b;\n",
+    "c/copia (1).c": TEMPLATE,
+    "c/dados.c": "\0\0\0binary",
+    "d/dados.c": "\0\0\0binary",
+}
+
+
+@pytest.fixture
+def submissions() -> Iterator[str]:
+    """A directory of student folders, several holding the same template."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = os.path.join(temp_dir, "turma")
+        for name, text in FILES.items():
+            path = os.path.join(root, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        yield root
+
+
+def _pages(path: str) -> int:
+    """Count the pages of a PDF written by the generator."""
+    with open(path, 'rb') as f:
+        return len(re.findall(rb"/Type /Page\n", f.read()))
+
+
+class TestDigests:
+    """Test cases for finding files with the same contents."""
+
+    def test_repeated_digests(self, submissions: str) -> None:
+        """Test that only text files with a copy get a digest."""
+        c_files = [(os.path.join(submissions, *name.split("/")), name) for name in FILES]
+
+        digests = dict(zip(FILES, repeated_digests(c_files)))
+
+        assert digests["a/exemplo.c"] == digests["b/exemplo.c"] == digests["c/copia (1).c"] is not None
+        assert digests["a/resposta.c"] is None
+        # Binary files are reported by name, so their copies do not render alike
+        assert digests["c/dados.c"] is None
+        assert content_digest(os.path.join(submissions, "missing.c")) is None
+
+    def test_archive_members(self) -> None:
+        """Test that members of an archive are hashed without extracting them."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "turma.zip")
+            with zipfile.ZipFile(path, 'w') as archive:
+                for name, text in FILES.items():
+                    archive.writestr(name, text)
+            archive = SourceArchive(path, DiscoveryOptions())
+            try:
+                first = content_digest(os.path.join(path, "a", "exemplo.c"), archive)
+
+                assert first is not None
+                assert content_digest(os.path.join(path, "c", "copia (1).c"), archive) == first
+                assert content_digest(os.path.join(path, "c", "dados.c"), archive) is None
+            finally:
+                archive.close()
+
+
+class TestSharedPages:
+    """Test cases for documents with copies of the same file."""
+
+    def test_header_starts_the_first_page(self) -> None:
+        """Test that the rest of a first page does not depend on the file name."""
+        pages = render_exercise_pages(("a/exemplo.c", "cópia (1).c", TEMPLATE.encode()))
+        other = render_exercise_pages(("b/exemplo.c", "exemplo.c", TEMPLATE.encode()))
+
+        header = exercise_header("cópia (1).c")
+
+        assert pages[0].startswith(header)
+        assert pages[0][len(header):] == other[0][len(exercise_header("exemplo.c")):]
+
+    @pytest.mark.parametrize("duplicates", ["share", "reference"])
+    def test_copies_are_not_rendered_again(self, submissions: str, duplicates: str) -> None:
+        """Test that copies share the pages of the first file, or point at it."""
+        rendered = os.path.join(submissions, "rendered.pdf")
+        output_file = os.path.join(submissions, "out.pdf")
+        assert create_exercises_pdf(submissions, rendered, compression=0, duplicates="render")
+
+        assert create_exercises_pdf(submissions, output_file, compression=0, duplicates=duplicates)
+
+        with open(output_file, 'rb') as f:
+            data = f.read()
+        assert data.count(b"\\(modelo\\)") == 1
+        assert data.count(b"Exerc\xedcio: exemplo.c") == 2
+        assert b"Exerc\xedcio: copia \\(1\\).c" in data
+        assert os.path.getsize(output_file) < os.path.getsize(rendered)
+        if duplicates == "share":
+            assert _pages(output_file) == _pages(rendered)
+            assert re.search(rb"/Contents \[\d+ 0 R \d+ 0 R\]", data)
+        else:
+            assert b"Id\xeantico a a/exemplo.c \\(p\xe1gina 1\\)" in data
+            assert data.count(b"/Subtype /Link") == 2
+
+    def test_copies_are_not_read_again(self, submissions: str, monkeypatch: "MonkeyPatch") -> None:
+        """Test that the prefetcher only reads the files that are rendered."""
+        loaded: List[str] = []
+        load_source = pdf_generator._load_source
+
+        def record(full_path: str, *args: Any) -> Optional[SourceText]:
+            loaded.append(os.path.relpath(full_path, submissions).replace(os.sep, "/"))
+            return load_source(full_path, *args)
+
+        monkeypatch.setattr(pdf_generator, "_load_source", record)
+
+        assert create_exercises_pdf(submissions, os.path.join(submissions, "out.pdf"))
+
+        assert sorted(loaded) == ["a/exemplo.c", "a/resposta.c", "b/resposta.c", "c/dados.c", "d/dados.c"]
@@ -0,0 +1,151 @@
+"""Test module for the compile-and-run stage."""
+import json
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING
+
+import pytest
+
+from src.services import execution
+from src.services.execution import ExecConfig, compile_and_run, execution_reports, load_exec_config
+from src.services.pdf_generator import create_exercises_pdf
+from src.services.render_cache import RenderCache
+
+if TYPE_CHECKING:
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+LISTA = os.path.join(os.path.dirname(__file__), "lista")
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is not installed")
+
+
+def _write(directory: str, name: str, text: str) -> str:
+    """Write a source file and return its path."""
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+class TestExecConfig:
+    """Test cases for reading CExecConfig.json."""
+
+    def test_load_repository_config(self) -> None:
+        """Test the configuration shipped with the sample exercises."""
+        config = load_exec_config(os.path.join(LISTA, "CExecConfig.json"))
+
+        assert config.compiler_path == "gcc"
+        assert config.compiler_args == ["-lm"]
+        assert config.run_after_compile
+        assert config.run_timeout == execution.DEFAULT_RUN_TIMEOUT
+
+    def test_invalid_setting_is_rejected(self) -> None:
+        """Test that settings of the wrong type are reported."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "CExecConfig.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"compilerArgs": "-lm"}, f)
+
+            with pytest.raises(ValueError, match="compilerArgs"):
+                load_exec_config(path)
+
+    def test_signature_follows_settings(self) -> None:
+        """Test that changing a setting changes the cache signature."""
+        assert ExecConfig().signature() == ExecConfig().signature()
+        assert ExecConfig().signature() != ExecConfig(compiler_args=["-O2"]).signature()
+
+
+@needs_gcc
+class TestCompileAndRun:
+    """Test cases for compile_and_run."""
+
+    def test_program_output_is_reported(self) -> None:
+        """Test a program that compiles and prints."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code = '#include <stdio.h>\nint main(void) { puts("ola"); return 3; }\n'
+            path = _write(temp_dir, "a.c", code)
+
+            report = compile_and_run(path, "a.c", code.encode(), ExecConfig(run_after_compile=True))
+
+        assert report == ["Compilação: sucesso", "Execução: código de saída 3", "Saída do programa:", "ola"]
+
+    def test_compiler_errors_are_reported(self) -> None:
+        """Test that diagnostics follow a failed compilation, without temporary paths."""
+        code = "int main(void) { return nope; }\n"
+
+        report = compile_and_run("/missing/a.c", "a.c", code.encode(), ExecConfig(run_after_compile=True))
+
+        assert report[0] == "Compilação: falhou (código 1)"
+        assert any("nope" in line for line in report[1:])
+        assert not any("lista-exec-" in line for line in report)
+
+    def test_endless_program_times_out(self) -> None:
+        """Test that the run timeout stops a program that never ends."""
+        code = "int main(void) { for (;;) {} }\n"
+        config = ExecConfig(run_after_compile=True, run_timeout=0.5)
+
+        report = compile_and_run("/missing/a.c", "a.c", code.encode(), config)
+
+        assert report[1] == "Execução: tempo esgotado (0.5 s)"
+
+    def test_missing_compiler(self) -> None:
+        """Test the report when the compiler cannot be started."""
+        report = compile_and_run("/missing/a.c", "a.c", b"", ExecConfig(compiler_path="/missing/cc"))
+
+        assert report[0].startswith("Compilação: não foi possível executar /missing/cc")
+
+
+class TestExecutionReports:
+    """Test cases for the parallel, cached stage."""
+
+    def test_reports_are_ordered_and_cached(self, mocker: "MockerFixture") -> None:
+        """Test that reports come in document order and unchanged files are not compiled again."""
+        compile_mock = mocker.patch.object(
+            execution, "compile_and_run", side_effect=lambda path, name, data, config: [f"ok {name}"]
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            files = [(_write(temp_dir, f"{i}.c", f"int v{i};"), f"{i}.c") for i in range(10)]
+            cache = RenderCache(os.path.join(temp_dir, "cache"))
+
+            first = list(execution_reports(files, ExecConfig(), 3, cache))
+            second = list(execution_reports(files, ExecConfig(), 3, cache))
+            list(execution_reports(files[:1], ExecConfig(compiler_args=["-O2"]), 3, cache))
+
+        assert first == second == [[f"ok {i}.c"] for i in range(10)]
+        assert compile_mock.call_count == 11
+        assert cache.hits == 10
+
+    @needs_gcc
+    def test_report_is_printed_after_the_code(self) -> None:
+        """Test that the generated PDF shows the outcome of each exercise."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write(temp_dir, "1.c", '#include <stdio.h>\nint main(void) { puts("resultado"); return 0; }\n')
+            output_file = os.path.join(temp_dir, "out.pdf")
+
+            assert create_exercises_pdf(
+                temp_dir, output_file, compression=0, execution=ExecConfig(run_after_compile=True)
+            )
+
+            with open(output_file, 'rb') as f:
+                data = f.read()
+        assert b"(Compila\xe7\xe3o: sucesso)" in data
+        assert b"(resultado)" in data
+
+    @needs_gcc
+    def test_relative_root(self, monkeypatch: "MonkeyPatch") -> None:
+        """Test that files found under a relative root compile, although the compiler runs elsewhere."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "relexec"))
+            code = '#include <stdio.h>\nint main(void) { puts("relativo"); }\n'
+            _write(os.path.join(temp_dir, "relexec"), "1.c", code)
+            monkeypatch.chdir(temp_dir)
+
+            assert create_exercises_pdf(
+                "relexec", "out.pdf", compression=0, execution=ExecConfig(run_after_compile=True)
+            )
+
+            with open("out.pdf", 'rb') as f:
+                data = f.read()
+        assert b"(Compila\xe7\xe3o: sucesso)" in data
+        assert b"(relativo)" in data
@@ -0,0 +1,70 @@
+"""Test module for generation instrumentation."""
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+from src.services.instrumentation import FILE_PHASES, FileProfile, Profiler, timed_iter
+from src.services.pdf_generator import create_exercises_pdf, render_exercise_pages
+
+
+class TestProfiler:
+    """Test cases for the Profiler class."""
+
+    def test_phases_counters_and_hooks(self) -> None:
+        """Test that timings accumulate and every event reaches the hooks."""
+        profiler = Profiler()
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        profiler.add_hook(lambda event, data: events.append((event, data)))
+
+        with profiler.phase("discovery"):
+            pass
+        assert list(timed_iter(profiler, "render", [1, 2])) == [1, 2]
+        profiler.count("pages", 3)
+        profiler.count("pages")
+
+        assert set(profiler.phases) == {"discovery", "render"}
+        assert profiler.counters == {"pages": 4}
+        assert [event for event, _ in events] == ["phase"] * 4
+
+    def test_render_profile(self) -> None:
+        """Test the per-file profile filled in while rendering."""
+        data = ("x" * 200 + "\nint y;\n").encode("utf-8")
+        profile = FileProfile("/tmp/a.c", "a.c")
+
+        pages = render_exercise_pages(("/tmp/a.c", "a.c", data), profile)
+
+        assert profile.lines == 3
+        assert profile.wrapped_lines > 0
+        assert profile.pages == len(pages)
+        assert profile.size == len(data)
+        assert set(profile.phases) == set(FILE_PHASES)
+
+
+class TestProfiledGeneration:
+    """Test cases for profiling create_exercises_pdf."""
+
+    def test_profiled_run_report_and_json(self) -> None:
+        """Test that a profiled run records every file and serializes to JSON."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Different contents, as copies of a file are not rendered again
+            for code, name in enumerate(["1.c", "2.c"]):
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write(f"int main() {{\n    return {code};\n}}\n")
+            profiler = Profiler()
+
+            assert create_exercises_pdf(temp_dir, os.path.join(temp_dir, "out.pdf"), profiler=profiler)
+            profiler.finish()
+
+            assert profiler.counters["files"] == 2
+            assert profiler.counters["lines"] == 8
+            assert profiler.counters["pages"] == 3
+            assert profiler.counters["bytes_written"] == os.path.getsize(os.path.join(temp_dir, "out.pdf"))
+            assert {"discovery", "render", "write"} <= set(profiler.phases)
+            assert "1.c" in profiler.format_report()
+
+            json_file = os.path.join(temp_dir, "profile.json")
+            profiler.write_json(json_file)
+            with open(json_file, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            assert [entry["name"] for entry in report["files"]] == ["1.c", "2.c"]
@@ -0,0 +1,67 @@
+"""Test module for the exercise layout."""
+import pickle
+
+from src.services.layout import CODE, CONTINUATION, HEADER, NOTE, SPACER, LayoutBuilder, PageGeometry
+from src.services.pdf_generator import emit_exercise, layout_exercise, render_exercise_pages
+
+GEOMETRY = PageGeometry(top=10, bottom=50, line_height=5, header_height=10, spacer_height=10)
+
+
+class TestLayoutBuilder:
+    """Test cases for LayoutBuilder."""
+
+    def test_rows_break_pages_when_full(self) -> None:
+        """Test that a row crossing the bottom starts a new page."""
+        builder = LayoutBuilder(GEOMETRY)
+        builder.add(HEADER, "Exercício: a.c")
+        builder.add_code([[f"line {i}"] for i in range(10)])
+        builder.add(SPACER)
+
+        layout = builder.finish()
+
+        # 10 + 10 + 6 * 5 = 50 on the first page, then 4 rows and the spacer
+        assert layout.page_count == 2
+        assert list(layout.page_rows(0)) == list(range(7))
+        assert list(layout.page_rows(1)) == list(range(7, 12))
+        assert layout.kinds[-1] == SPACER
+
+    def test_wrapped_rows_are_continuations(self) -> None:
+        """Test that only the first row of a wrapped line is numbered."""
+        builder = LayoutBuilder(GEOMETRY)
+        builder.add_code([["a"], ["b1", "b2", "b3"], ["c"]])
+
+        layout = builder.finish()
+
+        assert list(layout.kinds) == [CODE, CODE, CONTINUATION, CONTINUATION, CODE]
+        assert list(layout.numbers) == [1, 2, 0, 0, 3]
+        assert layout.lines == 3
+        assert layout.wrapped_lines == 2
+
+
+class TestExerciseLayout:
+    """Test cases for laying out and emitting exercises."""
+
+    def test_page_count_is_known_before_emitting(self) -> None:
+        """Test that the layout predicts the pages the emitter writes."""
+        for count in (1, 50, 52, 54, 200):
+            data = "\n".join("x" * (i % 150) for i in range(count)).encode()
+
+            layout = layout_exercise(("a.c", "a.c", data))
+
+            assert layout.page_count == len(emit_exercise(layout))
+
+    def test_layout_survives_pickling(self) -> None:
+        """Test that a layout sent across processes emits the same pages."""
+        data = "\n".join(f"int v{i} = {i};" for i in range(120)).encode()
+        layout = layout_exercise(("a.c", "a.c", data))
+
+        copy = pickle.loads(pickle.dumps(layout))
+
+        assert emit_exercise(copy) == render_exercise_pages(("a.c", "a.c", data))
+
+    def test_unreadable_file_gets_a_note(self) -> None:
+        """Test the note printed when the file cannot be read."""
+        layout = layout_exercise(("/missing/a.c", "a.c", None))
+
+        assert list(layout.kinds) == [HEADER, NOTE, SPACER]
+        assert layout.texts[1].startswith("Erro ao ler arquivo a.c")
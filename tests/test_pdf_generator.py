@@ -1,12 +1,23 @@
 """Test module for PDF generator functionality."""
+import builtins
 import os
 import tempfile
-from typing import TYPE_CHECKING
+import threading
+from typing import TYPE_CHECKING, Any, List, Tuple
 
 import pytest
 from fpdf import FPDF
 
-from src.services.pdf_generator import CustomPDF, create_exercises_pdf
+from src.services import pdf_generator
+from src.services.pdf_generator import (
+    CustomPDF,
+    GenerationCancelled,
+    create_exercises_pdf,
+    find_c_files,
+    render_exercise_pages,
+)
+from src.services.render_cache import RenderCache
+from src.services.source_reader import ReadLimits
 
 if TYPE_CHECKING:
     from _pytest.capture import CaptureFixture
@@ -28,6 +39,23 @@ class TestCustomPDF:
         # Verify PDF was created without errors
         assert pdf.page_no() == 1
 
+    def test_footer_is_a_shared_form(self) -> None:
+        """Test that the footer is written once and referenced from every page."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf = CustomPDF()
+            pdf.set_compression(False)
+            for _ in range(3):
+                pdf.add_page()
+            output_file = os.path.join(temp_dir, "footer.pdf")
+            pdf.output(output_file, 'F')
+            
+            with open(output_file, 'rb') as f:
+                data = f.read()
+            
+            assert data.count(b"Feito com Lista da vanessaDOR") == 1
+            assert data.count(b"/Footer Do") == 3
+            assert b"/Subtype /Form" in data
+
     def test_wrap_text_to_lines_short_text(self) -> None:
         """Test text wrapping with text that fits in one line."""
         pdf = CustomPDF()
@@ -75,7 +103,7 @@ class TestCustomPDF:
         assert wrapped_lines[0] == ""
 
     def test_wrap_text_to_lines_single_long_word(self) -> None:
-        """Test text wrapping with a single word that exceeds max width."""
+        """Test that a single word exceeding max width is hard-split."""
         pdf = CustomPDF()
         pdf.add_page()
         pdf.set_font("Courier", size=10)
@@ -85,8 +113,10 @@ class TestCustomPDF:
         
         wrapped_lines = pdf.wrap_text_to_lines(text, max_width)
         
-        assert len(wrapped_lines) == 1
-        assert wrapped_lines[0] == text  # Should keep the long word as is
+        assert len(wrapped_lines) > 1
+        # The long word is split, never dropped or overflowing
+        assert "".join(wrapped_lines) == text
+        assert all(pdf.get_string_width(line) <= max_width for line in wrapped_lines)
 
 
 class TestCreateExercisesPDF:
@@ -180,4 +210,225 @@ int main() {{
             
             assert result is True
             assert os.path.exists(output_file)
-            assert os.path.getsize(output_file) > 0
\ No newline at end of file
+            assert os.path.getsize(output_file) > 0
+
+    def test_create_pdf_parallel_matches_serial(self) -> None:
+        """Test that rendering with worker processes produces the same document."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["10.c", "2.c", "1.c"]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("\n".join(f"int line_{i} = {i};" for i in range(120)))
+            
+            serial_file = os.path.join(temp_dir, "serial.pdf")
+            parallel_file = os.path.join(temp_dir, "parallel.pdf")
+            
+            assert create_exercises_pdf(temp_dir, serial_file) is True
+            assert create_exercises_pdf(temp_dir, parallel_file, jobs=2) is True
+            
+            def strip_date(path: str) -> bytes:
+                with open(path, 'rb') as f:
+                    return b"".join(line for line in f if b"/CreationDate" not in line)
+            
+            assert strip_date(serial_file) == strip_date(parallel_file)
+
+    def test_compression_levels_and_compact_output(self) -> None:
+        """Test that higher compression and compact output make smaller files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["1.c", "2.c"]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("\n".join(f"int line_{i} = {i};" for i in range(300)))
+            
+            sizes = {}
+            for label, compression, compact in [("none", 0, False), ("default", 6, False), ("compact", 6, True)]:
+                output_file = os.path.join(temp_dir, f"{label}.pdf")
+                assert create_exercises_pdf(temp_dir, output_file, compression=compression, compact=compact)
+                sizes[label] = os.path.getsize(output_file)
+            
+            assert sizes["none"] > sizes["default"] > sizes["compact"]
+
+    def test_table_of_contents_and_bookmarks(self) -> None:
+        """Test that the table of contents comes first and every exercise gets a bookmark."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "turma"))
+            for name in ["1.c", "2.c", os.path.join("turma", "3.c")]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("int main(void) { return 0; }")
+            plain_file = os.path.join(temp_dir, "plain.pdf")
+            toc_file = os.path.join(temp_dir, "toc.pdf")
+            
+            assert create_exercises_pdf(temp_dir, plain_file)
+            assert create_exercises_pdf(temp_dir, toc_file, toc=True)
+            
+            with open(plain_file, 'rb') as f:
+                plain = f.read()
+            with open(toc_file, 'rb') as f:
+                data = f.read()
+            assert b"/Outlines " in plain
+            assert b"/Title (turma)" in plain and b"/Title (3.c)" in plain
+            assert b"/Subtype /Link" not in plain
+            # One contents page, then the three exercises and the blank page
+            assert b"/Count 5\n/MediaBox" in data
+            assert data.count(b"/Subtype /Link") == 4
+            assert b"/Title <FEFF" in data
+            
+    def test_prefetch_matches_serial_reads(self, mocker: "MockerFixture") -> None:
+        """Test that prefetching reads every file once and changes nothing in the document."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["3.c", "1.c", "2.c", "10.c"]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write(f"int file_{name[:-2]};\n")
+            
+            plain_file = os.path.join(temp_dir, "plain.pdf")
+            prefetched_file = os.path.join(temp_dir, "prefetched.pdf")
+            assert create_exercises_pdf(temp_dir, plain_file, prefetch=0) is True
+            load = mocker.spy(pdf_generator, "_load_source")
+            assert create_exercises_pdf(temp_dir, prefetched_file, prefetch=2) is True
+            
+            assert load.call_count == 4
+            with open(plain_file, 'rb') as f:
+                plain = [line for line in f if b"/CreationDate" not in line]
+            with open(prefetched_file, 'rb') as f:
+                prefetched = [line for line in f if b"/CreationDate" not in line]
+            assert plain == prefetched
+
+    def test_prefetch_missing_file(self) -> None:
+        """Test that a file that vanished before it was prefetched becomes an error line."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            missing = os.path.join(temp_dir, "gone.c")
+            output_file = os.path.join(temp_dir, "out.pdf")
+            
+            assert create_exercises_pdf(temp_dir, output_file, c_files=[(missing, "gone.c")], prefetch=4)
+            assert os.path.getsize(output_file) > 0
+
+    def test_create_pdf_reports_progress(self) -> None:
+        """Test that progress is reported after each exercise."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, lines in [("1.c", 3), ("2.c", 5)]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("\n".join("int x;" for _ in range(lines)))
+            events: List[Tuple[int, int, int]] = []
+            
+            output_file = os.path.join(temp_dir, "out.pdf")
+            assert create_exercises_pdf(temp_dir, output_file, progress=lambda *args: events.append(args))
+            
+            assert events == [(1, 2, 3), (2, 2, 8)]
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_progress_lines_of_cached_pages(self, jobs: int, monkeypatch: "MonkeyPatch") -> None:
+        """Test that line totals come from the rendering, so cached exercises are not read again."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, lines in [("1.c", 3), ("2.c", 5)]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("\n".join("int x;" for _ in range(lines)))
+            cache = RenderCache(os.path.join(temp_dir, "cache"))
+            output_file = os.path.join(temp_dir, "out.pdf")
+            assert create_exercises_pdf(temp_dir, output_file, jobs=jobs, cache=cache)
+            opened: List[str] = []
+            real_open = builtins.open
+            
+            def record(file: Any, *args: Any, **kwargs: Any) -> Any:
+                opened.append(str(file))
+                return real_open(file, *args, **kwargs)
+            
+            monkeypatch.setattr(builtins, "open", record)
+            events: List[Tuple[int, int, int]] = []
+            
+            assert create_exercises_pdf(
+                temp_dir, output_file, jobs=jobs, cache=cache, duplicates="render",
+                progress=lambda *args: events.append(args)
+            )
+            
+            assert events == [(1, 2, 3), (2, 2, 8)]
+            assert cache.hits == 2
+            assert not [path for path in opened if path.endswith(".c")]
+
+    def test_create_pdf_cancel_leaves_no_partial_file(self) -> None:
+        """Test that a cancelled run writes nothing and keeps the previous PDF."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ["1.c", "2.c"]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("int main() { return 0; }\n")
+            output_file = os.path.join(temp_dir, "out.pdf")
+            with open(output_file, 'wb') as f:
+                f.write(b"previous")
+            cancel = threading.Event()
+            
+            with pytest.raises(GenerationCancelled):
+                create_exercises_pdf(temp_dir, output_file, progress=lambda *args: cancel.set(), cancel=cancel)
+            
+            with open(output_file, 'rb') as f:
+                assert f.read() == b"previous"
+            assert sorted(os.listdir(temp_dir)) == ["1.c", "2.c", "out.pdf"]
+
+
+class TestRenderExercisePages:
+    """Test cases for per-exercise page rendering."""
+
+    def test_find_c_files_natural_order(self) -> None:
+        """Test that files are listed per directory in natural order."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "sub"))
+            for name in ["10.c", "2.c", "notes.txt", os.path.join("sub", "1.c")]:
+                with open(os.path.join(temp_dir, name), 'w', encoding='utf-8') as f:
+                    f.write("")
+            
+            names = [name for _, name in find_c_files(temp_dir)]
+            
+            assert names == ["2.c", "10.c", "1.c"]
+
+    def test_long_file_spans_several_pages(self) -> None:
+        """Test that an exercise longer than a page is split into several pages."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "long.c")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("\n".join("x++;" for _ in range(200)))
+            
+            pages = render_exercise_pages((path, "long.c", None))
+            
+            assert len(pages) > 1
+            # Every page is closed with a reference to the footer form
+            assert all("/Footer Do" in page.splitlines()[-1] for page in pages)
+            # Numbering continues across pages
+            assert "(1) Tj" in pages[0]
+            assert "(200) '" in pages[-1]
+
+    def test_code_block_is_one_text_object_per_page(self) -> None:
+        """Test that numbers and code rows are written as two runs of one text object."""
+        data = "\n".join(["int f(int x);", "x" * 300, "return x;"]).encode()
+        
+        page = render_exercise_pages(("a.c", "a.c", data))[0]
+        block = page[page.index("BT\n"):page.index("\nET\n")]
+        
+        # One color change for the gutter and one for the code
+        assert block.count(" g\n") == 2
+        assert "Td (" not in block
+        # The wrapped second line takes several rows, skipped by the gutter
+        assert "(1) Tj\n(2) '\nT*\n" in block
+        assert "(\tint f\\(int x\\);) Tj" in block
+        assert block.endswith("(\treturn x;) '")
+
+    def test_windows_encoded_file_is_printed(self) -> None:
+        """Test that a cp1252 file is printed instead of producing an error line."""
+        text = "char *s = \"ação\"; // “aspas” €"
+        
+        page = render_exercise_pages(("win.c", "win.c", text.encode("cp1252")))[0]
+        
+        assert "Erro ao ler arquivo" not in page
+        # Printed in the Windows-1252 encoding of the core fonts
+        assert text.encode("cp1252").decode("latin-1") in page
+
+    def test_binary_file_is_skipped(self) -> None:
+        """Test that a binary file misnamed .c is reported, not printed."""
+        page = render_exercise_pages(("a.out.c", "a.out.c", b"\x7fELF\x00\x00" * 100))[0]
+        
+        assert "parece ser bin" in page
+        assert "Total de linhas: 0" in page
+
+    def test_oversized_file_is_truncated(self) -> None:
+        """Test the marker printed when a read limit is reached."""
+        data = "".join(f"x{i};\n" for i in range(50)).encode()
+        
+        pages = render_exercise_pages(("big.c", "big.c", data), limits=ReadLimits(max_lines=5))
+        
+        assert "Arquivo truncado ap" in pages[-1]
+        assert "Total de linhas: 5" in pages[-1]
@@ -0,0 +1,196 @@
+"""Test module for the streaming PDF writer."""
+import io
+import re
+import zlib
+
+from src.services.pdf_generator import new_document, render_blank_page
+from src.services.pdf_writer import OBJECTS_PER_STREAM, OutlineItem, StreamingPDFWriter, pdf_text_string
+
+
+def _check_xref(data: bytes) -> int:
+    """Check that every cross-reference entry points at its object and return the object count."""
+    start = int(re.findall(rb"startxref\n(\d+)", data)[-1])
+    header = re.match(rb"xref\n0 (\d+)\n", data[start:])
+    assert header is not None
+    count = int(header.group(1))
+    entries = start + header.end()
+    for number in range(1, count):
+        offset = int(data[entries + 20 * number:entries + 20 * number + 10])
+        assert data[offset:].startswith(b"%d 0 obj" % number)
+    return count
+
+
+def _stream_data(data: bytes, offset: int) -> bytes:
+    """Return the decompressed data of the stream object at an offset."""
+    start = data.index(b"stream\n", offset) + len(b"stream\n")
+    end = data.index(b"\nendstream", start)
+    return zlib.decompress(data[start:end])
+
+
+def _check_xref_stream(data: bytes) -> int:
+    """Check that every cross-reference stream entry locates its object and return the object count."""
+    start = int(re.findall(rb"startxref\n(\d+)", data)[-1])
+    dictionary = data[start:data.index(b"stream\n", start)]
+    assert b"/Type /XRef" in dictionary
+    count = int(re.search(rb"/Size (\d+)", dictionary).group(1))
+    widths = [int(w) for w in re.search(rb"/W \[(\d+) (\d+) (\d+)\]", dictionary).groups()]
+    rows = _stream_data(data, start)
+    row_size = sum(widths)
+    assert len(rows) == count * row_size
+    for number in range(1, count):
+        row = rows[number * row_size:(number + 1) * row_size]
+        kind = row[0]
+        field = int.from_bytes(row[1:1 + widths[1]], "big")
+        index = int.from_bytes(row[1 + widths[1]:], "big")
+        if kind == 1:
+            assert data[field:].startswith(b"%d 0 obj" % number)
+        else:
+            assert kind == 2
+            offset = int.from_bytes(rows[field * row_size + 1:field * row_size + 1 + widths[1]], "big")
+            header = _stream_data(data, offset).split(b"\n", 1)[0].split()
+            assert int(header[2 * index]) == number
+    return count
+
+
+def _packed_object(data: bytes, number: int) -> bytes:
+    """Return the body of an object stored in one of the object streams."""
+    for match in re.finditer(rb"/Type /ObjStm /N (\d+) /First (\d+) ", data):
+        contents = _stream_data(data, match.start())
+        first = int(match.group(2))
+        header = [int(value) for value in contents[:first].split()]
+        offsets = dict(zip(header[0::2], header[1::2]))
+        if number in offsets:
+            following = [offset for offset in header[1::2] if offset > offsets[number]]
+            end = first + min(following) if following else len(contents)
+            return contents[first + offsets[number]:end]
+    raise AssertionError(f"object {number} is not in an object stream")
+
+
+class TestStreamingPDFWriter:
+    """Test cases for StreamingPDFWriter."""
+
+    def test_pages_are_written_immediately(self) -> None:
+        """Test that page objects reach the stream before the writer is closed."""
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, new_document())
+
+        writer.add_pages(render_blank_page())
+        written = stream.tell()
+        writer.add_pages(render_blank_page())
+
+        assert written > 0
+        assert stream.tell() > written
+        assert writer.page_count == 2
+
+    def test_closed_document_is_valid(self) -> None:
+        """Test that the finished document has a consistent xref and page tree."""
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, new_document())
+        for _ in range(3):
+            writer.add_pages(render_blank_page())
+        writer.close()
+
+        data = stream.getvalue()
+
+        assert data.startswith(b"%PDF-1.3")
+        assert data.rstrip().endswith(b"%%EOF")
+        assert b"/Count 3" in data
+        assert b"/BaseFont /Courier" in data
+        assert _check_xref(data) > 6
+
+    def test_compact_document_is_valid(self) -> None:
+        """Test that compact mode packs objects into object streams with a valid xref stream."""
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, new_document(), compact=True)
+        pages = OBJECTS_PER_STREAM + 10
+        for _ in range(pages):
+            writer.add_pages(render_blank_page())
+        writer.close()
+
+        data = stream.getvalue()
+
+        assert data.startswith(b"%PDF-1.5")
+        assert b"\nxref\n" not in data
+        assert data.count(b"/Type /ObjStm") == 2
+        # Page dictionaries live in the object streams, only their contents are plain objects
+        assert b"/Type /Page\n" not in data
+        assert _check_xref_stream(data) > 2 * pages
+
+    def test_info_after_a_full_object_stream(self) -> None:
+        """Test that /Info points at the metadata when writing it fills an object stream."""
+        def compact_document(pages: int) -> bytes:
+            stream = io.BytesIO()
+            writer = StreamingPDFWriter(stream, new_document(), compact=True)
+            for _ in range(pages):
+                writer.add_pages(render_blank_page())
+            writer.close()
+            return stream.getvalue()
+
+        # Queued with a single page: its dictionary, the objects written on close, the Info and the catalog
+        queued = int(re.search(rb"/Type /ObjStm /N (\d+)", compact_document(1)).group(1))
+        # One page fewer than that fills the stream with the Info, before the catalog is allocated
+        data = compact_document(OBJECTS_PER_STREAM - (queued - 3) - 1)
+
+        info = int(re.search(rb"/Info (\d+) 0 R", data).group(1))
+        assert b"/Producer" in _packed_object(data, info)
+        assert data.count(b"/Type /ObjStm") == 2
+        _check_xref_stream(data)
+
+    def test_uncompressed_document(self) -> None:
+        """Test that compression level 0 writes plain streams."""
+        document = new_document()
+        document.set_compression_level(0)
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, document)
+        writer.add_pages(render_blank_page())
+        writer.close()
+
+        data = stream.getvalue()
+
+        assert b"/FlateDecode" not in data
+        assert b"/Footer Do" in data
+        assert _check_xref(data) > 5
+
+    def test_front_pages_links_and_outline(self) -> None:
+        """Test that front pages come first and that links and bookmarks point at pages."""
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, new_document())
+        first = writer.add_pages(render_blank_page())
+        second = writer.add_pages(render_blank_page())
+        front = writer.add_page(render_blank_page()[0], [((10, 20, 100, 30), second)], front=True)
+        chapter = OutlineItem("Capítulo", first)
+        chapter.children.append(OutlineItem("2.c", second))
+        writer.set_outline([OutlineItem("Sumário", front), chapter])
+        writer.close()
+
+        data = stream.getvalue()
+
+        assert f"/Kids [{front} 0 R {first} 0 R {second} 0 R ]".encode() in data
+        assert f"/Subtype /Link /Rect [10.00 20.00 100.00 30.00] /Border [0 0 0] /Dest [{second} 0 R".encode() in data
+        assert b"/Type /Outlines" in data and b"/Count 3>>" in data
+        assert f"/Title {pdf_text_string('Capítulo')}".encode() in data
+        assert b"/Outlines " in data
+        assert _check_xref(data) > 10
+
+    def test_pdf_text_string(self) -> None:
+        """Test that non-ASCII titles are written as UTF-16."""
+        assert pdf_text_string("a(b)") == "(a\\(b\\))"
+        assert pdf_text_string("é") == "<FEFF00E9>"
+
+    def test_shared_content_streams(self) -> None:
+        """Test that pages can draw streams written once for several pages."""
+        document = new_document()
+        document.set_compression_level(0)
+        stream = io.BytesIO()
+        writer = StreamingPDFWriter(stream, document)
+        body = writer.add_stream(render_blank_page()[0])
+        first = writer.add_page("0 g\n", shared=[body])
+        second = writer.add_page("", shared=[body])
+        writer.close()
+
+        data = stream.getvalue()
+
+        assert data.count(b"/Footer Do") == 1
+        assert re.search(rb"%d 0 obj\n<</Type /Page\n.*?/Contents \[\d+ 0 R %d 0 R\]>>" % (first, body), data, re.S)
+        assert re.search(rb"%d 0 obj\n<</Type /Page\n.*?/Contents %d 0 R>>" % (second, body), data, re.S)
+        assert _check_xref(data) > 5
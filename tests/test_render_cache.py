@@ -0,0 +1,93 @@
+"""Test module for the render cache."""
+import os
+import tempfile
+from typing import TYPE_CHECKING
+
+from src.services import pdf_generator
+from src.services.pdf_generator import create_exercises_pdf
+from src.services.render_cache import RenderCache
+
+if TYPE_CHECKING:
+    from pytest_mock.plugin import MockerFixture
+
+
+class TestRenderCache:
+    """Test cases for RenderCache."""
+
+    def test_round_trip(self) -> None:
+        """Test that stored pages are returned unchanged."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = RenderCache(temp_dir)
+            key = cache.key(b"int x;", "1.c", "layout")
+            pages = ["2 J\nBT (a\x00b) Tj ET\n", "", "\xe9"]
+
+            assert cache.get(key) is None
+            cache.put(key, pages)
+
+            assert cache.get(key) == pages
+            assert cache.hits == 1
+            assert cache.misses == 1
+
+    def test_key_depends_on_content_name_and_layout(self) -> None:
+        """Test that every input of the key changes it."""
+        key = RenderCache.key(b"a", "1.c", "layout")
+
+        assert key != RenderCache.key(b"b", "1.c", "layout")
+        assert key != RenderCache.key(b"a", "2.c", "layout")
+        assert key != RenderCache.key(b"a", "1.c", "other")
+
+    def test_eviction_keeps_size_bounded(self) -> None:
+        """Test that the least recently used entries are evicted."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = RenderCache(temp_dir, max_bytes=4000)
+            for i in range(20):
+                cache.put(RenderCache.key(str(i).encode(), "x.c", ""), [os.urandom(500).decode("latin1")])
+
+            total = sum(entry.stat().st_size for entry in os.scandir(temp_dir))
+
+            assert total <= 4000
+            assert cache.get(RenderCache.key(b"19", "x.c", "")) is not None
+
+    def test_clear(self) -> None:
+        """Test that clearing removes every entry."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = RenderCache(temp_dir)
+            key = cache.key(b"", "1.c", "")
+            cache.put(key, ["page"])
+
+            cache.clear()
+
+            assert cache.get(key) is None
+
+
+class TestIncrementalBuild:
+    """Test cases for create_exercises_pdf with a render cache."""
+
+    def test_only_changed_files_are_rendered(self, mocker: "MockerFixture") -> None:
+        """Test that a rebuild renders only the files whose contents changed."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_dir = os.path.join(temp_dir, "src")
+            os.makedirs(source_dir)
+            for name in ["1.c", "2.c", "3.c"]:
+                with open(os.path.join(source_dir, name), 'w', encoding='utf-8') as f:
+                    f.write(f"int {name[0]};\n")
+            cache = RenderCache(os.path.join(temp_dir, "cache"))
+            output_file = os.path.join(temp_dir, "out.pdf")
+            fresh_file = os.path.join(temp_dir, "fresh.pdf")
+            assert create_exercises_pdf(source_dir, output_file, cache=cache) is True
+
+            with open(os.path.join(source_dir, "2.c"), 'w', encoding='utf-8') as f:
+                f.write("int changed;\n")
+            render = mocker.patch.object(
+                pdf_generator, "render_exercise_pages", wraps=pdf_generator.render_exercise_pages
+            )
+            assert create_exercises_pdf(source_dir, output_file, cache=cache) is True
+
+            assert render.call_count == 1
+            assert render.call_args[0][0][1] == "2.c"
+            assert cache.hits == 2
+            # The incremental build matches a build from scratch
+            assert create_exercises_pdf(source_dir, fresh_file) is True
+            with open(output_file, 'rb') as cached, open(fresh_file, 'rb') as fresh:
+                assert [line for line in cached if b"/CreationDate" not in line] == \
+                    [line for line in fresh if b"/CreationDate" not in line]
@@ -0,0 +1,85 @@
+"""Test module for the render server."""
+import io
+import os
+import tempfile
+import threading
+from typing import Iterator
+
+import pytest
+
+from src.services.server import UNIX_SOCKETS, RenderServer, ServerStats, render_message, request
+
+LISTA = os.path.join(os.path.dirname(__file__), "lista")
+
+
+class TestServerStats:
+    """Test cases for the queue and latency figures."""
+
+    def test_snapshot(self) -> None:
+        """Test the queue depth and the latency percentiles."""
+        stats = ServerStats(workers=2)
+        for latency in range(1, 21):
+            stats.job_started()
+            stats.job_finished(latency != 20, float(latency), 0.5)
+        for _ in range(3):
+            stats.job_started()
+
+        figures = stats.snapshot()
+
+        assert (figures["running"], figures["queued"]) == (2, 1)
+        assert (figures["completed"], figures["failed"]) == (19, 1)
+        assert figures["latency"] == {"mean": 10.5, "p50": 10.0, "p95": 19.0, "max": 20.0}
+        assert figures["render_mean"] == 0.5
+
+
+@pytest.fixture
+def server() -> Iterator[RenderServer]:
+    """Run a one-worker server on a temporary socket."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        instance = RenderServer(os.path.join(temp_dir, "server.sock"), workers=1)
+        thread = threading.Thread(target=instance.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield instance
+        finally:
+            instance.shutdown()
+            instance.server_close()
+            thread.join()
+
+
+@pytest.mark.skipif(not UNIX_SOCKETS, reason="Unix sockets are not available")
+class TestRenderServer:
+    """Test cases for jobs sent over the socket."""
+
+    def test_render_to_a_path(self, server: RenderServer) -> None:
+        """Test that the server writes the PDF where it is asked to."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "out.pdf")
+
+            response = request(server.server_address, render_message(LISTA, output_file, toc=True))
+
+            assert response["ok"]
+            assert response["output"] == output_file
+            with open(output_file, 'rb') as f:
+                assert f.read(5) == b"%PDF-"
+
+    def test_render_a_file_list_to_bytes(self, server: RenderServer) -> None:
+        """Test that the PDF of a file list is sent back after the response."""
+        pdf = io.BytesIO()
+        files = [os.path.join(LISTA, "2.c"), os.path.join(LISTA, "1.c")]
+
+        response = request(server.server_address, render_message(files=files), pdf=pdf)
+
+        assert response["ok"]
+        assert response["size"] == len(pdf.getvalue())
+        assert pdf.getvalue().startswith(b"%PDF-")
+
+    def test_errors_and_stats(self, server: RenderServer) -> None:
+        """Test that bad requests are answered with an error and counted."""
+        missing = request(server.server_address, render_message(os.path.join(LISTA, "missing"), "/tmp/x.pdf"))
+        relative = request(server.server_address, {"op": "render", "input": "lista"})
+        stats = request(server.server_address, {"op": "stats"})
+
+        assert not missing["ok"]
+        assert relative == {"ok": False, "error": "input must be an absolute path"}
+        assert (stats["completed"], stats["failed"], stats["queued"]) == (0, 1, 0)
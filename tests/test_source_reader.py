@@ -0,0 +1,90 @@
+"""Test module for the source file reader."""
+import codecs
+import os
+import tempfile
+from typing import Optional
+
+import pytest
+
+from src.services.source_reader import ReadLimits, SourceText, detect_encoding, read_source
+
+
+def _read(data: bytes, limits: Optional[ReadLimits] = None) -> SourceText:
+    """Write data to a temporary file and read it back."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "file.c")
+        with open(path, 'wb') as f:
+            f.write(data)
+        source = read_source(path, limits=limits)
+    return source
+
+
+class TestDetectEncoding:
+    """Test cases for encoding detection."""
+
+    @pytest.mark.parametrize("sample, expected", [
+        ("ação".encode("utf-8"), ("utf-8", 0)),
+        (codecs.BOM_UTF8 + b"x", ("utf-8", 3)),
+        (codecs.BOM_UTF16_LE + "x".encode("utf-16-le"), ("utf-16-le", 2)),
+        ("ação “x”".encode("cp1252"), ("cp1252", 0)),
+        (b"\x81\x8d", ("latin-1", 0)),
+        (b"\x7fELF\x02\x01\x01\x00\x00", (None, 0)),
+    ])
+    def test_detect(self, sample: bytes, expected: tuple) -> None:
+        """Test BOMs, UTF-8, the Windows fallbacks and binary files."""
+        assert detect_encoding(sample) == expected
+
+    def test_utf8_cut_in_the_middle_of_a_character(self) -> None:
+        """Test that a sample ending inside a character is still UTF-8."""
+        assert detect_encoding("aç".encode("utf-8")[:-1]) == ("utf-8", 0)
+
+
+class TestReadSource:
+    """Test cases for read_source."""
+
+    def test_newlines_like_text_mode(self) -> None:
+        """Test that \\r\\n and \\r end lines and a final newline gives an empty line."""
+        source = _read(b"a\r\nb\rc\n")
+
+        assert source.lines == ["a", "b", "c", ""]
+        assert not source.truncated
+
+    def test_latin1_file_is_decoded(self) -> None:
+        """Test that a Windows-encoded file is read instead of failing."""
+        source = _read("printf(\"ação\");\n".encode("cp1252"))
+
+        assert source.encoding == "cp1252"
+        assert source.lines[0] == "printf(\"ação\");"
+
+    def test_bom_is_dropped(self) -> None:
+        """Test that BOMs do not show up in the text."""
+        assert _read(codecs.BOM_UTF8 + b"int x;").lines == ["int x;"]
+        assert _read("int y;\r\nz".encode("utf-16")).lines == ["int y;", "z"]
+
+    def test_binary_file(self) -> None:
+        """Test that binary files are detected and not decoded."""
+        source = _read(b"\x7fELF" + bytes(range(256)) * 4)
+
+        assert source.binary
+        assert source.lines == []
+
+    def test_line_limit(self) -> None:
+        """Test truncation at the line limit."""
+        data = "".join(f"{i}\n" for i in range(100)).encode()
+
+        source = _read(data, ReadLimits(max_lines=10))
+
+        assert source.lines == [str(i) for i in range(10)]
+        assert source.truncated
+        assert source.size == len(data)
+
+    def test_byte_limit_drops_the_partial_line(self) -> None:
+        """Test truncation at the byte limit."""
+        source = _read(b"aaaa\nbbbb\ncccc\n", ReadLimits(max_bytes=12))
+
+        assert source.lines == ["aaaa", "bbbb"]
+        assert source.truncated
+
+    def test_empty_file(self) -> None:
+        """Test that an empty file has a single empty line."""
+        assert _read(b"").lines == [""]
@@ -0,0 +1,127 @@
+"""Test module for sources handed over by the caller and PDFs written to streams."""
+import io
+import os
+import re
+import tempfile
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from src.services.discovery import DiscoveryOptions
+from src.services.pdf_generator import create_exercises_pdf, exercises_pdf_bytes, find_c_files
+from src.services.source_reader import ReadLimits
+from src.services.sources import SOURCES_ROOT, SourceInput, SourceItems, listed_sources, read_file_list
+
+LISTA = os.path.join(os.path.dirname(__file__), "lista")
+
+
+def _without_date(data: bytes) -> bytes:
+    """Drop the creation date, the only difference between two runs."""
+    return re.sub(rb"/CreationDate \(D:\d+\)", b"", data)
+
+
+class TestSourceItems:
+    """Test cases for sources given as contents or paths."""
+
+    def test_contents_and_paths(self) -> None:
+        """Test that both kinds of sources are listed in order and read alike."""
+        path = os.path.join(LISTA, "2.c")
+        items = SourceItems([("turma/b.c", b"int b;\n"), ("a.c", path)])
+
+        assert items.files == [
+            (os.path.join(SOURCES_ROOT, "turma", "b.c"), "b.c"), (os.path.join(SOURCES_ROOT, "a.c"), "a.c")
+        ]
+        assert items.read(items.files[0][0]) == b"int b;\n"
+        with open(path, 'rb') as f:
+            assert items.read_bytes(items.files[1][0]) == f.read()
+        assert items.size(items.files[1][0]) == os.path.getsize(path)
+
+    def test_sources_cut_at_the_byte_limit(self) -> None:
+        """Test that a large source comes back decoded and truncated, like an archive member."""
+        items = SourceItems([("a.c", b"x\n" * 100)], ReadLimits(max_bytes=10))
+
+        source = items.read(items.files[0][0])
+
+        assert not isinstance(source, bytes) and source is not None
+        assert source.truncated
+        assert source.size == 200
+
+    def test_missing_path(self) -> None:
+        """Test that a path that cannot be read is reported like an unreadable member."""
+        items = SourceItems([("a.c", os.path.join(LISTA, "missing.c"))])
+
+        assert items.read(items.files[0][0]) is None
+        assert items.size(items.files[0][0]) == 0
+
+    @pytest.mark.parametrize("names", [["../a.c"], ["/"], ["a.c", "./a.c"]])
+    def test_invalid_names(self, names: List[str]) -> None:
+        """Test that names leaving the root, empty names and repeated names are rejected."""
+        with pytest.raises(ValueError):
+            SourceItems((name, b"") for name in names)
+
+
+class TestFileLists:
+    """Test cases for lists of files read from find or git."""
+
+    def test_read_file_list(self) -> None:
+        """Test that blank lines are skipped and spaces kept."""
+        assert list(read_file_list(io.StringIO("a.c\n\n b c.c\r\n"))) == ["a.c", " b c.c"]
+
+    def test_listed_sources(self) -> None:
+        """Test that missing files and other types are dropped, and the order is kept."""
+        paths = [
+            os.path.join(LISTA, "3.c"), os.path.join(LISTA, "deleted.c"), os.path.join(LISTA, "CExecConfig.json"),
+            os.path.join(LISTA, "1.c"), os.path.join(LISTA, "3.c"),
+        ]
+
+        root, c_files = listed_sources(paths, DiscoveryOptions())
+
+        assert root == LISTA
+        assert c_files == [(os.path.join(LISTA, "3.c"), "3.c"), (os.path.join(LISTA, "1.c"), "1.c")]
+
+
+class TestStreams:
+    """Test cases for documents written to binary streams."""
+
+    @pytest.fixture
+    def submissions(self) -> Iterator[Tuple[str, str]]:
+        """A directory of sources, and a path for its PDF."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = os.path.join(temp_dir, "turma")
+            for name in ("a/1.c", "a/2.c", "b/1.c"):
+                path = os.path.join(root, *name.split("/"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f"/* {name} */\nint main(void) {{ return 0; }}\n")
+            yield root, os.path.join(temp_dir, "turma.pdf")
+
+    def test_create_pdf_to_a_stream(self, submissions: Tuple[str, str]) -> None:
+        """Test that a directory can be written to a stream, with no file left behind."""
+        root, output_file = submissions
+        assert create_exercises_pdf(root, output_file, toc=True)
+        stream = io.BytesIO()
+
+        assert create_exercises_pdf(root, stream, toc=True)
+
+        with open(output_file, 'rb') as f:
+            assert _without_date(stream.getvalue()) == _without_date(f.read())
+        assert sorted(os.listdir(os.path.dirname(root))) == ["turma", "turma.pdf"]
+
+    def test_sources_render_like_the_directory(self, submissions: Tuple[str, str]) -> None:
+        """Test that a generator of contents and paths gives the document of the directory."""
+        root, output_file = submissions
+        assert create_exercises_pdf(root, output_file, toc=True)
+
+        def sources() -> Iterator[Tuple[str, SourceInput]]:
+            for number, (full_path, _) in enumerate(find_c_files(root)):
+                name = os.path.relpath(full_path, root)
+                if number % 2:
+                    yield name, full_path
+                else:
+                    with open(full_path, 'rb') as f:
+                        yield name, f.read()
+
+        data = exercises_pdf_bytes(sources(), toc=True)
+
+        with open(output_file, 'rb') as f:
+            assert _without_date(data) == _without_date(f.read())
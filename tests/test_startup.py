@@ -0,0 +1,49 @@
+"""Test module for the startup cost of the command line."""
+import os
+import subprocess
+import sys
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    """Run the interpreter in the repository root."""
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=60, check=True
+    )
+
+
+def _loaded_after(code: str) -> List[str]:
+    """Run code in a fresh interpreter and return its output followed by the loaded modules."""
+    result = _python("-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))")
+    return result.stdout.splitlines()
+
+
+class TestStartup:
+    """Test cases for the lazy imports of the entry point."""
+
+    def test_importing_main_loads_neither_fpdf_nor_tk(self) -> None:
+        """Test that the entry point only loads the argument parser."""
+        modules = _loaded_after("import src.main")
+
+        assert "fpdf" not in modules
+        assert "tkinter" not in modules
+        assert "src.services.pdf_generator" not in modules
+
+    def test_help_works_without_tk(self) -> None:
+        """Test that --help neither needs Tkinter nor loads fpdf."""
+        code = (
+            "import sys\n"
+            "sys.modules['tkinter'] = None\n"
+            "sys.argv = ['run.py', '--help']\n"
+            "from src.main import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass"
+        )
+        lines = _loaded_after(code)
+
+        assert any("--compression" in line for line in lines)
+        assert "fpdf" not in lines
@@ -0,0 +1,94 @@
+"""Test module for text measurement helpers."""
+import pytest
+
+from src.services.pdf_generator import CustomPDF
+from src.services.text_metrics import FontMetrics, get_font_metrics
+
+
+class TestFontMetrics:
+    """Test cases for FontMetrics and get_font_metrics."""
+
+    def test_courier_is_monospace(self) -> None:
+        """Test that Courier is detected as a fixed-pitch font."""
+        pdf = CustomPDF()
+        pdf.add_page()
+        pdf.set_font("Courier", size=10)
+
+        metrics = get_font_metrics(pdf)
+
+        assert metrics.is_monospace
+        assert metrics.string_width("int main()") == pytest.approx(pdf.get_string_width("int main()"))
+
+    def test_proportional_font_matches_fpdf(self) -> None:
+        """Test that proportional fonts are measured glyph by glyph."""
+        pdf = CustomPDF()
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', 12)
+
+        metrics = get_font_metrics(pdf)
+
+        assert not metrics.is_monospace
+        text = "Exercício: 10.c"
+        assert metrics.string_width(text) == pytest.approx(pdf.get_string_width(text))
+
+    def test_metrics_are_cached_per_font_and_size(self) -> None:
+        """Test that the width table is built once per font and size."""
+        pdf = CustomPDF()
+        pdf.add_page()
+        pdf.set_font("Courier", size=10)
+        first = get_font_metrics(pdf)
+        pdf.set_font("Courier", size=12)
+        second = get_font_metrics(pdf)
+        pdf.set_font("Courier", size=10)
+
+        assert get_font_metrics(pdf) is first
+        assert second is not first
+
+    def test_measure_lines(self) -> None:
+        """Test batch measurement of several lines."""
+        metrics = FontMetrics({"a": 1.0, "b": 2.0})
+
+        assert metrics.measure_lines(["ab", "", "bb"]) == [3.0, 0.0, 4.0]
+
+
+class TestWrap:
+    """Test cases for the FontMetrics wrapping engine."""
+
+    def test_wrap_breaks_at_spaces(self) -> None:
+        """Test that lines break at the last fitting space."""
+        metrics = FontMetrics({char: 1.0 for char in "abcdefgh "})
+
+        assert metrics.wrap("abc def gh", 7.0) == ["abc def", "gh"]
+
+    def test_wrap_keeps_leading_indentation(self) -> None:
+        """Test that indentation is kept on the first row."""
+        metrics = FontMetrics({char: 1.0 for char in "ab "})
+
+        assert metrics.wrap("    aa bb", 7.0) == ["    aa", "bb"]
+
+    def test_wrap_hard_splits_long_tokens(self) -> None:
+        """Test that tokens wider than the line are split."""
+        metrics = FontMetrics({"x": 1.0, "y": 2.0, " ": 1.0})
+
+        assert metrics.wrap("xxxxxxx", 3.0) == ["xxx", "xxx", "x"]
+        assert metrics.wrap("yyy x", 4.0) == ["yy", "y x"]
+
+    def test_wrap_always_makes_progress(self) -> None:
+        """Test that glyphs wider than the line still get a row each."""
+        metrics = FontMetrics({"w": 5.0, "i": 1.0})
+
+        assert metrics.wrap("wi", 2.0) == ["w", "i"]
+
+    def test_wrap_lines_matches_wrap(self) -> None:
+        """Test that wrapping a whole file agrees with wrapping line by line."""
+        pdf = CustomPDF()
+        pdf.add_page()
+        pdf.set_font("Courier", size=10)
+        metrics = get_font_metrics(pdf)
+        lines = ["", "int x;", "a" * 500, " ".join(["word"] * 80)]
+
+        wrapped = metrics.wrap_lines(lines, 100.0)
+
+        assert wrapped == [metrics.wrap(line, 100.0) for line in lines]
+        assert wrapped[0] == [""]
+        assert all(metrics.string_width(row) <= 100.0 for rows in wrapped for row in rows)
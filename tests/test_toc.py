@@ -0,0 +1,67 @@
+"""Test module for the table of contents and outline."""
+import os
+
+from src.services.layout import HEADER, NOTE, PageGeometry
+from src.services.toc import TOC_TITLE, build_outline, layout_toc, toc_entries
+
+ROOT = os.path.join(os.sep, "lista")
+GEOMETRY = PageGeometry(top=10, bottom=50, line_height=5, header_height=10, spacer_height=10)
+
+
+def _files(*names: str) -> list:
+    """Return (full_path, file_name) tuples for paths relative to ROOT."""
+    return [(os.path.join(ROOT, *name.split("/")), name.split("/")[-1]) for name in names]
+
+
+class TestTocEntries:
+    """Test cases for toc_entries."""
+
+    def test_directories_get_one_heading(self) -> None:
+        """Test that each directory is announced once, before its first file."""
+        entries = toc_entries(ROOT, _files("1.c", "a/2.c", "a/3.c", "a/b/4.c", "c/5.c"))
+
+        assert [(e.title, e.level, e.exercise, e.directory) for e in entries] == [
+            ("1.c", 0, 0, False),
+            ("a", 0, 1, True),
+            ("2.c", 1, 1, False),
+            ("3.c", 1, 2, False),
+            ("b", 1, 3, True),
+            ("4.c", 2, 3, False),
+            ("c", 0, 4, True),
+            ("5.c", 1, 4, False),
+        ]
+
+    def test_layout_has_a_title_and_one_row_per_entry(self) -> None:
+        """Test that the contents are paginated like any other text."""
+        entries = toc_entries(ROOT, _files(*[f"{i}.c" for i in range(20)]))
+
+        layout = layout_toc(entries, GEOMETRY)
+
+        assert layout.texts[0] == TOC_TITLE
+        assert layout.kinds[0] == HEADER
+        assert list(layout.kinds[1:]) == [NOTE] * 20
+        # 10 + 10 + 6 * 5 = 50: the title and 6 rows, then pages of 8 rows
+        assert layout.page_count == 3
+
+
+class TestBuildOutline:
+    """Test cases for build_outline."""
+
+    def test_files_nest_under_their_directories(self) -> None:
+        """Test that bookmarks follow the directory tree and point at first pages."""
+        entries = toc_entries(ROOT, _files("1.c", "a/2.c", "a/b/3.c", "4.c"))
+
+        outline = build_outline(entries, [10, 20, 30, 40], toc_page=5)
+
+        assert [(item.title, item.page_object) for item in outline] == [
+            (TOC_TITLE, 5), ("1.c", 10), ("a", 20), ("4.c", 40)
+        ]
+        directory = outline[2]
+        assert [item.title for item in directory.children] == ["2.c", "b"]
+        assert [(item.title, item.page_object) for item in directory.children[1].children] == [("3.c", 30)]
+
+    def test_no_contents_bookmark_without_toc(self) -> None:
+        """Test that the contents bookmark is only added with a contents page."""
+        outline = build_outline(toc_entries(ROOT, _files("1.c")), [3])
+
+        assert [item.title for item in outline] == ["1.c"]
@@ -0,0 +1,200 @@
+"""Test module for TrueType font loading, subsetting and embedding."""
+import mmap
+import os
+import struct
+import tempfile
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+
+import pytest
+
+from src.services import truetype
+from src.services.pdf_generator import create_exercises_pdf
+from src.services.truetype import FontError, glyphs_in_content, load_font, parse_font
+
+if TYPE_CHECKING:
+    from _pytest.monkeypatch import MonkeyPatch
+
+# Glyphs of the test font: (code point, advance); glyph 0 is .notdef
+GLYPHS = [(None, 500), (0x20, 600), (ord("A"), 700), (ord("é"), 700), (ord("λ"), 600)]
+ACUTE = 3
+
+
+def _box(width: int) -> bytes:
+    """A simple glyph: one square contour."""
+    header = struct.pack(">hhhhh", 1, 0, 0, width, 700)
+    points = struct.pack(">HH", 3, 0) + b"\x01" * 4
+    return header + points + struct.pack(">4h", 0, width, 0, -width) + struct.pack(">4h", 0, 0, 700, 0)
+
+
+def _composite(component: int) -> bytes:
+    """A composite glyph made of one other glyph, moved by word offsets."""
+    return struct.pack(">hhhhh", -1, 0, 0, 700, 900) + struct.pack(">HHhh", 0x0001, component, 0, 100)
+
+
+def _build_font(fs_type: int = 0) -> bytes:
+    """Build a minimal TrueType font with the glyphs of GLYPHS; é is a composite of A."""
+    outlines: List[bytes] = [_box(500), b"", _box(700), _composite(2), _box(600)]
+    glyf = b""
+    loca = [0]
+    for outline in outlines:
+        glyf += outline + b"\0" * (len(outline) % 2)
+        loca.append(len(glyf))
+    mapped = sorted((codepoint, glyph) for glyph, (codepoint, _) in enumerate(GLYPHS) if codepoint is not None)
+    segments = [(codepoint, codepoint, glyph - codepoint) for codepoint, glyph in mapped] + [(0xFFFF, 0xFFFF, 1)]
+    count = len(segments)
+    cmap4 = struct.pack(">7H", 4, 16 + 8 * count, 0, 2 * count, 0, 0, 0)
+    cmap4 += struct.pack(f">{count}H", *(end for _, end, _ in segments)) + b"\0\0"
+    cmap4 += struct.pack(f">{count}H", *(start for start, _, _ in segments))
+    cmap4 += struct.pack(f">{count}h", *(delta for _, _, delta in segments)) + b"\0\0" * count
+    name = "TestMono-Regular".encode("utf-16-be")
+    tables: Dict[bytes, bytes] = {
+        b"head": struct.pack(">IIIIHHqqhhhhHHhhh", 0x10000, 0, 0, 0x5F0F3CF5, 0, 1000, 0, 0,
+                             0, -200, 700, 900, 0, 8, 2, 0, 0),
+        b"hhea": struct.pack(">Ihhh" + "H" + "3h" + "3h" + "4h" + "hH", 0x10000, 800, -200, 0, 700,
+                             0, 0, 700, 1, 0, 0, 0, 0, 0, 0, 0, len(GLYPHS)),
+        b"maxp": struct.pack(">IH", 0x5000, len(GLYPHS)),
+        b"hmtx": b"".join(struct.pack(">Hh", advance, 0) for _, advance in GLYPHS),
+        b"cmap": struct.pack(">HHHHI", 0, 1, 3, 1, 12) + cmap4,
+        b"loca": struct.pack(f">{len(loca)}H", *(offset // 2 for offset in loca)),
+        b"glyf": glyf,
+        b"post": struct.pack(">IihhIIIII", 0x30000, 0, -100, 50, 0, 0, 0, 0, 0),
+        b"name": struct.pack(">HHH6H", 0, 1, 18, 3, 1, 0x409, 6, len(name), 0) + name,
+        b"OS/2": struct.pack(">HhHHH", 0, 600, 400, 5, fs_type),
+    }
+    directory = struct.pack(">IHHHH", 0x10000, len(tables), 0, 0, 0)
+    offset = 12 + 16 * len(tables)
+    body = b""
+    for tag in sorted(tables):
+        data = tables[tag] + b"\0" * (-len(tables[tag]) % 4)
+        directory += struct.pack(">4sIII", tag, 0, offset + len(body), len(tables[tag]))
+        body += data
+    return directory + body
+
+
+def _write_font(directory: str, data: bytes) -> str:
+    """Write a font file and return its path."""
+    path = os.path.join(directory, "TestMono.ttf")
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def _glyph_table(font: bytes) -> Tuple[List[int], bytes]:
+    """Read the loca offsets and glyf table of a font built by TrueTypeFont.subset."""
+    count = struct.unpack_from(">H", font, 4)[0]
+    tables = {}
+    for i in range(count):
+        tag, _, offset, length = struct.unpack_from(">4sIII", font, 12 + 16 * i)
+        tables[tag] = font[offset:offset + length]
+    loca = tables[b"loca"]
+    offsets = [2 * value for value in struct.unpack(f">{len(loca) // 2}H", loca)]
+    return offsets, tables[b"glyf"]
+
+
+@pytest.fixture
+def font_dir() -> Iterator[str]:
+    """A temporary directory holding the test font, with nothing loaded from it yet."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _write_font(temp_dir, _build_font())
+        try:
+            yield temp_dir
+        finally:
+            truetype._loaded.clear()
+
+
+class TestFontMetrics:
+    """Test cases for parsing a font and caching its metrics."""
+
+    def test_load_font(self, font_dir: str) -> None:
+        """Test the name, glyph lookup and widths read from the font."""
+        font = load_font(os.path.join(font_dir, "TestMono.ttf"), os.path.join(font_dir, "fonts"))
+
+        assert font.name == "TestMono-Regular"
+        assert (font.units_per_em, font.ascent, font.descent) == (1000, 800, -200)
+        assert font.glyph(ord("A")) == 2
+        assert font.glyph(ord("☃")) == 0
+        assert font.widths["A"] == 700
+        assert font.widths["\t"] == font.widths[" "] == 600
+        assert font.unicode_map([2, ACUTE]) == {2: ord("A"), ACUTE: ord("é")}
+
+    def test_metrics_are_cached_and_mapped(self, font_dir: str, monkeypatch: "MonkeyPatch") -> None:
+        """Test that a second process maps the metrics file instead of parsing the font."""
+        path = os.path.join(font_dir, "TestMono.ttf")
+        cache_dir = os.path.join(font_dir, "fonts")
+        first = load_font(path, cache_dir)
+        assert load_font(path, cache_dir) is first
+        assert [name.endswith(truetype.METRICS_SUFFIX) for name in os.listdir(cache_dir)] == [True]
+
+        truetype._loaded.clear()
+        monkeypatch.setattr(truetype, "parse_font", lambda data: pytest.fail("the font was parsed again"))
+        second = load_font(path, cache_dir)
+
+        assert isinstance(second._buffer, mmap.mmap)
+        assert second.widths == first.widths
+
+    def test_printable(self, font_dir: str) -> None:
+        """Test that characters missing from the font become '?', and tabs are kept."""
+        font = load_font(os.path.join(font_dir, "TestMono.ttf"), os.path.join(font_dir, "fonts"))
+
+        assert font.printable("A A") == "A A"
+        assert font.printable("\tAé☃λ") == "\tAé?λ"
+
+    def test_invalid_fonts(self) -> None:
+        """Test that files that are not embeddable TrueType fonts are rejected."""
+        with pytest.raises(FontError, match="not a TrueType font"):
+            parse_font(b"%PDF-1.3\n" + b"\0" * 16)
+        with pytest.raises(FontError, match="CFF"):
+            parse_font(b"OTTO" + b"\0" * 16)
+        with pytest.raises(FontError, match="embedding"):
+            parse_font(_build_font(fs_type=2))
+
+
+class TestSubset:
+    """Test cases for the embedded glyph subset."""
+
+    def test_subset_keeps_used_glyphs_and_components(self, font_dir: str) -> None:
+        """Test that only the used glyphs, their components and .notdef keep outlines."""
+        font = load_font(os.path.join(font_dir, "TestMono.ttf"), os.path.join(font_dir, "fonts"))
+
+        program = font.subset([ACUTE])
+        offsets, glyf = _glyph_table(program)
+
+        kept = [glyph for glyph in range(len(GLYPHS)) if offsets[glyph + 1] > offsets[glyph]]
+        assert kept == [0, 2, ACUTE]
+        assert offsets[-1] == len(glyf)
+        # The checksum of the whole font, padded to 4 bytes, is the magic number of the head table
+        padded = program + b"\0" * (-len(program) % 4)
+        assert sum(struct.unpack(f">{len(padded) // 4}I", padded)) & 0xFFFFFFFF == 0xB1B0AFBA
+
+    def test_glyphs_in_content(self) -> None:
+        """Test that escaped bytes of glyph IDs are decoded."""
+        content = "BT (\x00\x02\x00\\() Tj (\\\\\\)\x00\\r) ' ET"
+
+        assert glyphs_in_content(content) == {2, 0x28, 0x5C29, 0x0D}
+
+
+class TestEmbedding:
+    """Test cases for documents drawn with a TrueType font."""
+
+    def test_create_pdf_with_font(self, font_dir: str, monkeypatch: "MonkeyPatch") -> None:
+        """Test that text outside Windows-1252 is drawn with the embedded font."""
+        monkeypatch.setenv("XDG_CACHE_HOME", font_dir)
+        source_dir = os.path.join(font_dir, "lista")
+        os.mkdir(source_dir)
+        with open(os.path.join(source_dir, "a.c"), 'w', encoding='utf-8') as f:
+            f.write("λ\tA ☃\n")
+        output_file = os.path.join(font_dir, "out.pdf")
+
+        assert create_exercises_pdf(
+            source_dir, output_file, compression=0, font=os.path.join(font_dir, "TestMono.ttf")
+        )
+
+        with open(output_file, 'rb') as f:
+            data = f.read()
+        assert b"/Subtype /Type0" in data
+        assert b"+TestMono-Regular" in data
+        assert b"/BaseFont /Courier" not in data
+        # The code row: tab and space as the space glyph, λ and A, and ☃ as '?', which the font lacks
+        assert b"(\x00\x01\x00\x04\x00\x01\x00\x02\x00\x01\x00\x00) Tj" in data
+        assert b"<0004> <03BB>" in data
+        assert os.path.isdir(os.path.join(font_dir, "lista-da-vanessador", "fonts"))
@@ -0,0 +1,142 @@
+"""Test module for the source watcher."""
+import os
+import tempfile
+from typing import TYPE_CHECKING, Optional, Set
+
+import pytest
+
+from src.main import watch_and_rebuild
+from src.services.discovery import DiscoveryOptions, discover_sources
+from src.services.watcher import SourceIndex, SourceWatcher
+
+if TYPE_CHECKING:
+    from _pytest.monkeypatch import MonkeyPatch
+
+
+def _write(path: str, text: str) -> None:
+    """Write a small text file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _tree(root: str) -> None:
+    """Write sources that the filters, .gitignore and version-control pruning leave out."""
+    for name in ["1.c", "skip_1.c", "build/2.c", ".git/3.c", "a/4.c", "a/b/5.c"]:
+        path = os.path.join(root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write(path, "int x;")
+    _write(os.path.join(root, ".gitignore"), "build/\n")
+
+
+class TestSourceIndex:
+    """Test cases for SourceIndex."""
+
+    def test_ordered_files(self) -> None:
+        """Test that indexed files come out in document order."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "sub"))
+            for name in ["10.c", "2.c", "readme.md", os.path.join("sub", "1.c")]:
+                _write(os.path.join(temp_dir, name), "")
+
+            index = SourceIndex(temp_dir)
+
+            assert [name for _, name in index.ordered_files()] == ["2.c", "10.c", "1.c"]
+
+    def test_same_files_as_discovery(self) -> None:
+        """Test that the index holds the files discovery finds, without entering pruned directories."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _tree(temp_dir)
+            options = DiscoveryOptions(exclude=["skip_*.c"], max_depth=1)
+
+            index = SourceIndex(temp_dir, options)
+
+            assert index.ordered_files() == discover_sources(temp_dir, options)
+            assert [name for _, name in index.ordered_files()] == ["1.c", "4.c"]
+            assert sorted(os.path.relpath(d, temp_dir) for d in index.dirs) == [".", "a"]
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+class TestSourceWatcher:
+    """Test cases for SourceWatcher with both change detection backends."""
+
+    def test_reports_modified_file(self, use_inotify: bool) -> None:
+        """Test that editing a file is reported once the burst settles."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "1.c")
+            _write(path, "int a;")
+            watcher = SourceWatcher(temp_dir, debounce=0.05, poll_interval=0.05, use_inotify=use_inotify)
+            try:
+                _write(path, "int a; int b;")
+                _write(os.path.join(temp_dir, "notes.txt"), "ignored")
+
+                assert watcher.wait_for_changes(timeout=5) == {path}
+            finally:
+                watcher.close()
+
+    def test_reports_new_directory_and_deleted_file(self, use_inotify: bool) -> None:
+        """Test that files in new directories and deleted files are reported."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old = os.path.join(temp_dir, "old.c")
+            _write(old, "")
+            watcher = SourceWatcher(temp_dir, debounce=0.2, poll_interval=0.05, use_inotify=use_inotify)
+            try:
+                os.remove(old)
+                os.makedirs(os.path.join(temp_dir, "new"))
+                new = os.path.join(temp_dir, "new", "2.c")
+                _write(new, "int x;")
+
+                changed = watcher.wait_for_changes(timeout=5)
+                # A file created right after its directory may arrive in a later batch
+                if new not in changed:
+                    changed |= watcher.wait_for_changes(timeout=5)
+
+                assert changed == {old, new}
+                assert [name for _, name in watcher.files()] == ["2.c"]
+            finally:
+                watcher.close()
+
+    def test_pruned_paths_follow_gitignore(self, use_inotify: bool) -> None:
+        """Test that ignored and version-control files are not reported until .gitignore lets them in."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _tree(temp_dir)
+            watcher = SourceWatcher(temp_dir, debounce=0.05, poll_interval=0.05, use_inotify=use_inotify)
+            try:
+                _write(os.path.join(temp_dir, "build", "2.c"), "int y;")
+                _write(os.path.join(temp_dir, ".git", "3.c"), "int y;")
+
+                assert watcher.wait_for_changes(timeout=0.3) == set()
+
+                _write(os.path.join(temp_dir, ".gitignore"), "# nothing ignored\n")
+
+                assert watcher.wait_for_changes(timeout=5) == {os.path.join(temp_dir, "build", "2.c")}
+                assert watcher.files() == discover_sources(temp_dir, DiscoveryOptions())
+            finally:
+                watcher.close()
+
+    def test_timeout_without_changes(self, use_inotify: bool) -> None:
+        """Test that waiting returns an empty set when nothing changes."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            watcher = SourceWatcher(temp_dir, poll_interval=0.05, use_inotify=use_inotify)
+            try:
+                assert watcher.wait_for_changes(timeout=0.1) == set()
+            finally:
+                watcher.close()
+
+
+class TestWatchAndRebuild:
+    """Test cases for the watch mode of the entry point."""
+
+    def test_builds_without_a_cache_dir(self, monkeypatch: "MonkeyPatch") -> None:
+        """Test that the first build runs on a temporary cache when none was given."""
+        def stop(self: SourceWatcher, timeout: Optional[float] = None) -> Set[str]:
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(SourceWatcher, "wait_for_changes", stop)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            _write(os.path.join(temp_dir, "1.c"), "int a;")
+            output_file = os.path.join(temp_dir, "out.pdf")
+
+            watch_and_rebuild(temp_dir, output_file, 1, None, DiscoveryOptions())
+
+            with open(output_file, 'rb') as f:
+                assert f.read(5) == b"%PDF-"